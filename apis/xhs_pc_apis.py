@@ -1,12 +1,19 @@
 # encoding: utf-8
+import contextlib
 import functools
 import json
+import os
 import random
 import re
 import time
 import urllib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 import requests
+from xhs_utils.comment_util import CommentBudget, CommentCrawlState, order_threads
+from xhs_utils.metrics import RETRIES, InstrumentedTransport
+from xhs_utils.note_cache import NoteCache
+from xhs_utils.rate_limiter import RateLimiter
 from xhs_utils.xhs_util import splice_str, generate_request_params, generate_x_b3_traceid, get_common_headers
 from loguru import logger
 
@@ -14,7 +21,8 @@ from loguru import logger
 def add_request_delay(min_seconds=3.0, max_seconds=6.0):
     """添加随机请求延迟，模拟人类行为"""
     delay = random.uniform(min_seconds, max_seconds)
-    time.sleep(delay)
+    if delay > 0:
+        time.sleep(delay)
 
 
 def retry_with_backoff(max_tries=3, initial_delay=5.0):
@@ -25,7 +33,10 @@ def retry_with_backoff(max_tries=3, initial_delay=5.0):
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            delay = initial_delay
+            # 实例上配置了 retry_delay 时优先使用（本地模拟服务压测时可设为 0）
+            delay = getattr(args[0], 'retry_delay', None) if args else None
+            if delay is None:
+                delay = initial_delay
             last_exception = None
             
             for attempt in range(max_tries):
@@ -38,6 +49,7 @@ def retry_with_backoff(max_tries=3, initial_delay=5.0):
                             # 检测风控错误码
                             if '300013' in msg or '访问频繁' in msg:
                                 logger.warning(f"触发风控(300013)，第 {attempt + 1}/{max_tries} 次重试，等待 {delay:.1f} 秒...")
+                                RETRIES.inc(func=func.__name__)
                                 time.sleep(delay)
                                 delay *= 2  # 指数退避
                                 last_exception = Exception(msg)
@@ -48,6 +60,7 @@ def retry_with_backoff(max_tries=3, initial_delay=5.0):
                     if '300013' in error_msg or '访问频繁' in error_msg:
                         if attempt < max_tries - 1:
                             logger.warning(f"触发风控(300013)，第 {attempt + 1}/{max_tries} 次重试，等待 {delay:.1f} 秒...")
+                            RETRIES.inc(func=func.__name__)
                             time.sleep(delay)
                             delay *= 2
                             last_exception = e
@@ -60,13 +73,40 @@ def retry_with_backoff(max_tries=3, initial_delay=5.0):
         return wrapper
     return decorator
 
+DEFAULT_BASE_URL = "https://edith.xiaohongshu.com"
+DEFAULT_REQUEST_DELAY = (1.0, 3.0)
+
+
+def _env_request_delay():
+    """
+    环境变量 XHS_REQUEST_DELAY，格式 "min,max"（秒），单个数字表示固定延迟
+    """
+    value = os.getenv('XHS_REQUEST_DELAY')
+    if not value:
+        return None
+    parts = [float(part) for part in value.split(',')]
+    return (parts[0], parts[-1])
+
+
 """
     获小红书的api
     :param cookies_str: 你的cookies
+    :param rate_limiter: 共享限速器，笔记详情/搜索/用户笔记/评论请求都经过它，默认每秒 2 个请求
+    :param base_url: 接口地址，默认读取环境变量 XHS_BASE_URL，否则为 https://edith.xiaohongshu.com（可指向本地模拟服务）
+    :param request_delay: 笔记详情/搜索/用户笔记请求前的随机延迟 (min, max) 秒，默认读取 XHS_REQUEST_DELAY，否则为 (1.0, 3.0)
+    :param retry_delay: 风控重试的初始等待秒数，None 使用各接口默认值（5 秒）
+    :param http: HTTP 层，需提供与 requests 相同的 get/post，默认直接使用 requests（可传入 HttpCassette 录制/回放）
+    :param note_cache: 笔记详情缓存，命中时 get_note_info 不发请求、不等待请求延迟
 """
 class XHS_Apis():
-    def __init__(self):
-        self.base_url = "https://edith.xiaohongshu.com"
+    def __init__(self, rate_limiter: RateLimiter | None = None, base_url: str | None = None, request_delay: tuple[float, float] | None = None, retry_delay: float | None = None, http=None, note_cache: NoteCache | None = None):
+        self.base_url = (base_url or os.getenv('XHS_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter(rate=2.0, burst=2)
+        self.request_delay = request_delay if request_delay is not None else (_env_request_delay() or DEFAULT_REQUEST_DELAY)
+        self.retry_delay = retry_delay
+        # 统一统计各接口耗时、状态码与风控响应
+        self.http = InstrumentedTransport(http if http is not None else requests)
+        self.note_cache = note_cache
 
     def get_homefeed_all_channel(self, cookies_str: str, proxies: dict | None = None):
         """
@@ -77,7 +117,7 @@ class XHS_Apis():
         try:
             api = "/api/sns/web/v1/homefeed/category"
             headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -117,7 +157,7 @@ class XHS_Apis():
                 "need_filter_image": False
             }
             headers, cookies, trans_data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=trans_data, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.post(self.base_url + api, headers=headers, data=trans_data, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -171,7 +211,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -189,7 +229,7 @@ class XHS_Apis():
         try:
             api = f"/api/sns/web/v1/user/selfinfo"
             headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -208,7 +248,7 @@ class XHS_Apis():
         try:
             api = f"/api/sns/web/v2/user/me"
             headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -228,7 +268,8 @@ class XHS_Apis():
         res_json = None
         try:
             # 添加请求延迟
-            add_request_delay(1.0, 3.0)
+            add_request_delay(*self.request_delay)
+            self.rate_limiter.acquire()
             api = f"/api/sns/web/v1/user_posted"
             params = {
                 "num": "30",
@@ -240,7 +281,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -249,14 +290,16 @@ class XHS_Apis():
         return success, msg, res_json
 
 
-    def get_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict | None = None):
+    def get_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict | None = None, start_cursor: str = '', on_page=None):
         """
            获取用户所有笔记
            :param user_id: 你想要获取的用户的id
            :param cookies_str: 你的cookies
-           返回用户的所有笔记
+           :param start_cursor: 从指定 cursor 开始（断点续传），默认从第一页开始
+           :param on_page: 每取完一页回调 on_page(notes, next_cursor, has_more)，用于记录断点
+           返回用户的所有笔记（从 start_cursor 开始的部分）
         """
-        cursor = ''
+        cursor = start_cursor
         note_list = []
         try:
             urlParse = urllib.parse.urlparse(user_url)
@@ -273,9 +316,14 @@ class XHS_Apis():
                 if 'cursor' in res_json["data"]:
                     cursor = str(res_json["data"]["cursor"])
                 else:
+                    if on_page is not None:
+                        on_page([], cursor, False)
                     break
                 note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"]["has_more"]:
+                has_more = len(notes) > 0 and res_json["data"]["has_more"]
+                if on_page is not None:
+                    on_page(notes, cursor, has_more)
+                if not has_more:
                     break
         except Exception as e:
             success = False
@@ -303,7 +351,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -366,7 +414,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -419,12 +467,18 @@ class XHS_Apis():
         """
         res_json = None
         try:
-            # 添加请求延迟
-            add_request_delay(1.0, 3.0)
             urlParse = urllib.parse.urlparse(url)
             note_id = urlParse.path.split("/")[-1]
             kvs = urlParse.query.split('&')
             kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+            xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search"
+            if self.note_cache is not None:
+                cached = self.note_cache.get(note_id, xsec_source)
+                if cached is not None:
+                    return True, cached.get("msg", "成功"), cached
+            # 添加请求延迟
+            add_request_delay(*self.request_delay)
+            self.rate_limiter.acquire()
             api = f"/api/sns/web/v1/feed"
             data = {
                 "source_note_id": note_id,
@@ -436,13 +490,16 @@ class XHS_Apis():
                 "extra": {
                     "need_body_topic": "1"
                 },
-                "xsec_source": kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search",
+                "xsec_source": xsec_source,
                 "xsec_token": kvDist['xsec_token']
             }
             headers, cookies, data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=data, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.post(self.base_url + api, headers=headers, data=data, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
+            # 只缓存包含笔记内容的成功响应
+            if success and self.note_cache is not None and (res_json.get("data") or {}).get("items"):
+                self.note_cache.put(note_id, res_json, xsec_source)
         except Exception as e:
             success = False
             msg = str(e)
@@ -464,7 +521,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -526,7 +583,8 @@ class XHS_Apis():
             geo_str = ""
         try:
             # 添加请求延迟
-            add_request_delay(1.0, 3.0)
+            add_request_delay(*self.request_delay)
+            self.rate_limiter.acquire()
             api = "/api/sns/web/v1/search/notes"
             data = {
                 "keyword": query,
@@ -576,7 +634,7 @@ class XHS_Apis():
                 ]
             }
             headers, cookies, data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -584,7 +642,7 @@ class XHS_Apis():
             msg = str(e)
         return success, msg, res_json
 
-    def search_some_note(self, query: str, require_num: int, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo: dict[str, Any] | None = None, proxies: dict | None = None):
+    def search_some_note(self, query: str, require_num: int, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo: dict[str, Any] | None = None, proxies: dict | None = None, start_page: int = 1, on_page=None):
         """
             指定数量搜索笔记，设置排序方式和笔记类型和笔记数量
             :param query 搜索的关键词
@@ -596,9 +654,11 @@ class XHS_Apis():
             :param note_range 笔记范围 0 不限, 1 已看过, 2 未看过, 3 已关注
             :param pos_distance 位置距离 0 不限, 1 同城, 2 附近 指定这个必须要指定 geo
             :param geo: 定位信息 经纬度
-            返回搜索的结果
+            :param start_page: 从指定页开始（断点续传），默认第 1 页
+            :param on_page: 每取完一页回调 on_page(notes, page, has_more)，用于记录断点
+            返回搜索的结果（从 start_page 开始的部分）
         """
-        page = 1
+        page = start_page
         note_list = []
         try:
             while True:
@@ -606,11 +666,16 @@ class XHS_Apis():
                 if not success:
                     raise Exception(msg)
                 if "items" not in res_json["data"]:
+                    if on_page is not None:
+                        on_page([], page - 1, False)
                     break
                 notes = res_json["data"]["items"]
                 note_list.extend(notes)
+                has_more = bool(res_json["data"]["has_more"])
+                if on_page is not None:
+                    on_page(notes, page, has_more)
                 page += 1
-                if len(note_list) >= require_num or not res_json["data"]["has_more"]:
+                if len(note_list) >= require_num or not has_more:
                     break
         except Exception as e:
             success = False
@@ -641,7 +706,7 @@ class XHS_Apis():
                 }
             }
             headers, cookies, data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -688,6 +753,7 @@ class XHS_Apis():
         """
         res_json = None
         try:
+            self.rate_limiter.acquire()
             api = "/api/sns/web/v2/comment/page"
             params = {
                 "note_id": note_id,
@@ -698,7 +764,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -743,6 +809,7 @@ class XHS_Apis():
         """
         res_json = None
         try:
+            self.rate_limiter.acquire()
             api = "/api/sns/web/v2/comment/sub/page"
             params = {
                 "note_id": comment['note_id'],
@@ -755,7 +822,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -793,11 +860,53 @@ class XHS_Apis():
             msg = str(e)
         return success, msg, comment
 
-    def get_note_all_comment(self, url: str, cookies_str: str, proxies: dict | None = None):
+    def _expand_inner_comments(self, out_comment_list: list, xsec_token: str, cookies_str: str, proxies: dict | None = None, max_workers: int = 4):
+        """
+            并发展开一级评论的二级评论（原地写入 comment['sub_comments']），每个评论楼展开完成后立即产出
+            请求速率由 self.rate_limiter 统一限制
+            产出 (success, msg, comment)，顺序为展开完成的顺序
+        """
+        pending = []
+        for comment in out_comment_list:
+            if comment.get('sub_comment_has_more'):
+                pending.append(comment)
+            else:
+                yield True, 'success', comment
+        if not pending:
+            return
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        try:
+            futures = [executor.submit(self.get_note_all_inner_comment, comment, xsec_token, cookies_str, proxies) for comment in pending]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # 调用方提前停止迭代（或出错）时取消尚未开始的展开任务
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def iter_note_all_comment(self, url: str, cookies_str: str, proxies: dict | None = None, max_workers: int = 4):
+        """
+            流式获取一篇文章的所有评论，每个一级评论连同其全部二级评论展开完成后立即产出
+            :param url: 你想要获取的笔记的url
+            :param cookies_str: 你的cookies
+            :param max_workers: 同时展开的评论楼数量
+            产出 (success, msg, comment)；一级评论获取失败时产出一次 (False, msg, None)
+        """
+        urlParse = urllib.parse.urlparse(url)
+        note_id = urlParse.path.split("/")[-1]
+        kvs = urlParse.query.split('&')
+        kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+        success, msg, out_comment_list = self.get_note_all_out_comment(note_id, kvDist['xsec_token'], cookies_str, proxies)
+        if not success:
+            yield False, msg, None
+            return
+        yield from self._expand_inner_comments(out_comment_list, kvDist['xsec_token'], cookies_str, proxies, max_workers)
+
+    def get_note_all_comment(self, url: str, cookies_str: str, proxies: dict | None = None, max_workers: int = 4):
         """
             获取一篇文章的所有评论
             :param note_id: 你想要获取的笔记的id
             :param cookies_str: 你的cookies
+            :param max_workers: 并发展开二级评论的线程数
             返回一篇文章的所有评论
         """
         out_comment_list = []
@@ -809,14 +918,89 @@ class XHS_Apis():
             success, msg, out_comment_list = self.get_note_all_out_comment(note_id, kvDist['xsec_token'], cookies_str, proxies)
             if not success:
                 raise Exception(msg)
-            for comment in out_comment_list:
-                success, msg, new_comment = self.get_note_all_inner_comment(comment, kvDist['xsec_token'], cookies_str, proxies)
+            with contextlib.closing(self._expand_inner_comments(out_comment_list, kvDist['xsec_token'], cookies_str, proxies, max_workers)) as results:
+                for success, msg, new_comment in results:
+                    if not success:
+                        raise Exception(msg)
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, out_comment_list
+
+    def get_note_budget_comment(self, url: str, cookies_str: str, budget: CommentBudget | None = None, state: CommentCrawlState | None = None, proxies: dict | None = None):
+        """
+            按预算获取一篇文章的评论：一级评论数、每楼二级评论数、总请求数封顶，
+            并按 budget.priority（默认点赞数）优先展开最热门的评论楼
+            :param url: 你想要获取的笔记的url
+            :param cookies_str: 你的cookies
+            :param budget: 抓取预算，默认不限制
+            :param state: 上一次返回的抓取状态，传入即从断点继续
+            返回 (success, msg, comments, state)，预算用尽时 success 为 True 且 state.exhausted 为 True
+        """
+        budget = budget or CommentBudget()
+        urlParse = urllib.parse.urlparse(url)
+        note_id = urlParse.path.split("/")[-1]
+        kvs = urlParse.query.split('&')
+        kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+        xsec_token = kvDist.get('xsec_token', '')
+        if state is None:
+            state = CommentCrawlState(note_id=note_id)
+        state.exhausted = False
+
+        def has_request_budget():
+            if budget.max_requests is not None and state.requests >= budget.max_requests:
+                state.exhausted = True
+                return False
+            return True
+
+        success, msg = True, 'success'
+        try:
+            # 一级评论：翻页直到取完、达到 max_comments 或请求预算用尽
+            while not state.out_done and has_request_budget():
+                success, msg, res_json = self.get_note_out_comment(note_id, state.out_cursor, xsec_token, cookies_str, proxies)
+                state.requests += 1
                 if not success:
                     raise Exception(msg)
+                state.comments.extend(res_json["data"]["comments"])
+                state.out_cursor = str(res_json["data"].get("cursor", ""))
+                if budget.max_comments is not None and len(state.comments) >= budget.max_comments:
+                    del state.comments[budget.max_comments:]
+                    state.out_done = True
+                elif 'cursor' not in res_json["data"] or not res_json["data"]["has_more"]:
+                    state.out_done = True
+
+            # 二级评论：按优先级依次展开
+            sub_done = set(state.sub_done)
+            for comment in order_threads(state.comments, budget.priority):
+                if comment['id'] in sub_done:
+                    continue
+                sub_comments = comment.setdefault('sub_comments', [])
+                cursor = state.sub_cursors.get(comment['id'], comment.get('sub_comment_cursor', ''))
+                has_more = comment.get('sub_comment_has_more', False)
+                while has_more and (budget.max_sub_comments is None or len(sub_comments) < budget.max_sub_comments):
+                    if not has_request_budget():
+                        break
+                    success, msg, res_json = self.get_note_inner_comment(comment, cursor, xsec_token, cookies_str, proxies)
+                    state.requests += 1
+                    if not success:
+                        raise Exception(msg)
+                    sub_comments.extend(res_json["data"]["comments"])
+                    cursor = str(res_json["data"].get("cursor", ""))
+                    state.sub_cursors[comment['id']] = cursor
+                    has_more = 'cursor' in res_json["data"] and res_json["data"]["has_more"]
+                if state.exhausted:
+                    break
+                if budget.max_sub_comments is not None:
+                    del sub_comments[budget.max_sub_comments:]
+                sub_done.add(comment['id'])
+                state.sub_done.append(comment['id'])
+                state.sub_cursors.pop(comment['id'], None)
+            if state.exhausted:
+                msg = f'请求预算用尽({state.requests}/{budget.max_requests})，可传入 state 继续'
         except Exception as e:
             success = False
             msg = str(e)
-        return success, msg, out_comment_list
+        return success, msg, state.comments, state
 
     def get_unread_message(self, cookies_str: str, proxies: dict | None = None):
         """
@@ -828,7 +1012,7 @@ class XHS_Apis():
         try:
             api = "/api/sns/web/unread_count"
             headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -852,7 +1036,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -902,7 +1086,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -952,7 +1136,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
+            response = self.http.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies, verify=False, timeout=(10, 30))
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -0,0 +1,220 @@
+"""
+人声过滤基准：analyze_video / detect_speech_vad / process_media_dir 吞吐与峰值内存
+
+    python -m benchmarks.bench_audio_filter
+    python -m benchmarks.bench_audio_filter --durations 10,60,300 --frame-ms 10,30 --aggressiveness 1,3 --workers 1,4
+
+用 ffmpeg lavfi 在本地生成合成视频（类语音调制音、静音、类音乐和弦、粉红噪声），不需要真实爬取数据
+每个测试用例在独立的子进程中运行，峰值内存取该子进程及其 ffmpeg 子进程的 ru_maxrss
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from loguru import logger
+
+from xhs_utils.audio_filter import analyze_video, detect_speech_vad, extract_audio, process_media_dir
+
+# 合成音轨：类语音为基频抖动的调制音（每秒约 4 个音节，中间有停顿）
+AUDIO_SOURCES = {
+    'speech': "aevalsrc=exprs='0.6*sin(2*PI*(180+40*sin(2*PI*3*t))*t)*gt(sin(2*PI*4*t),-0.3)':s=16000:d={duration}",
+    'silence': 'anullsrc=r=16000:cl=mono,atrim=duration={duration}',
+    'music': "aevalsrc=exprs='0.2*sin(2*PI*440*t)+0.2*sin(2*PI*554*t)+0.2*sin(2*PI*659*t)':s=16000:d={duration}",
+    'noise': 'anoisesrc=color=pink:amplitude=0.3:r=16000:d={duration}',
+}
+
+
+def make_video(path, kind, duration, ffmpeg_path='ffmpeg'):
+    cmd = [
+        ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', AUDIO_SOURCES[kind].format(duration=duration),
+        '-f', 'lavfi', '-i', 'color=c=black:s=64x64:r=5',
+        '-shortest', '-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac',
+        path,
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'生成 {path} 失败: {result.stderr.strip()}')
+
+
+def build_media_tree(base_path, kinds, durations, count, ffmpeg_path='ffmpeg'):
+    """
+    生成与 datas/media_datas 相同结构的目录：<kind>/<kind>_<duration>s_<i>/video.mp4 + info.json
+    :return: [(video_path, kind, duration), ...]
+    """
+    videos = []
+    for kind in kinds:
+        for duration in durations:
+            for index in range(count):
+                note_dir = os.path.join(base_path, kind, f'{kind}_{duration}s_{index}')
+                os.makedirs(note_dir, exist_ok=True)
+                video_path = os.path.join(note_dir, 'video.mp4')
+                if not os.path.exists(video_path):
+                    make_video(video_path, kind, duration, ffmpeg_path)
+                with open(os.path.join(note_dir, 'info.json'), mode='w', encoding='utf-8') as f:
+                    json.dump({'note_id': f'{kind}_{duration}_{index}', 'note_type': '视频'}, f, ensure_ascii=False)
+                videos.append((video_path, kind, duration))
+    return videos
+
+
+def _peak_rss_kb():
+    return {
+        'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+def _run_analyze_video(videos, frame_ms, aggressiveness, ffmpeg_path):
+    detected = 0
+    for video_path, _kind, _duration in videos:
+        detected += analyze_video(
+            video_path, ffmpeg_path=ffmpeg_path, vad_aggressiveness=aggressiveness, vad_frame_ms=frame_ms
+        )["speech_detected"]
+    return {'speech_detected': detected}
+
+
+def _run_detect_speech_vad(wavs, frame_ms, aggressiveness):
+    speech_frames = 0
+    for audio_path in wavs:
+        speech_frames += detect_speech_vad(audio_path, aggressiveness=aggressiveness, frame_ms=frame_ms)["speech_frames"]
+    return {'speech_frames': speech_frames}
+
+
+def _run_process_media_dir(base_path, frame_ms, aggressiveness, workers, ffmpeg_path):
+    summary = process_media_dir(
+        base_path, action='mark', ffmpeg_path=ffmpeg_path, vad_aggressiveness=aggressiveness,
+        vad_frame_ms=frame_ms, force=True, workers=workers,
+    )
+    return {'speech': summary['speech'], 'no_speech': summary['no_speech'], 'errors': summary['errors']}
+
+
+def _run_case(name, kwargs):
+    """
+    在子进程中执行，返回耗时与峰值内存
+    """
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    func = {
+        'analyze_video': _run_analyze_video,
+        'detect_speech_vad': _run_detect_speech_vad,
+        'process_media_dir': _run_process_media_dir,
+    }[name]
+    start = time.perf_counter()
+    outcome = func(**kwargs)
+    elapsed = time.perf_counter() - start
+    return elapsed, outcome, _peak_rss_kb()
+
+
+def run_case(name, kwargs, videos, audio_seconds, repeat):
+    best = None
+    for _ in range(repeat):
+        # spawn 保证每个用例的 ru_maxrss 从干净的进程开始统计
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            elapsed, outcome, peak = executor.submit(_run_case, name, kwargs).result()
+        if best is None or elapsed < best[0]:
+            best = (elapsed, outcome, peak)
+    elapsed, outcome, peak = best
+    params = {key: value for key, value in kwargs.items() if key in ('frame_ms', 'aggressiveness', 'workers')}
+    result = {
+        'bench': name,
+        **params,
+        'videos': videos,
+        'seconds': round(elapsed, 4),
+        'videos_per_s': round(videos / elapsed, 3),
+        'audio_s_per_s': round(audio_seconds / elapsed, 1),
+        'peak_rss_kb': peak['self'],
+        'peak_child_rss_kb': peak['children'],
+        'outcome': outcome,
+    }
+    logger.info(json.dumps(result, ensure_ascii=False))
+    return result
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='人声过滤基准')
+    parser.add_argument('--media-dir', default=None, help='合成媒体目录，默认临时目录（运行后删除）')
+    parser.add_argument('--kinds', default=','.join(AUDIO_SOURCES), help='音轨类型：speech,silence,music,noise')
+    parser.add_argument('--durations', default='5,30,120', help='视频时长（秒），逗号分隔')
+    parser.add_argument('--count', type=int, default=1, help='每种类型、每种时长生成的视频数')
+    parser.add_argument('--frame-ms', default='10,20,30', help='VAD 帧长，逗号分隔')
+    parser.add_argument('--aggressiveness', default='0,2,3', help='VAD 灵敏度，逗号分隔')
+    parser.add_argument('--workers', default='1,2,4', help='process_media_dir 进程数，逗号分隔')
+    parser.add_argument('--benches', default='analyze_video,detect_speech_vad,process_media_dir', help='要运行的基准')
+    parser.add_argument('--repeat', type=int, default=1, help='重复次数，取最快一次')
+    parser.add_argument('--ffmpeg-path', default='ffmpeg', help='ffmpeg 可执行文件路径')
+    parser.add_argument('--output', default=None, help='结果 JSON 保存路径')
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level='INFO')
+
+    kinds = [kind for kind in args.kinds.split(',') if kind]
+    durations = _int_list(args.durations)
+    frame_sizes = _int_list(args.frame_ms)
+    aggressiveness_levels = _int_list(args.aggressiveness)
+    worker_counts = _int_list(args.workers)
+    benches = [bench for bench in args.benches.split(',') if bench]
+
+    base_path = os.path.abspath(args.media_dir) if args.media_dir else tempfile.mkdtemp(prefix='bench_audio_')
+    cleanup = args.media_dir is None
+    try:
+        start = time.perf_counter()
+        media = build_media_tree(base_path, kinds, durations, args.count, args.ffmpeg_path)
+        logger.info(f'生成 {len(media)} 个合成视频，用时 {time.perf_counter() - start:.1f}s: {base_path}')
+        audio_seconds = sum(duration for _path, _kind, duration in media)
+
+        wavs = []
+        if 'detect_speech_vad' in benches:
+            wav_dir = os.path.join(base_path, '_wav')
+            os.makedirs(wav_dir, exist_ok=True)
+            for index, (video_path, _kind, _duration) in enumerate(media):
+                audio_path = os.path.join(wav_dir, f'{index}.wav')
+                extract_audio(video_path, audio_path, args.ffmpeg_path)
+                wavs.append(audio_path)
+
+        results = []
+        for frame_ms in frame_sizes:
+            for aggressiveness in aggressiveness_levels:
+                if 'analyze_video' in benches:
+                    kwargs = {'videos': media, 'frame_ms': frame_ms, 'aggressiveness': aggressiveness, 'ffmpeg_path': args.ffmpeg_path}
+                    results.append(run_case('analyze_video', kwargs, len(media), audio_seconds, args.repeat))
+                if 'detect_speech_vad' in benches:
+                    kwargs = {'wavs': wavs, 'frame_ms': frame_ms, 'aggressiveness': aggressiveness}
+                    results.append(run_case('detect_speech_vad', kwargs, len(wavs), audio_seconds, args.repeat))
+        if 'process_media_dir' in benches:
+            # 进程数对比只用默认参数，避免组合爆炸
+            for workers in worker_counts:
+                kwargs = {'base_path': base_path, 'frame_ms': 30, 'aggressiveness': 2, 'workers': workers, 'ffmpeg_path': args.ffmpeg_path}
+                results.append(run_case('process_media_dir', kwargs, len(media), audio_seconds, args.repeat))
+    finally:
+        if cleanup:
+            shutil.rmtree(base_path, ignore_errors=True)
+
+    report = {
+        'kinds': kinds,
+        'durations': durations,
+        'count': args.count,
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""
+端到端爬取基准：在本地模拟服务上运行搜索爬取、用户笔记爬取和评论抓取
+
+    python -m benchmarks.bench_crawl
+    python -m benchmarks.bench_crawl --notes 100 --latency 0.05 --comment-workers 8 --output bench_crawl.json
+
+输出 notes/s、requests/s、签名耗时占比、下载字节/s、各接口 p50/p95 延迟（客户端往返）与峰值 RSS，
+结果保存为 JSON，便于跨提交对比
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+import requests
+import urllib3
+from loguru import logger
+
+import apis.xhs_pc_apis as xhs_pc_apis
+from apis.xhs_pc_apis import XHS_Apis
+from benchmarks.fixtures import make_user_id
+from benchmarks.mock_xhs_server import MockConfig, MockXHSServer, xsec_token
+from main import Data_Spider
+from xhs_utils.rate_limiter import RateLimiter
+
+MOCK_COOKIES = 'a1=18f0c0ffee0000000000000000000000000000; webId=mock; web_session=mock'
+
+
+class CrawlProbe:
+    """
+    统计签名耗时与每个请求的往返延迟/字节数
+    通过替换 apis.xhs_pc_apis.generate_request_params 与 requests.Session.request 实现，原函数照常执行
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+        self._original_sign = None
+        self._original_request = None
+
+    def reset(self):
+        with self._lock:
+            self.sign_seconds = 0.0
+            self.sign_calls = 0
+            self.latencies = {}
+            self.bytes = 0
+            self.requests = 0
+
+    @staticmethod
+    def endpoint(url):
+        path = urlparse(url).path
+        if path.startswith('/cdn/'):
+            return '/'.join(path.split('/')[:3])
+        return path
+
+    def install(self):
+        probe = self
+        self._original_sign = original_sign = xhs_pc_apis.generate_request_params
+        self._original_request = original_request = requests.Session.request
+
+        def timed_sign(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original_sign(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with probe._lock:
+                    probe.sign_seconds += elapsed
+                    probe.sign_calls += 1
+
+        def timed_request(session, method, url, *args, **kwargs):
+            start = time.perf_counter()
+            response = original_request(session, method, url, *args, **kwargs)
+            elapsed = time.perf_counter() - start
+            size = len(response.content)
+            with probe._lock:
+                probe.latencies.setdefault(probe.endpoint(url), []).append(elapsed)
+                probe.bytes += size
+                probe.requests += 1
+            return response
+
+        xhs_pc_apis.generate_request_params = timed_sign
+        requests.Session.request = timed_request
+
+    def uninstall(self):
+        xhs_pc_apis.generate_request_params = self._original_sign
+        requests.Session.request = self._original_request
+
+    def report(self, elapsed, notes):
+        with self._lock:
+            endpoints = {
+                endpoint: {
+                    'requests': len(values),
+                    'p50_ms': round(float(np.percentile(values, 50)) * 1000, 2),
+                    'p95_ms': round(float(np.percentile(values, 95)) * 1000, 2),
+                }
+                for endpoint, values in sorted(self.latencies.items())
+            }
+            return {
+                'seconds': round(elapsed, 3),
+                'notes': notes,
+                'notes_per_s': round(notes / elapsed, 2) if elapsed else None,
+                'requests': self.requests,
+                'requests_per_s': round(self.requests / elapsed, 2) if elapsed else None,
+                'sign_calls': self.sign_calls,
+                'sign_seconds': round(self.sign_seconds, 3),
+                'sign_share': round(self.sign_seconds / elapsed, 4) if elapsed else None,
+                'bytes': self.bytes,
+                'bytes_per_s': round(self.bytes / elapsed) if elapsed else None,
+                'endpoints': endpoints,
+                'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            }
+
+
+def run_scenario(name, probe, func):
+    """
+    运行一个场景并统计指标
+    :param func: 返回 (notes, errors)，errors 为接口返回的失败信息列表；非空时场景记为失败，吞吐数据不可用于对比
+    """
+    probe.reset()
+    start = time.perf_counter()
+    notes, errors = func()
+    result = {'scenario': name, 'success': not errors, 'errors': errors, **probe.report(time.perf_counter() - start, notes)}
+    if errors:
+        logger.error(f"{name}: 场景失败 {errors[:3]}")
+    else:
+        logger.info(f"{name}: {result['notes_per_s']} notes/s, {result['requests_per_s']} req/s, 签名占比 {result['sign_share']}")
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='端到端爬取基准（本地模拟服务）')
+    parser.add_argument('--notes', type=int, default=40, help='搜索爬取的笔记数')
+    parser.add_argument('--user-notes', type=int, default=30, help='用户笔记爬取的笔记数')
+    parser.add_argument('--comment-notes', type=int, default=5, help='抓取评论的笔记数')
+    parser.add_argument('--comments', type=int, default=30, help='每篇笔记的一级评论数')
+    parser.add_argument('--comment-workers', type=int, default=4, help='二级评论并发展开线程数')
+    parser.add_argument('--rate', type=float, default=1000.0, help='评论接口限速（请求/秒）')
+    parser.add_argument('--save-choice', default='media', choices=['media', 'media-video', 'media-image', 'all', 'excel'], help='笔记保存方式')
+    parser.add_argument('--latency', type=float, default=0.0, help='模拟服务固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='模拟服务随机附加延迟上限（秒）')
+    parser.add_argument('--risk-rate', type=float, default=0.0, help='300013 风控注入概率')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='HTTP 500 注入概率')
+    parser.add_argument('--video-bytes', type=int, default=200_000, help='视频响应大小')
+    parser.add_argument('--scenarios', default='search,user,comments', help='要运行的场景')
+    parser.add_argument('--output', default=None, help='结果 JSON 保存路径')
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    logger.add(sys.stderr, level='INFO', filter=__name__)
+    urllib3.disable_warnings()
+
+    config = MockConfig(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, risk_rate=args.risk_rate,
+        search_results=args.notes, user_notes=args.user_notes, comments_per_note=args.comments,
+        video_bytes=args.video_bytes,
+    )
+    scenarios = [name for name in args.scenarios.split(',') if name]
+    work_dir = tempfile.mkdtemp(prefix='bench_crawl_')
+    base_path = {'media': os.path.join(work_dir, 'media'), 'excel': os.path.join(work_dir, 'excel')}
+    for path in base_path.values():
+        os.makedirs(path, exist_ok=True)
+
+    probe = CrawlProbe()
+    probe.install()
+    results = []
+    try:
+        with MockXHSServer(config=config) as server:
+            xhs_apis = XHS_Apis(
+                rate_limiter=RateLimiter(rate=args.rate, burst=max(1, args.comment_workers)),
+                base_url=server.base_url, request_delay=(0.0, 0.0), retry_delay=0.0,
+            )
+            data_spider = Data_Spider(xhs_apis=xhs_apis, note_delay=(0.0, 0.0), cooling_delay=(0.0, 0.0))
+
+            if 'search' in scenarios:
+                def crawl_search():
+                    note_urls, success, msg = data_spider.spider_some_search_note(
+                        'bench', args.notes, MOCK_COOKIES, base_path, args.save_choice, excel_name='bench'
+                    )
+                    return len(note_urls), [] if success else [str(msg)]
+                results.append(run_scenario('search', probe, crawl_search))
+
+            if 'user' in scenarios:
+                user_id = make_user_id(1)
+                user_url = f'https://www.xiaohongshu.com/user/profile/{user_id}?xsec_token={xsec_token(user_id)}&xsec_source=pc_feed'
+
+                def crawl_user():
+                    note_urls, success, msg = data_spider.spider_user_all_note(user_url, MOCK_COOKIES, base_path, args.save_choice)
+                    return len(note_urls), [] if success else [str(msg)]
+                results.append(run_scenario('user', probe, crawl_user))
+
+            if 'comments' in scenarios:
+                success, msg, items = xhs_apis.search_some_note('bench-comments', args.comment_notes, MOCK_COOKIES)
+                if not success:
+                    raise RuntimeError(f'评论场景准备失败: {msg}')
+                note_urls = [f"https://www.xiaohongshu.com/explore/{item['id']}?xsec_token={item['xsec_token']}" for item in items]
+
+                def crawl_comments():
+                    errors = []
+                    for note_url in note_urls:
+                        success, msg, _ = xhs_apis.get_note_all_comment(note_url, MOCK_COOKIES, max_workers=args.comment_workers)
+                        if not success:
+                            errors.append(str(msg))
+                    return len(note_urls), errors
+                results.append(run_scenario('comments', probe, crawl_comments))
+            server_stats = server.stats
+    finally:
+        probe.uninstall()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'revision': git_revision(),
+        'config': vars(args),
+        'results': results,
+        'server': server_stats,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    if not all(result['success'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
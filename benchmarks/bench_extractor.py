@@ -0,0 +1,91 @@
+"""
+解析基准：handle_note_info / handle_comment_info 每条耗时
+
+    python -m benchmarks.bench_extractor --synthetic 5000
+    python -m benchmarks.bench_extractor --corpus datas/feed_corpus.jsonl
+
+语料为 JSONL，每行可以是 feed 接口的完整响应（取 data.items）或单条 items[i]
+"""
+import argparse
+import json
+import sys
+import time
+
+from loguru import logger
+
+from benchmarks.fixtures import make_comment, make_note_card
+from xhs_utils.data_util import extract_note, handle_comment_info, handle_note_info
+
+
+def load_corpus(path):
+    items = []
+    with open(path, mode='r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            if 'note_card' in obj:
+                items.append(obj)
+            else:
+                items.extend((obj.get('data') or {}).get('items') or [])
+    for item in items:
+        item.setdefault('note_card', {}).setdefault('note_url', f"https://www.xiaohongshu.com/explore/{item.get('id', '')}")
+    return items
+
+
+def synthetic_corpus(count):
+    items = []
+    for index in range(count):
+        item = make_note_card(index)
+        item['note_card']['note_url'] = f"https://www.xiaohongshu.com/explore/{item['id']}"
+        items.append(item)
+    return items
+
+
+def time_per_item(func, items, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / max(len(items), 1) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析基准')
+    parser.add_argument('--corpus', default=None, help='JSONL 语料（feed 响应或 items）')
+    parser.add_argument('--synthetic', type=int, default=2000, help='未指定语料时生成的合成笔记数')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数，取最快一次')
+    parser.add_argument('--output', default=None, help='结果 JSON 保存路径')
+    args = parser.parse_args()
+
+    # 基准只关心解析本身，屏蔽逐条 info 日志
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+
+    items = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.synthetic)
+    comments = []
+    for index, item in enumerate(items):
+        comment = make_comment(item['note_card'].get('note_id', ''), index)
+        comment['note_url'] = item['note_card']['note_url']
+        comments.append(comment)
+
+    result = {
+        'corpus': args.corpus or f'synthetic:{len(items)}',
+        'notes': len(items),
+        'extract_note_us': round(time_per_item(extract_note, items, args.repeat), 3),
+        'handle_note_info_us': round(time_per_item(handle_note_info, items, args.repeat), 3),
+        'handle_comment_info_us': round(time_per_item(handle_comment_info, comments, args.repeat), 3),
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
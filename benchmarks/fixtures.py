@@ -0,0 +1,99 @@
+"""
+合成的小红书接口数据，结构与 /api/sns/web/v1/feed 等接口返回保持一致，
+用于解析基准和本地模拟服务，不依赖真实账号和网络
+"""
+import random
+import time
+
+CDN_BASE = 'https://sns-webpic-qc.xhscdn.com'
+VIDEO_CDN_BASE = 'https://sns-video-bd.xhscdn.com'
+
+
+def make_note_id(index):
+    return f'{0x64000000 + index:08x}0000000012{index % 0x10000:04x}'
+
+
+def make_user_id(index):
+    return f'{0x5f000000 + index:08x}000000000100{index % 0x100:02x}'
+
+
+def make_note_card(index, video=None, cdn_base=CDN_BASE, video_cdn_base=VIDEO_CDN_BASE, rng=None):
+    """
+    生成一条 feed 接口中的 items[i]
+    :param index: 序号，决定 note_id/user_id
+    :param video: 是否为视频笔记，None 则按序号交替
+    :param cdn_base: 图片 CDN 前缀
+    :param video_cdn_base: 视频 CDN 前缀
+    """
+    rng = rng or random.Random(index)
+    if video is None:
+        video = index % 2 == 0
+    note_id = make_note_id(index)
+    user_id = make_user_id(index % 97)
+    image_count = 1 if video else rng.randint(1, 9)
+    image_list = [
+        {
+            'info_list': [
+                {'image_scene': 'WB_PRV', 'url': f'{cdn_base}/prv/{note_id}_{i}.jpg'},
+                {'image_scene': 'WB_DFT', 'url': f'{cdn_base}/dft/{note_id}_{i}.jpg'},
+            ],
+            'width': 1080,
+            'height': 1440,
+        }
+        for i in range(image_count)
+    ]
+    note_card = {
+        'note_id': note_id,
+        'type': 'video' if video else 'normal',
+        'title': f'合成笔记 {index} 阿克苏苹果',
+        'desc': f'这是第 {index} 条合成笔记的正文 #冰糖心[话题]# #新疆[话题]#',
+        'user': {'user_id': user_id, 'nickname': f'用户{index % 97}', 'avatar': f'{cdn_base}/avatar/{user_id}.jpg'},
+        'interact_info': {
+            'liked_count': rng.choice([str(rng.randint(0, 9999)), f'{rng.randint(1, 99)}.{rng.randint(0, 9)}万', '10万+']),
+            'collected_count': str(rng.randint(0, 5000)),
+            'comment_count': str(rng.randint(0, 800)),
+            'share_count': str(rng.randint(0, 300)),
+        },
+        'image_list': image_list,
+        'tag_list': [{'id': f't{j}', 'name': name, 'type': 'topic'} for j, name in enumerate(('冰糖心', '新疆'))],
+        'time': int(time.time() * 1000) - index * 3600_000,
+        'ip_location': '新疆',
+    }
+    if video:
+        note_card['video'] = {
+            'consumer': {'origin_video_key': f'pre_post/{note_id}'},
+            'media': {
+                'stream': {
+                    'h264': [{'master_url': f'{video_cdn_base}/stream/{note_id}_h264.mp4', 'size': 1024}],
+                    'h265': [],
+                    'av1': [],
+                },
+            },
+        }
+    return {'id': note_id, 'model_type': 'note', 'note_card': note_card}
+
+
+def make_comment(note_id, index, sub_comment_count=0, rng=None):
+    """
+    生成一条一级/二级评论
+    :param note_id: 所属笔记
+    :param index: 序号
+    :param sub_comment_count: 子评论总数（一级评论）
+    """
+    rng = rng or random.Random(hash((note_id, index)))
+    comment_id = f'{note_id[:16]}c{index:07d}'
+    return {
+        'id': comment_id,
+        'note_id': note_id,
+        'content': f'第 {index} 条评论 看起来很好吃',
+        'like_count': str(rng.randint(0, 2000)),
+        'create_time': int(time.time() * 1000) - index * 60_000,
+        'ip_location': '上海',
+        'show_tags': [],
+        'user_info': {'user_id': make_user_id(index), 'nickname': f'评论用户{index}', 'image': ''},
+        'sub_comment_count': str(sub_comment_count),
+        'sub_comment_cursor': '',
+        'sub_comment_has_more': sub_comment_count > 0,
+        'sub_comments': [],
+        'pictures': [],
+    }
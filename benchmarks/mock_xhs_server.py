@@ -0,0 +1,342 @@
+"""
+本地模拟小红书接口服务，用于离线压测与回归测试
+
+    python -m benchmarks.mock_xhs_server --port 5005 --latency 0.05 --risk-rate 0.02
+    XHS_BASE_URL=http://127.0.0.1:5005 XHS_REQUEST_DELAY=0 python main.py
+
+覆盖 XHS_Apis 使用的接口：笔记详情 feed、搜索笔记、用户笔记 user_posted、一级/二级评论、主页推荐与频道、用户信息，
+以及 /cdn/ 下的图片/视频下载；返回的媒体地址都指向本服务。可配置延迟、错误率与 300013 风控注入。
+也可以在代码中直接使用：
+
+    with MockXHSServer(config=MockConfig(latency=0.02)) as server:
+        apis = XHS_Apis(base_url=server.base_url, request_delay=(0, 0), retry_delay=0)
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from loguru import logger
+
+from benchmarks.fixtures import make_comment, make_note_card, make_note_id, make_user_id
+
+NOTE_ID_BASE = 0x64000000
+USER_ID_BASE = 0x5f000000
+RISK_MSG = '访问频繁，请稍后再试'
+
+
+@dataclass
+class MockConfig:
+    """
+    模拟服务配置
+    :param latency: 每个请求的固定延迟（秒）
+    :param jitter: 在固定延迟上叠加的随机延迟上限（秒）
+    :param error_rate: 返回 HTTP 500 的概率
+    :param risk_rate: 返回 300013 风控响应的概率（仅接口，不含 CDN）
+    :param search_results: 每个关键词的搜索结果总数
+    :param user_notes: 每个用户的笔记总数
+    :param comments_per_note: 每篇笔记的一级评论数
+    :param sub_comments: 有楼中楼的一级评论（每 3 条一条）的二级评论数
+    :param comment_page_size: 一级评论每页条数
+    :param image_bytes: 图片响应大小
+    :param video_bytes: 视频响应大小（未指定 video_file 时）
+    :param video_file: 作为视频响应返回的本地文件，便于与人声检测联调
+    :param seed: 注入错误使用的随机种子
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    risk_rate: float = 0.0
+    search_results: int = 200
+    user_notes: int = 90
+    comments_per_note: int = 30
+    sub_comments: int = 12
+    comment_page_size: int = 10
+    image_bytes: int = 20_000
+    video_bytes: int = 200_000
+    video_file: str | None = None
+    seed: int = 0
+
+
+def xsec_token(note_id):
+    return f'AB{zlib.crc32(note_id.encode()):08x}mock='
+
+
+def note_index(note_id):
+    return int(note_id[:8], 16) - NOTE_ID_BASE
+
+
+def user_index(user_id):
+    return int(user_id[:8], 16) - USER_ID_BASE
+
+
+def _offset(cursor):
+    return int(cursor) if cursor and cursor.isdigit() else 0
+
+
+class MockXHS:
+    """
+    模拟接口的数据与注入逻辑，与 HTTP 层分离
+    """
+
+    def __init__(self, config=None):
+        self.config = config or MockConfig()
+        self.base_url = ''
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self.stats = {}
+        self._image_body = b'\xff\xd8\xff\xe0' + bytes(max(0, self.config.image_bytes - 4))
+        if self.config.video_file:
+            with open(self.config.video_file, mode='rb') as f:
+                self._video_body = f.read()
+        else:
+            self._video_body = bytes(self.config.video_bytes)
+        self.routes = {
+            ('POST', '/api/sns/web/v1/feed'): self.feed,
+            ('POST', '/api/sns/web/v1/search/notes'): self.search_notes,
+            ('GET', '/api/sns/web/v1/user_posted'): self.user_posted,
+            ('GET', '/api/sns/web/v1/user/otherinfo'): self.user_info,
+            ('GET', '/api/sns/web/v2/comment/page'): self.comment_page,
+            ('GET', '/api/sns/web/v2/comment/sub/page'): self.sub_comment_page,
+            ('POST', '/api/sns/web/v1/homefeed'): self.homefeed,
+            ('GET', '/api/sns/web/v1/homefeed/category'): self.homefeed_category,
+        }
+
+    def record(self, endpoint, status, size):
+        with self._lock:
+            item = self.stats.setdefault(endpoint, {'requests': 0, 'errors': 0, 'risk': 0, 'bytes': 0})
+            item['requests'] += 1
+            item['bytes'] += size
+            if status == 'error':
+                item['errors'] += 1
+            elif status == 'risk':
+                item['risk'] += 1
+
+    def inject(self, is_api):
+        """
+        :return: None 正常响应 / 'error' / 'risk'
+        """
+        config = self.config
+        with self._lock:
+            delay = config.latency + (self._rng.uniform(0, config.jitter) if config.jitter else 0.0)
+            roll = self._rng.random()
+        if delay > 0:
+            time.sleep(delay)
+        if roll < config.error_rate:
+            return 'error'
+        if is_api and roll < config.error_rate + config.risk_rate:
+            return 'risk'
+        return None
+
+    def _note_item(self, index):
+        item = make_note_card(
+            index, cdn_base=f'{self.base_url}/cdn/img', video_cdn_base=f'{self.base_url}/cdn/video'
+        )
+        item['xsec_token'] = xsec_token(item['id'])
+        return item
+
+    def feed(self, query, body):
+        note_id = body.get('source_note_id', '')
+        return {'items': [self._note_item(note_index(note_id))]}
+
+    def search_notes(self, query, body):
+        keyword = body.get('keyword', '')
+        page = int(body.get('page', 1))
+        page_size = int(body.get('page_size', 20))
+        base = (zlib.crc32(keyword.encode()) % 10000) * 1000
+        start = (page - 1) * page_size
+        end = min(start + page_size, self.config.search_results)
+        items = [self._note_item(base + position) for position in range(start, end)]
+        return {'items': items, 'has_more': end < self.config.search_results}
+
+    def user_posted(self, query, body):
+        user_id = query.get('user_id', '')
+        start = _offset(query.get('cursor', ''))
+        end = min(start + int(query.get('num', 30)), self.config.user_notes)
+        base = 5_000_000 + user_index(user_id) * 10000
+        notes = []
+        for position in range(start, end):
+            note_id = make_note_id(base + position)
+            notes.append({
+                'note_id': note_id,
+                'xsec_token': xsec_token(note_id),
+                'type': 'video' if position % 2 == 0 else 'normal',
+                'display_title': f'合成笔记 {base + position}',
+                'user': {'user_id': user_id},
+            })
+        return {'notes': notes, 'cursor': str(end), 'has_more': end < self.config.user_notes}
+
+    def user_info(self, query, body):
+        user_id = query.get('target_user_id') or query.get('user_id') or make_user_id(0)
+        return {
+            'basic_info': {'user_id': user_id, 'nickname': f'用户{user_index(user_id)}', 'image': f'{self.base_url}/cdn/img/avatar/{user_id}.jpg', 'desc': ''},
+            'interactions': [{'type': 'follows', 'count': '10'}, {'type': 'fans', 'count': '100'}, {'type': 'interaction', 'count': '1000'}],
+            'tags': [{'name': '新疆'}],
+        }
+
+    def comment_page(self, query, body):
+        note_id = query.get('note_id', '')
+        start = _offset(query.get('cursor', ''))
+        end = min(start + self.config.comment_page_size, self.config.comments_per_note)
+        comments = [
+            make_comment(note_id, index, sub_comment_count=self.config.sub_comments if index % 3 == 0 else 0)
+            for index in range(start, end)
+        ]
+        return {'comments': comments, 'cursor': str(end), 'has_more': end < self.config.comments_per_note}
+
+    def sub_comment_page(self, query, body):
+        note_id = query.get('note_id', '')
+        root = int(query.get('root_comment_id', '0')[-7:] or 0)
+        start = _offset(query.get('cursor', ''))
+        end = min(start + int(query.get('num', 10)), self.config.sub_comments)
+        comments = [make_comment(note_id, 1_000_000 + root * 1000 + index) for index in range(start, end)]
+        return {'comments': comments, 'cursor': str(end), 'has_more': end < self.config.sub_comments}
+
+    def homefeed(self, query, body):
+        start = int(body.get('note_index', 0))
+        items = [self._note_item(9_000_000 + start + offset) for offset in range(int(body.get('num', 20)))]
+        return {'items': items, 'cursor_score': f'{start + len(items)}'}
+
+    def homefeed_category(self, query, body):
+        return {'categories': [{'id': 'homefeed_recommend', 'name': '推荐'}, {'id': 'homefeed.food_v3', 'name': '美食'}]}
+
+    def media(self, path):
+        return self._video_body if path.startswith('/cdn/video/') else self._image_body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        mock = self.server.mock
+        parsed = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if method == 'GET' and parsed.path.startswith('/cdn/'):
+            endpoint = '/cdn/video' if parsed.path.startswith('/cdn/video/') else '/cdn/img'
+            if mock.inject(is_api=False) == 'error':
+                self._send(500, b'mock error', 'text/plain')
+                mock.record(endpoint, 'error', 0)
+                return
+            body = mock.media(parsed.path)
+            self._send(200, body, 'video/mp4' if endpoint == '/cdn/video' else 'image/jpeg')
+            mock.record(endpoint, None, len(body))
+            return
+
+        route = mock.routes.get((method, parsed.path))
+        if route is None:
+            self._send(404, b'not found', 'text/plain')
+            mock.record(parsed.path, 'error', 0)
+            return
+        status = mock.inject(is_api=True)
+        if status == 'error':
+            self._send(500, b'mock error', 'text/plain')
+            mock.record(parsed.path, status, 0)
+            return
+        if status == 'risk':
+            payload = {'code': 300013, 'success': False, 'msg': RISK_MSG, 'data': {}}
+        else:
+            query = {key: values[0] for key, values in parse_qs(parsed.query, keep_blank_values=True).items()}
+            try:
+                data = json.loads(raw) if raw else {}
+            except json.JSONDecodeError:
+                data = {}
+            payload = {'code': 0, 'success': True, 'msg': '成功', 'data': route(query, data)}
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self._send(200, body, 'application/json; charset=utf-8')
+        mock.record(parsed.path, status, len(body))
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+
+class MockXHSServer:
+    """
+    在后台线程中运行的模拟服务
+    :param host: 监听地址
+    :param port: 端口，0 表示随机空闲端口
+    :param config: MockConfig
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, config=None):
+        self.mock = MockXHS(config)
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self.mock
+        host, port = self.httpd.server_address[:2]
+        self.base_url = f'http://{host}:{port}'
+        self.mock.base_url = self.base_url
+        self._thread = None
+
+    @property
+    def stats(self):
+        return self.mock.stats
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟小红书接口服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5005)
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='随机附加延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='HTTP 500 概率')
+    parser.add_argument('--risk-rate', type=float, default=0.0, help='300013 风控响应概率')
+    parser.add_argument('--search-results', type=int, default=200, help='每个关键词的搜索结果数')
+    parser.add_argument('--user-notes', type=int, default=90, help='每个用户的笔记数')
+    parser.add_argument('--comments', type=int, default=30, help='每篇笔记的一级评论数')
+    parser.add_argument('--sub-comments', type=int, default=12, help='楼中楼二级评论数')
+    parser.add_argument('--video-file', default=None, help='作为视频响应返回的本地 mp4')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, risk_rate=args.risk_rate,
+        search_results=args.search_results, user_notes=args.user_notes, comments_per_note=args.comments,
+        sub_comments=args.sub_comments, video_file=args.video_file, seed=args.seed,
+    )
+    server = MockXHSServer(args.host, args.port, config)
+    logger.info(f'模拟服务已启动: {server.base_url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        logger.info(f'请求统计: {json.dumps(server.stats, ensure_ascii=False)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,41 @@
+import argparse
 import json
+import multiprocessing
 import os
 import random
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Any
+from dotenv import load_dotenv
 from loguru import logger
 from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.audio_filter import SpeechFilterStage
 from xhs_utils.common_util import init, load_keywords_config
 from xhs_utils.data_util import handle_note_info, download_note, save_to_xlsx
+from xhs_utils.http_cassette import RECORD, REPLAY, HttpCassette
+from xhs_utils.metrics import start_metrics_server
+from xhs_utils.note_cache import NoteCache
 from xhs_utils.path_util import is_note_downloaded, extract_note_id_from_url
+from xhs_utils.profiling import enable_profiling
+from xhs_utils.records import NoteRecord
+from xhs_utils.search_index import NoteSearchIndex
+from xhs_utils.task_store import DONE, FAILED, FETCHED, TaskStore
 
 
 class Data_Spider:
-    def __init__(self) -> None:
-        self.xhs_apis: XHS_Apis = XHS_Apis()
+    def __init__(self, search_index: NoteSearchIndex | None = None, speech_stage: SpeechFilterStage | None = None, xhs_apis: XHS_Apis | None = None, note_delay: tuple[float, float] = (2.0, 4.0), cooling_delay: tuple[float, float] = (10.0, 20.0), task_store: TaskStore | None = None) -> None:
+        self.xhs_apis: XHS_Apis = xhs_apis if xhs_apis is not None else XHS_Apis()
+        # 笔记之间的随机间隔与每 10 个笔记的冷却时间（秒），压测本地模拟服务时可设为 (0, 0)
+        self.note_delay: tuple[float, float] = note_delay
+        self.cooling_delay: tuple[float, float] = cooling_delay
+        # 可选：笔记保存后增量写入本地全文索引
+        self.search_index: NoteSearchIndex | None = search_index
+        # 可选：视频下载完成后立即在后台做人声检测
+        self.speech_stage: SpeechFilterStage | None = speech_stage
+        # 可选：记录列表页断点和每个笔记的状态，中断后从最后完成的页和未完成的笔记继续
+        self.task_store: TaskStore | None = task_store
 
-    def spider_note(self, note_url: str, cookies_str: str, proxies: dict | None = None) -> tuple[bool, str, dict | None]:
+    def spider_note(self, note_url: str, cookies_str: str, proxies: dict | None = None) -> tuple[bool, str, NoteRecord | None]:
         """
         爬取一个笔记的信息
         :param note_url: 笔记 URL
@@ -22,7 +43,7 @@ class Data_Spider:
         :param proxies: 代理配置
         :return: (success, msg, note_info)
         """
-        note_info: dict | None = None
+        note_info: dict | NoteRecord | None = None
         try:
             success, msg, note_info = self.xhs_apis.get_note_info(note_url, cookies_str, proxies)
 
@@ -77,7 +98,7 @@ class Data_Spider:
         logger.info(f'爬取笔记信息 {note_url}: {success}, msg: {msg}')
         return success, msg, note_info
 
-    def spider_some_note(self, notes: list[str], cookies_str: str, base_path: dict[str, str], save_choice: str, excel_name: str = '', proxies: dict | None = None, keyword: str | None = None, resume: bool = False) -> None:
+    def spider_some_note(self, notes: list[str], cookies_str: str, base_path: dict[str, str], save_choice: str, excel_name: str = '', proxies: dict | None = None, keyword: str | None = None, resume: bool = False, job_key: str | None = None) -> None:
         """
         爬取一些笔记的信息
         :param notes: 笔记URL列表
@@ -88,21 +109,47 @@ class Data_Spider:
         :param proxies: 代理配置
         :param keyword: 搜索关键词
         :param resume: 是否启用断点续传，跳过已下载的笔记
+        :param job_key: task_store 中的任务键；已获取详情的笔记不再请求，已保存的笔记不再下载
         :return:
         """
         if save_choice in ('all', 'excel') and excel_name == '':
             raise ValueError('excel_name 不能为空')
+        tracked = self.task_store is not None and job_key is not None
+        note_states: dict[str, dict] = {}
+        if tracked:
+            self.task_store.add_notes(job_key, [(self._note_key(note_url), note_url) for note_url in notes])
+            note_states = self.task_store.note_states(job_key)
+        restored_count = 0
+        saved_keys: set[str] = set()
         consecutive_success = 0
-        note_list = []
+        # 使用 __slots__ 记录类暂存，导出时才转换为 dict
+        note_list: list[NoteRecord] = []
+        # 与 note_list 一一对应的任务记录键（_note_key，URL 中取不到 note_id 时为完整 URL）
+        note_keys: list[str] = []
         skipped_count = 0
         downloaded_count = 0
         for idx, note_url in enumerate(notes):
+            note_key = self._note_key(note_url)
+            state = note_states.get(note_key)
+            if state is not None and state['status'] in (FETCHED, DONE) and state['record']:
+                # 上次已获取详情，直接使用记录，不请求也不等待
+                note_info = NoteRecord.from_dict(state['record'])
+                note_list.append(note_info)
+                note_keys.append(note_key)
+                if state['status'] == DONE:
+                    saved_keys.add(note_key)
+                restored_count += 1
+                continue
             success, msg, note_info = self.spider_note(note_url, cookies_str, proxies)
             if not success:
                 consecutive_success = 0
                 if '300013' in msg or '访问频繁' in msg:
                     logger.error(f"触发小红书风控(300013)，建议：1. 等待 10-30 分钟后重试 2. 使用代理 3. 降低请求频率")
+                if tracked:
+                    self.task_store.mark_note(job_key, note_key, FAILED, error=msg)
             if note_info is not None and success:
+                if tracked:
+                    self.task_store.mark_note(job_key, note_key, FETCHED, record=note_info.to_dict())
                 # 检查是否已下载（仅在resume=True时）
                 if resume:
                     is_downloaded = is_note_downloaded(
@@ -117,41 +164,101 @@ class Data_Spider:
                         logger.info(f"跳过已下载笔记: {note_info['note_id']} - {note_info['title'][:30]}...")
                         skipped_count += 1
                         note_list.append(note_info)  # 仍加入列表用于Excel
+                        note_keys.append(note_key)
                         continue
                 note_list.append(note_info)
+                note_keys.append(note_key)
                 consecutive_success += 1
             # Add delay between notes (not after last one)
             if idx < len(notes) - 1:
-                delay = random.uniform(2.0, 4.0)
+                delay = random.uniform(*self.note_delay)
                 logger.debug(f"笔记处理间隔延迟: {delay:.1f} 秒")
                 time.sleep(delay)
                 # Smart cooling: long pause every 10 successful requests
                 if consecutive_success >= 10:
-                    cooling_delay = random.uniform(10.0, 20.0)
-                    logger.info(f"连续获取10个笔记，冷却 {cooling_delay:.1f} 秒...")
-                    time.sleep(cooling_delay)
+                    cooling_delay = random.uniform(*self.cooling_delay)
+                    if cooling_delay > 0:
+                        logger.info(f"连续获取10个笔记，冷却 {cooling_delay:.1f} 秒...")
+                        time.sleep(cooling_delay)
                     consecutive_success = 0
         # 输出跳过统计
         if resume:
             logger.info(f"断点续传统计: 跳过 {skipped_count} 个已下载笔记，处理 {len(note_list) - skipped_count} 个新笔记")
-        for note_info in note_list:
+        if restored_count:
+            logger.info(f"任务记录恢复 {restored_count} 个已获取的笔记（其中 {len(saved_keys)} 个已保存）")
+        note_dirs: list[str | None] = [None] * len(note_list)
+        for note_idx, note_info in enumerate(note_list):
+            if note_keys[note_idx] in saved_keys:
+                continue
+            failed_media: list[str] = []
             if save_choice in ('all', 'media', 'media-video', 'media-image'):
-                # Convert save_choice to boolean for download_media_files parameter
-                if save_choice == 'media-video':
-                    # Only download if it's a video note
-                    should_download = note_info.get('note_type') == '视频'
-                elif save_choice == 'media-image':
-                    # Only download if it's an image note
-                    should_download = note_info.get('note_type') != '视频'
+                should_download = self.should_download(note_info, save_choice)
+                note_dirs[note_idx] = download_note(note_info, base_path['media'], should_download, http=self.xhs_apis.http, failed=failed_media)
+                if self.speech_stage is not None and should_download:
+                    self.speech_stage.submit(note_dirs[note_idx])
+            if tracked:
+                if failed_media:
+                    # 保持 FETCHED，下次续传时用已保存的记录重新下载
+                    logger.warning(f"笔记 {note_info['note_id']} 有 {len(failed_media)} 个媒体文件下载失败，未标记完成")
                 else:
-                    # 'all' or 'media' - download all media
-                    should_download = True
-                download_note(note_info, base_path['media'], should_download)
+                    self.task_store.mark_note(job_key, note_keys[note_idx], DONE)
+        if self.search_index is not None and note_list:
+            try:
+                self.search_index.add_notes(note_list, keyword=keyword, note_dirs=note_dirs)
+            except Exception as e:
+                logger.error(f'写入全文索引失败: {e}')
         if save_choice in ('all', 'excel'):
             file_path = os.path.abspath(os.path.join(base_path['excel'], f'{excel_name}.xlsx'))
             save_to_xlsx(file_path, note_list)
 
 
+    @staticmethod
+    def should_download(note_info: NoteRecord, save_choice: str) -> bool:
+        """
+        save_choice 为 media-video 只下载视频笔记，media-image 只下载图文笔记，all / media 都下载
+        """
+        if save_choice == 'media-video':
+            return note_info.get('note_type') == '视频'
+        if save_choice == 'media-image':
+            return note_info.get('note_type') != '视频'
+        return True
+
+    @staticmethod
+    def _note_key(note_url: str) -> str:
+        return extract_note_id_from_url(note_url) or note_url
+
+    @staticmethod
+    def search_job_params(require_num: int, sort_type_choice: int = 0, note_type: int = 0, note_time: int = 0, note_range: int = 0, pos_distance: int = 0, geo: dict[str, Any] | None = None) -> dict[str, Any]:
+        """
+        决定搜索任务键的参数，参数不同视为不同任务
+        """
+        return {
+            'require_num': require_num, 'sort_type_choice': sort_type_choice, 'note_type': note_type,
+            'note_time': note_time, 'note_range': note_range, 'pos_distance': pos_distance, 'geo': geo,
+        }
+
+    def is_search_done(self, query: str, require_num: int, sort_type_choice: int = 0, note_type: int = 0, note_time: int = 0, note_range: int = 0, pos_distance: int = 0, geo: dict[str, Any] | None = None) -> bool:
+        """
+        任务记录中该关键词（相同参数）是否已全部完成
+        """
+        if self.task_store is None:
+            return False
+        params = self.search_job_params(require_num, sort_type_choice, note_type, note_time, note_range, pos_distance, geo)
+        return self.task_store.job_status(TaskStore.job_key('search', query, params)) == DONE
+
+    def _finish_job(self, job_key: str, success: bool, msg: str) -> None:
+        """
+        列表取完且所有笔记都已保存才算完成，否则保留为未完成，下次继续
+        """
+        if not success:
+            self.task_store.finish_job(job_key, FAILED, msg)
+            return
+        unfinished = sum(1 for state in self.task_store.note_states(job_key).values() if state['status'] != DONE)
+        if unfinished:
+            self.task_store.finish_job(job_key, FAILED, f'{unfinished} 个笔记未完成')
+        else:
+            self.task_store.finish_job(job_key, DONE)
+
     def spider_user_all_note(self, user_url: str, cookies_str: str, base_path: dict[str, str], save_choice: str, excel_name: str = '', proxies: dict | None = None) -> tuple[list[str], bool, str]:
         """
         爬取一个用户的所有笔记
@@ -161,8 +268,23 @@ class Data_Spider:
         :return:
         """
         note_list = []
+        job = None
         try:
-            success, msg, all_note_info = self.xhs_apis.get_user_all_notes(user_url, cookies_str, proxies)
+            if self.task_store is not None:
+                job = self.task_store.open_job('user', user_url.split('/')[-1].split('?')[0])
+            if job is not None and job['listing_done']:
+                success, msg, all_note_info = True, '', job['items']
+                logger.info(f'用户 {user_url} 作品列表已完成（任务记录），跳过列表请求')
+            else:
+                on_page = None
+                if job is not None:
+                    job_key = job['job_key']
+                    on_page = lambda notes, cursor, has_more: self.task_store.save_page(job_key, notes, cursor=cursor, listing_done=not has_more, id_field='note_id')
+                success, msg, all_note_info = self.xhs_apis.get_user_all_notes(user_url, cookies_str, proxies, start_cursor=job['cursor'] if job else '', on_page=on_page)
+                if job is not None:
+                    all_note_info = job['items'] + all_note_info
+                    if success:
+                        self.task_store.finish_listing(job['job_key'])
             if success:
                 logger.info(f'用户 {user_url} 作品数量: {len(all_note_info)}')
                 for simple_note_info in all_note_info:
@@ -170,10 +292,12 @@ class Data_Spider:
                     note_list.append(note_url)
             if save_choice in ('all', 'excel'):
                 excel_name = user_url.split('/')[-1].split('?')[0]
-            self.spider_some_note(note_list, cookies_str, base_path, save_choice, excel_name, proxies)
+            self.spider_some_note(note_list, cookies_str, base_path, save_choice, excel_name, proxies, job_key=job['job_key'] if job else None)
         except Exception as e:
             success = False
             msg = str(e)
+        if job is not None:
+            self._finish_job(job['job_key'], success, msg)
         logger.info(f'爬取用户所有视频 {user_url}: {success}, msg: {msg}')
         return note_list, success, msg
 
@@ -192,10 +316,28 @@ class Data_Spider:
             返回搜索的结果
         """
         note_list = []
+        job = None
         try:
-            success, msg, notes = self.xhs_apis.search_some_note(query, require_num, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
+            if self.task_store is not None:
+                params = self.search_job_params(require_num, sort_type_choice, note_type, note_time, note_range, pos_distance, geo)
+                job = self.task_store.open_job('search', query, params)
+            if job is not None and (job['listing_done'] or len(job['items']) >= require_num):
+                success, msg, notes = True, '', job['items']
+                logger.info(f'搜索关键词 {query} 列表已完成（任务记录），跳过搜索')
+            else:
+                on_page = None
+                collected = job['items'] if job is not None else []
+                if job is not None:
+                    job_key = job['job_key']
+                    on_page = lambda page_notes, page, has_more: self.task_store.save_page(job_key, page_notes, page=page, listing_done=not has_more)
+                    if job['page']:
+                        logger.info(f'搜索关键词 {query} 从第 {job["page"] + 1} 页继续（已有 {len(collected)} 条）')
+                success, msg, notes = self.xhs_apis.search_some_note(query, require_num - len(collected), cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies, start_page=job['page'] + 1 if job is not None else 1, on_page=on_page)
+                notes = collected + notes
+                if job is not None and success:
+                    self.task_store.finish_listing(job['job_key'])
             if success:
-                notes = list(filter(lambda x: x['model_type'] == "note", notes))
+                notes = list(filter(lambda x: x['model_type'] == "note", notes[:require_num]))
                 logger.info(f'搜索关键词 {query} 笔记数量: {len(notes)}')
                 for note in notes:
                     note_url = f"https://www.xiaohongshu.com/explore/{note['id']}?xsec_token={note['xsec_token']}"
@@ -211,27 +353,230 @@ class Data_Spider:
                     excel_name = f"{original_name}_{counter}"
                     excel_path = os.path.join(base_path['excel'], f"{excel_name}.xlsx")
                     counter += 1
-            self.spider_some_note(note_list, cookies_str, base_path, save_choice, excel_name, proxies, keyword=query, resume=resume)
+            self.spider_some_note(note_list, cookies_str, base_path, save_choice, excel_name, proxies, keyword=query, resume=resume, job_key=job['job_key'] if job is not None else None)
         except Exception as e:
             success = False
             msg = str(e)
+        if job is not None:
+            self._finish_job(job['job_key'], success, msg)
         if not success:
             if '300013' in msg or '访问频繁' in msg:
                 logger.error(f"触发小红书风控(300013)，建议：1. 等待 10-30 分钟后重试 2. 使用代理 3. 降低请求频率")
         logger.info(f'搜索关键词 {query} 笔记: {success}, msg: {msg}')
         return note_list, success, msg
 
+def open_spider(args) -> tuple[Data_Spider, dict[str, Any]]:
+    """
+    按命令行参数创建 Data_Spider 及其可选组件（全文索引、人声检测、详情缓存、任务记录、录制/回放）
+    :param args: main.py 的命令行参数
+    :return: (data_spider, resources)，结束时调用 close_spider(resources)
+    """
+    search_index = NoteSearchIndex(args.index or None) if args.index is not None else None
+    speech_stage = SpeechFilterStage(action=args.speech_filter, workers=args.speech_workers) if args.speech_filter else None
+    note_cache = None
+    if args.note_cache is not None:
+        note_cache = NoteCache(args.note_cache or None, ttl=args.note_cache_ttl * 3600, max_entries=args.note_cache_size)
+    task_store = TaskStore(args.task_store or None) if args.task_store is not None else None
+    cassette = None
+    if args.record:
+        cassette = HttpCassette(args.record, mode=RECORD)
+        data_spider = Data_Spider(search_index=search_index, speech_stage=speech_stage, xhs_apis=XHS_Apis(http=cassette, note_cache=note_cache), task_store=task_store)
+    elif args.replay:
+        cassette = HttpCassette(args.replay, mode=REPLAY)
+        xhs_apis = XHS_Apis(http=cassette, request_delay=(0.0, 0.0), retry_delay=0.0, note_cache=note_cache)
+        data_spider = Data_Spider(search_index=search_index, speech_stage=speech_stage, xhs_apis=xhs_apis, note_delay=(0.0, 0.0), cooling_delay=(0.0, 0.0), task_store=task_store)
+    else:
+        data_spider = Data_Spider(search_index=search_index, speech_stage=speech_stage, xhs_apis=XHS_Apis(note_cache=note_cache), task_store=task_store)
+    resources = {'speech_stage': speech_stage, 'task_store': task_store, 'note_cache': note_cache, 'cassette': cassette}
+    return data_spider, resources
+
+
+def close_spider(resources: dict[str, Any]) -> None:
+    if resources['speech_stage'] is not None:
+        logger.info(f'人声检测汇总: {resources["speech_stage"].close()}')
+    if resources['task_store'] is not None:
+        logger.info(f'任务记录统计: {resources["task_store"].summary()}')
+        resources['task_store'].close()
+    if resources['note_cache'] is not None:
+        logger.info(f'笔记详情缓存统计: {resources["note_cache"].stats}')
+        resources['note_cache'].close()
+    if resources['cassette'] is not None:
+        logger.info(f'录制/回放统计: {resources["cassette"].stats}')
+        resources['cassette'].close()
+
+
+def crawl_keywords(data_spider: Data_Spider, keywords: list[str], params: dict[str, Any], cookies_str: str, base_path: dict[str, str], resume: bool = False, keyword_delay: tuple[float, float] = (5.0, 10.0), identity: str = 'COOKIES') -> list[dict[str, Any]]:
+    """
+    依次爬取关键词
+    :param params: config/keywords.json 的 global_params
+    :param keyword_delay: 关键词之间的冷却时间（秒）
+    :param identity: 使用的账号（环境变量名），写入结果
+    :return: 每个关键词一条结果 dict(keyword, success, msg, notes, seconds, identity)
+    """
+    results = []
+    for idx, query in enumerate(keywords, 1):
+        logger.info(f'[{identity} {idx}/{len(keywords)}] Processing keyword: {query}')
+        result = {'keyword': query, 'success': True, 'msg': '', 'notes': 0, 'seconds': 0.0, 'identity': identity}
+        results.append(result)
+        if data_spider.is_search_done(query, params['require_num'], params['sort_type_choice'], params['note_type'], params['note_time'], params['note_range'], params['pos_distance']):
+            result['msg'] = 'already completed in task store'
+            logger.info(f'✓ Skipped (already completed in task store): {query}')
+            continue
+        start = time.perf_counter()
+        try:
+            note_urls, success, msg = data_spider.spider_some_search_note(
+                query,
+                params['require_num'],
+                cookies_str,
+                base_path,
+                params['save_choice'],
+                params['sort_type_choice'],
+                params['note_type'],
+                params['note_time'],
+                params['note_range'],
+                params['pos_distance'],
+                geo=None,
+                resume=resume
+            )
+            result.update(success=success, msg=msg, notes=len(note_urls))
+            if success:
+                logger.info(f'✓ Completed: {query}')
+            else:
+                logger.error(f'✗ Failed: {query} - {msg}')
+        except Exception as e:
+            result.update(success=False, msg=str(e))
+            logger.error(f'✗ Failed: {query} - {str(e)}')
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        # Add delay between keywords (not after last one)
+        if idx < len(keywords):
+            delay = random.uniform(*keyword_delay)
+            if delay > 0:
+                logger.info(f"关键词处理完成，冷却 {delay:.1f} 秒...")
+                time.sleep(delay)
+    return results
+
+
+def load_identity(shard: int) -> tuple[str, str]:
+    """
+    第 shard 个进程（从 0 开始）使用环境变量 COOKIES_{shard+1} 中的账号，未配置时退回 COOKIES
+    :return: (环境变量名, cookies)
+    """
+    load_dotenv()
+    name = f'COOKIES_{shard + 1}'
+    cookies_str = os.getenv(name)
+    if cookies_str:
+        return name, cookies_str
+    logger.warning(f'{name} 未配置，进程 {shard + 1} 使用 COOKIES，与其他进程共用账号')
+    return 'COOKIES', os.getenv('COOKIES') or ''
+
+
+def _crawl_shard(args, shard: int, keywords: list[str], params: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    子进程入口：使用独立的签名环境、账号和 XHS_Apis 依次爬取分到的关键词
+    """
+    identity, cookies_str = load_identity(shard)
+    _, base_path = init()
+    data_spider, resources = open_spider(args)
+    keyword_delay = (0.0, 0.0) if args.replay else (5.0, 10.0)
+    try:
+        return crawl_keywords(data_spider, keywords, params, cookies_str, base_path, args.resume, keyword_delay, identity)
+    finally:
+        close_spider(resources)
+
+
+def crawl_keywords_sharded(args, keywords: list[str], params: dict[str, Any], processes: int) -> list[dict[str, Any]]:
+    """
+    关键词轮流分配给 processes 个子进程并行爬取，每个进程使用自己的账号
+    子进程异常退出时，其分到的关键词全部记为失败
+    :return: 按 config 中关键词顺序合并的结果
+    """
+    shards = [(shard, keywords[shard::processes]) for shard in range(processes)]
+    shards = [(shard, shard_keywords) for shard, shard_keywords in shards if shard_keywords]
+    results: list[dict[str, Any] | None] = [None] * len(keywords)
+    # 每个子进程各自启动人声检测进程池，--speech-workers 按进程平分（每个进程至少 1 个），总数不随 --processes 成倍增加
+    shard_args = [
+        argparse.Namespace(**{**vars(args), 'speech_workers': max(1, args.speech_workers // len(shards) + (index < args.speech_workers % len(shards)))})
+        for index in range(len(shards))
+    ]
+    # spawn：每个子进程重新导入模块、独立编译签名 JS，不继承父进程的线程和连接
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = {
+            executor.submit(_crawl_shard, shard_args[index], shard, shard_keywords, params): (shard, shard_keywords)
+            for index, (shard, shard_keywords) in enumerate(shards)
+        }
+        for future in as_completed(futures):
+            shard, shard_keywords = futures[future]
+            try:
+                shard_results = future.result()
+            except Exception as e:
+                logger.error(f'进程 {shard + 1} 异常退出: {e}')
+                shard_results = [
+                    {'keyword': query, 'success': False, 'msg': f'进程异常退出: {e}', 'notes': 0, 'seconds': 0.0, 'identity': f'COOKIES_{shard + 1}'}
+                    for query in shard_keywords
+                ]
+            for position, result in zip(range(shard, len(keywords), processes), shard_results):
+                results[position] = result
+    return results
+
+
+def log_summary(results: list[dict[str, Any]], report_path: str | None = None) -> None:
+    """
+    输出汇总和失败关键词，可选写出 JSON 报告
+    """
+    failed = [result for result in results if not result['success']]
+    logger.info(f'\n{"="*50}')
+    logger.info(f'Crawl Summary:')
+    logger.info(f'Total: {len(results)} | Success: {len(results) - len(failed)} | Failed: {len(failed)} | Notes: {sum(result["notes"] for result in results)}')
+    identities: dict[str, list[int]] = {}
+    for result in results:
+        counts = identities.setdefault(result['identity'], [0, 0])
+        counts[0] += 1
+        counts[1] += result['notes']
+    if len(identities) > 1:
+        for identity, (keyword_count, note_count) in sorted(identities.items()):
+            logger.info(f'  {identity}: {keyword_count} keywords, {note_count} notes')
+    if failed:
+        logger.info(f'Failed keywords:')
+        for result in failed:
+            logger.info(f"  - {result['keyword']} ({result['identity']}): {result['msg']}")
+    if report_path:
+        os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+        with open(report_path, mode='w', encoding='utf-8') as f:
+            json.dump({'total': len(results), 'failed': len(failed), 'results': results}, f, ensure_ascii=False, indent=2)
+        logger.info(f'爬取报告已写入 {os.path.abspath(report_path)}')
+
+
 if __name__ == '__main__':
     """
         此文件为爬虫的入口文件，可以直接运行
         apis/xhs_pc_apis.py 为爬虫的api文件，包含小红书的全部数据接口，可以继续封装
         apis/xhs_creator_apis.py 为小红书创作者中心的api文件
     """
-    import argparse
-
     parser = argparse.ArgumentParser(description='小红书爬虫')
     parser.add_argument('--resume', action='store_true', help='启用断点续传，跳过已下载的笔记')
+    parser.add_argument('--index', nargs='?', const='', default=None, help='将笔记写入本地全文索引，可指定索引文件（默认 datas/search_index.db）')
+    parser.add_argument('--speech-filter', default=None, choices=['mark', 'delete'], help='视频下载后立即做人声检测：mark 只标记，delete 删除无人声视频')
+    parser.add_argument('--speech-workers', type=int, default=1, help='人声检测后台进程数（与 --processes 同用时为所有进程的合计）')
+    parser.add_argument('--note-cache', nargs='?', const='', default=None, help='缓存笔记详情响应，重复笔记不再请求，可指定缓存文件（默认 datas/note_cache.db）')
+    parser.add_argument('--note-cache-ttl', type=float, default=24.0, help='笔记详情缓存有效期（小时）')
+    parser.add_argument('--note-cache-size', type=int, default=50000, help='笔记详情缓存最多保存的笔记数')
+    parser.add_argument('--metrics', nargs='?', type=int, const=5000, default=None, metavar='PORT', help='在指定端口（默认 5000）提供 Prometheus 指标 /metrics')
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='DIR', help='性能分析：统计签名/请求/解析/下载等阶段耗时，退出时输出汇总表和火焰图文件（默认 datas/profile）')
+    parser.add_argument('--profile-cprofile', action='store_true', help='性能分析时同时启用 cProfile')
+    parser.add_argument('--profile-sample-ms', type=float, default=5.0, help='栈采样间隔（毫秒），0 关闭采样')
+    parser.add_argument('--task-store', nargs='?', const='', default=None, metavar='PATH', help='记录每个关键词的已完成页和每个笔记的状态，中断后重新运行从断点继续，可指定文件（默认 datas/task_store.db）')
+    parser.add_argument('--processes', type=int, default=1, help='把关键词分给多个进程并行爬取，第 i 个进程使用环境变量 COOKIES_i 中的账号（未配置时使用 COOKIES）；--speech-workers 在各进程间平分（每个进程至少 1 个），--index/--task-store/--note-cache 等 SQLite 文件由所有进程共同写入')
+    parser.add_argument('--report', default=None, metavar='PATH', help='把每个关键词的结果和失败原因写入 JSON 文件')
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record', default=None, metavar='PATH', help='录制所有接口与媒体请求到文件')
+    cassette_group.add_argument('--replay', default=None, metavar='PATH', help='从录制文件回放请求，不访问网络、不等待请求间隔')
     args = parser.parse_args()
+    if args.processes > 1 and (args.metrics is not None or args.profile is not None):
+        logger.warning('多进程模式下 --metrics / --profile 只统计主进程，各子进程的请求与签名不计入')
+    if args.metrics is not None:
+        start_metrics_server(args.metrics)
+    if args.profile is not None:
+        enable_profiling(args.profile or None, use_cprofile=args.profile_cprofile, sample_interval=args.profile_sample_ms / 1000)
 
     cookies_str_result, base_path_result = init()
     cookies_str: str = cookies_str_result if cookies_str_result is not None else ""
@@ -240,7 +585,6 @@ if __name__ == '__main__':
         raise ValueError("COOKIES not found in .env file")
     if base_path is None:
         raise ValueError("Failed to initialize base paths")
-    data_spider = Data_Spider()
     """
         save_choice: all: 保存所有的信息, media: 保存视频和图片（media-video只下载视频, media-image只下载图片，media都下载）, excel: 保存到excel
         save_choice 为 excel 或者 all 时，excel_name 不能为空
@@ -262,41 +606,15 @@ if __name__ == '__main__':
     keywords = config['keywords']
     params = config['global_params']
 
-    success_count = 0
-    failed_keywords = []
-
-    for idx, query in enumerate(keywords, 1):
-        logger.info(f'[{idx}/{len(keywords)}] Processing keyword: {query}')
+    processes = min(args.processes, len(keywords))
+    if processes > 1:
+        logger.info(f'{len(keywords)} 个关键词分给 {processes} 个进程')
+        results = crawl_keywords_sharded(args, keywords, params, processes)
+    else:
+        data_spider, resources = open_spider(args)
+        keyword_delay = (0.0, 0.0) if args.replay else (5.0, 10.0)
         try:
-            data_spider.spider_some_search_note(
-                query,
-                params['require_num'],
-                cookies_str,
-                base_path,
-                params['save_choice'],
-                params['sort_type_choice'],
-                params['note_type'],
-                params['note_time'],
-                params['note_range'],
-                params['pos_distance'],
-                geo=None,
-                resume=args.resume
-            )
-            success_count += 1
-            logger.info(f'✓ Completed: {query}')
-            # Add delay between keywords (not after last one)
-            if idx < len(keywords):
-                delay = random.uniform(5.0, 10.0)
-                logger.info(f"关键词处理完成，冷却 {delay:.1f} 秒...")
-                time.sleep(delay)
-        except Exception as e:
-            logger.error(f'✗ Failed: {query} - {str(e)}')
-            failed_keywords.append((query, str(e)))
-
-    logger.info(f'\n{"="*50}')
-    logger.info(f'Crawl Summary:')
-    logger.info(f'Total: {len(keywords)} | Success: {success_count} | Failed: {len(failed_keywords)}')
-    if failed_keywords:
-        logger.info(f'Failed keywords:')
-        for kw, err in failed_keywords:
-            logger.info(f'  - {kw}: {err}')
+            results = crawl_keywords(data_spider, keywords, params, cookies_str, base_path, args.resume, keyword_delay)
+        finally:
+            close_spider(resources)
+    log_summary(results, args.report)
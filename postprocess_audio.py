@@ -2,7 +2,10 @@ import argparse
 import json
 from loguru import logger
 
-from xhs_utils.audio_filter import get_default_media_path, process_media_dir
+from xhs_utils.audio_filter import DEFAULT_ENERGY_FLOOR, get_default_media_path, process_media_dir
+from xhs_utils.media_scan import get_default_scan_index_path
+from xhs_utils.profiling import enable_profiling
+from xhs_utils.vad_cache import get_default_cache_path
 
 
 def build_parser():
@@ -12,17 +15,32 @@ def build_parser():
     parser.add_argument("--ffmpeg-path", default="ffmpeg", help="ffmpeg 可执行文件路径")
     parser.add_argument("--vad-aggressiveness", type=int, default=2, choices=[0, 1, 2, 3], help="VAD 灵敏度")
     parser.add_argument("--vad-frame-ms", type=int, default=30, choices=[10, 20, 30], help="VAD 帧长(ms)")
+    parser.add_argument("--energy-floor", type=float, default=DEFAULT_ENERGY_FLOOR, help="能量预筛阈值（帧 RMS），低于该值的静音帧跳过 VAD，默认 0 关闭；开启后（如 30）更快，但跳过的帧不进入 VAD，检测结果可能与逐帧检测略有差异")
     parser.add_argument("--min-speech-seconds", type=float, default=1.0, help="最短语音时长阈值")
     parser.add_argument("--min-speech-ratio", type=float, default=0.02, help="语音占比阈值")
     parser.add_argument("--threshold-mode", default="any", choices=["any", "all"], help="阈值判定方式")
     parser.add_argument("--force", action="store_true", help="强制重新检测")
     parser.add_argument("--keep-audio", action="store_true", help="保留抽取的音频文件")
+    parser.add_argument("--early-exit", action="store_true", help="结果确定后立即停止解码（info.json 中 speech_partial 标记指标为部分统计）")
+    parser.add_argument("--sample-windows", type=int, default=0, help="采样模式：只检测均匀分布的 N 个窗口（0 为完整检测）")
+    parser.add_argument("--sample-seconds", type=float, default=5.0, help="采样窗口长度（秒）")
+    parser.add_argument("--cache", default=None, help="VAD 缓存文件，默认 datas/vad_cache.db")
+    parser.add_argument("--no-cache", action="store_true", help="不使用 VAD 缓存")
+    parser.add_argument("--refresh-cache", action="store_true", help="忽略已有缓存重新检测")
+    parser.add_argument("--scan-index", default=None, help="增量扫描索引文件，默认 datas/media_scan.db")
+    parser.add_argument("--no-scan-index", action="store_true", help="不使用增量扫描索引，完整遍历媒体目录")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="DIR", help="性能分析：统计 VAD 各阶段耗时，退出时输出汇总表和火焰图文件（默认 datas/profile，建议配合 --workers 1）")
+    parser.add_argument("--profile-cprofile", action="store_true", help="性能分析时同时启用 cProfile")
+    parser.add_argument("--profile-sample-ms", type=float, default=5.0, help="栈采样间隔（毫秒），0 关闭采样")
+    parser.add_argument("--workers", type=int, default=1, help="并行处理的进程数（ffmpeg 与 VAD 均为 CPU 密集型）")
     return parser
 
 
 def main():
     parser = build_parser()
     args = parser.parse_args()
+    if args.profile is not None:
+        enable_profiling(args.profile or None, use_cprofile=args.profile_cprofile, sample_interval=args.profile_sample_ms / 1000)
     base_path = args.media_dir or get_default_media_path()
     logger.info(f"开始后处理: {base_path}")
     summary = process_media_dir(
@@ -36,6 +54,14 @@ def main():
         threshold_mode=args.threshold_mode,
         force=args.force,
         keep_audio=args.keep_audio,
+        workers=args.workers,
+        early_exit=args.early_exit,
+        sample_windows=args.sample_windows,
+        sample_seconds=args.sample_seconds,
+        energy_floor=args.energy_floor,
+        cache_path=None if args.no_cache else (args.cache or get_default_cache_path()),
+        refresh_cache=args.refresh_cache,
+        scan_index_path=None if args.no_scan_index else (args.scan_index or get_default_scan_index_path()),
     )
     print(json.dumps(summary, ensure_ascii=False, indent=2))
 
@@ -0,0 +1,40 @@
+import argparse
+import json
+
+from xhs_utils.audio_filter import get_default_media_path
+from xhs_utils.search_index import NoteSearchIndex, get_default_comment_path, get_default_index_path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="本地全文检索已爬取的笔记和评论")
+    parser.add_argument("--db", default=None, help="索引文件，默认 datas/search_index.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    query_parser = sub.add_parser("query", help="检索笔记标题/正文/标签或评论")
+    query_parser.add_argument("query", help="查询词，空格分隔表示同时包含")
+    query_parser.add_argument("--comments", action="store_true", help="检索评论而不是笔记")
+    query_parser.add_argument("--limit", type=int, default=20, help="返回条数")
+
+    build_parser_ = sub.add_parser("build", help="从媒体目录的 info.json 和评论目录回填索引")
+    build_parser_.add_argument("--media-dir", default=None, help="媒体目录，默认 datas/media_datas")
+    build_parser_.add_argument("--comment-dir", default=None, help="评论目录（service.py 评论任务的输出），默认 datas/comment_datas")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    with NoteSearchIndex(args.db or get_default_index_path()) as index:
+        if args.command == "build":
+            total = index.build_from_media_dir(args.media_dir or get_default_media_path())
+            comments = index.build_comments_from_dir(args.comment_dir or get_default_comment_path())
+            print(json.dumps({"indexed": total, "comments": comments}, ensure_ascii=False))
+            return
+        if args.comments:
+            results = index.search_comments(args.query, limit=args.limit)
+        else:
+            results = index.search_notes(args.query, limit=args.limit)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
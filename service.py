@@ -0,0 +1,363 @@
+"""
+常驻服务模式：通过 HTTP 提交爬取任务，由共享的工作线程池执行
+
+    python service.py --port 5000 --workers 4
+
+    curl -X POST localhost:5000/jobs -d '{"type": "search", "keyword": "冰糖心苹果", "require_num": 20}'
+    curl -X POST localhost:5000/jobs -d '{"type": "user", "user_url": "https://www.xiaohongshu.com/user/profile/...?xsec_token=..."}'
+    curl -X POST localhost:5000/jobs -d '{"type": "comments", "note_url": "https://www.xiaohongshu.com/explore/...?xsec_token=...", "max_comments": 200}'
+    curl localhost:5000/jobs/<id>
+    curl localhost:5000/metrics
+
+设置环境变量 XHS_SERVICE_TOKEN 后，除 /metrics 外的请求都需要携带 X-Service-Token 请求头；
+监听非本机地址（如 --host 0.0.0.0）时必须设置
+
+所有任务共享同一个 Data_Spider / XHS_Apis（签名 JS 只编译一次）、同一个 HTTP 连接池和同一个限速器
+"""
+import argparse
+import hmac
+import ipaddress
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from apis.xhs_pc_apis import XHS_Apis
+from main import Data_Spider
+from xhs_utils.comment_util import CommentBudget
+from xhs_utils.common_util import init
+from xhs_utils.data_util import handle_comment_info, norm_str
+from xhs_utils.metrics import REGISTRY, counter
+from xhs_utils.note_cache import NoteCache
+from xhs_utils.rate_limiter import RateLimiter
+from xhs_utils.records import to_dict
+from xhs_utils.search_index import NoteSearchIndex, get_default_comment_path
+
+JOB_TYPES = ('search', 'user', 'comments')
+SAVE_CHOICES = ('all', 'media', 'media-video', 'media-image', 'excel')
+
+JOBS = counter('xhs_service_jobs', '服务任务数', ('type', 'status'))
+
+FINISHED_STATUSES = ('done', 'failed')
+
+# 服务访问令牌，通过请求头传递
+SERVICE_TOKEN_ENV = 'XHS_SERVICE_TOKEN'
+SERVICE_TOKEN_HEADER = 'X-Service-Token'
+# 评论任务未指定 max_requests 时的请求上限，避免热门笔记的一个任务长期占用工作线程和限速配额
+DEFAULT_COMMENT_MAX_REQUESTS = 200
+
+
+@dataclass
+class Job:
+    id: str
+    type: str
+    params: dict
+    status: str = 'queued'
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: dict | None = None
+    error: str | None = None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class CrawlService:
+    """
+    任务队列 + 共享爬虫实例
+    :param cookies_str: cookies
+    :param base_path: init() 返回的保存路径
+    :param workers: 工作线程数
+    :param rate: 所有任务共享的请求速率（请求/秒）
+    :param note_cache: 可选的笔记详情缓存
+    :param search_index: 可选的本地全文索引，笔记和评论任务的结果都写入
+    :param max_jobs: 最多保留的已结束任务数，超出时先淘汰最早结束的
+    :param job_ttl: 已结束任务的保留时间（秒），过期后无法再查询
+    """
+
+    def __init__(self, cookies_str, base_path, workers=2, rate=2.0, note_cache=None, search_index=None, max_jobs=500, job_ttl=3600.0):
+        self.cookies_str = cookies_str
+        self.base_path = base_path
+        self.comment_path = get_default_comment_path()
+        # 连接池在所有任务之间复用
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max(8, workers * 4))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        self.xhs_apis = XHS_Apis(rate_limiter=RateLimiter(rate=rate, burst=max(1, workers)), http=session, note_cache=note_cache)
+        self.search_index = search_index
+        self.data_spider = Data_Spider(search_index=search_index, xhs_apis=self.xhs_apis)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='crawl-job')
+        self.jobs = {}
+        self.max_jobs = max_jobs
+        self.job_ttl = job_ttl
+        self._lock = threading.Lock()
+
+    def submit(self, payload):
+        """
+        :raises ValueError: 参数不合法
+        """
+        job_type = payload.get('type')
+        if job_type not in JOB_TYPES:
+            raise ValueError(f'type 仅支持 {JOB_TYPES}')
+        required = {'search': 'keyword', 'user': 'user_url', 'comments': 'note_url'}[job_type]
+        if not payload.get(required):
+            raise ValueError(f'{job_type} 任务缺少 {required}')
+        if payload.get('save_choice', 'all') not in SAVE_CHOICES:
+            raise ValueError(f'save_choice 仅支持 {SAVE_CHOICES}')
+        if job_type == 'comments':
+            self.comment_budget(payload)
+        job = Job(id=uuid.uuid4().hex[:12], type=job_type, params=payload)
+        with self._lock:
+            self._evict_jobs()
+            self.jobs[job.id] = job
+        JOBS.inc(type=job_type, status='queued')
+        self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def list(self):
+        with self._lock:
+            return [
+                {'id': job.id, 'type': job.type, 'status': job.status, 'created_at': job.created_at}
+                for job in self.jobs.values()
+            ]
+
+    def _evict_jobs(self):
+        """
+        淘汰过期或超出数量的已结束任务，调用方需持有 self._lock
+        """
+        finished = sorted(
+            (job for job in self.jobs.values() if job.status in FINISHED_STATUSES),
+            key=lambda job: job.finished_at,
+        )
+        expire_before = time.time() - self.job_ttl
+        overflow = len(finished) - self.max_jobs
+        for index, job in enumerate(finished):
+            if index < overflow or job.finished_at < expire_before:
+                del self.jobs[job.id]
+
+    def _run(self, job):
+        with self._lock:
+            job.status = 'running'
+            job.started_at = time.time()
+        result, error = None, None
+        try:
+            handler = getattr(self, f'_run_{job.type}')
+            result = handler(job.params)
+            status = 'done' if result.get('success') else 'failed'
+            error = None if result.get('success') else result.get('msg')
+        except Exception as e:
+            status = 'failed'
+            error = str(e)
+            logger.error(f'任务 {job.id} 执行失败: {e}')
+        # 结果在锁外生成，这里一次性写入，查询时不会看到只更新了一半的任务
+        with self._lock:
+            job.result = result
+            job.status = status
+            job.error = error
+            job.finished_at = time.time()
+            self._evict_jobs()
+        JOBS.inc(type=job.type, status=status)
+
+    def _run_search(self, params):
+        note_urls, success, msg = self.data_spider.spider_some_search_note(
+            params['keyword'],
+            int(params.get('require_num', 20)),
+            self.cookies_str,
+            self.base_path,
+            params.get('save_choice', 'all'),
+            int(params.get('sort_type_choice', 0)),
+            int(params.get('note_type', 0)),
+            int(params.get('note_time', 0)),
+            int(params.get('note_range', 0)),
+            int(params.get('pos_distance', 0)),
+            geo=params.get('geo'),
+            resume=bool(params.get('resume', False)),
+        )
+        return {'success': success, 'msg': msg, 'notes': len(note_urls), 'note_urls': note_urls}
+
+    def _run_user(self, params):
+        note_urls, success, msg = self.data_spider.spider_user_all_note(
+            params['user_url'], self.cookies_str, self.base_path, params.get('save_choice', 'all')
+        )
+        return {'success': success, 'msg': msg, 'notes': len(note_urls), 'note_urls': note_urls}
+
+    @staticmethod
+    def comment_budget(params):
+        """
+        由任务参数构造评论抓取预算：max_comments / max_sub_comments / max_requests / priority
+        max_requests 未指定时使用 DEFAULT_COMMENT_MAX_REQUESTS
+        :raises ValueError: 参数不合法
+        """
+        limits = {}
+        for key in ('max_comments', 'max_sub_comments', 'max_requests'):
+            value = params.get(key)
+            if value is None:
+                limits[key] = None
+                continue
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                raise ValueError(f'{key} 必须是非负整数')
+            limits[key] = value
+        if limits['max_requests'] is None:
+            limits['max_requests'] = DEFAULT_COMMENT_MAX_REQUESTS
+        return CommentBudget(priority=params.get('priority', 'like_count'), **limits)
+
+    def _run_comments(self, params):
+        note_url = params['note_url']
+        success, msg, comments, state = self.xhs_apis.get_note_budget_comment(
+            note_url, self.cookies_str, budget=self.comment_budget(params)
+        )
+        records = []
+        for comment in comments:
+            for item in [comment] + comment.get('sub_comments', []):
+                item['note_url'] = note_url
+                records.append(to_dict(handle_comment_info(item)))
+        if records and self.search_index is not None:
+            try:
+                self.search_index.add_comments(records)
+            except Exception as e:
+                logger.error(f'写入全文索引失败: {e}')
+        path = None
+        if records:
+            os.makedirs(self.comment_path, exist_ok=True)
+            path = os.path.join(self.comment_path, f"{norm_str(records[0]['note_id'])}.json")
+            with open(path, mode='w', encoding='utf-8') as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+        return {
+            'success': success, 'msg': msg, 'comments': len(comments), 'records': len(records), 'path': path,
+            'requests': state.requests, 'exhausted': state.exhausted,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def is_loopback_host(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    service: CrawlService = None
+    token: str | None = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        if self.token is None:
+            return True
+        supplied = self.headers.get(SERVICE_TOKEN_HEADER) or ''
+        if hmac.compare_digest(supplied.encode('utf-8'), self.token.encode('utf-8')):
+            return True
+        self._send_json(401, {'error': 'invalid token'})
+        return False
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip('/')
+        # 指标不含任务数据，供 Prometheus 直接抓取
+        if path != '/metrics' and not self._authorized():
+            return
+        if path == '/metrics':
+            body = REGISTRY.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif path == '/healthz':
+            self._send_json(200, {'status': 'ok'})
+        elif path == '/jobs':
+            self._send_json(200, {'jobs': self.service.list()})
+        elif path.startswith('/jobs/'):
+            job = self.service.get(path.split('/')[-1])
+            if job is None:
+                self._send_json(404, {'error': 'job not found'})
+            else:
+                self._send_json(200, job)
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if urlparse(self.path).path.rstrip('/') != '/jobs':
+            self._send_json(404, {'error': 'not found'})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(payload, dict):
+                raise ValueError('请求体必须是 JSON 对象')
+            job = self.service.submit(payload)
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(202, {'id': job.id, 'status': job.status})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书爬虫服务模式')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址，其他机器需要访问时指定 0.0.0.0（必须设置 XHS_SERVICE_TOKEN）')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=2, help='同时执行的任务数')
+    parser.add_argument('--rate', type=float, default=2.0, help='所有任务共享的请求速率（请求/秒）')
+    parser.add_argument('--note-cache', nargs='?', const='', default=None, help='启用笔记详情缓存，可指定缓存文件（默认 datas/note_cache.db）')
+    parser.add_argument('--index', nargs='?', const='', default=None, help='将笔记和评论写入本地全文索引，可指定索引文件（默认 datas/search_index.db）')
+    parser.add_argument('--max-jobs', type=int, default=500, help='最多保留的已结束任务数')
+    parser.add_argument('--job-ttl', type=float, default=3600.0, help='已结束任务的保留时间（秒）')
+    args = parser.parse_args()
+
+    cookies_str, base_path = init()
+    token = os.getenv(SERVICE_TOKEN_ENV) or None
+    if token is None and not is_loopback_host(args.host):
+        parser.error(f'监听 {args.host} 时必须设置访问令牌（环境变量 {SERVICE_TOKEN_ENV}），否则任何人都能用当前账号提交爬取任务')
+    note_cache = NoteCache(args.note_cache or None) if args.note_cache is not None else None
+    search_index = NoteSearchIndex(args.index or None) if args.index is not None else None
+    service = CrawlService(
+        cookies_str or '', base_path, workers=args.workers, rate=args.rate, note_cache=note_cache,
+        search_index=search_index, max_jobs=args.max_jobs, job_ttl=args.job_ttl,
+    )
+    _ServiceHandler.service = service
+    _ServiceHandler.token = token
+    server = ThreadingHTTPServer((args.host, args.port), _ServiceHandler)
+    server.daemon_threads = True
+    logger.info(f'服务已启动: http://{args.host}:{args.port} ，工作线程 {args.workers}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""
+分布式爬取：协调端把关键词放入共享任务队列，多个 worker（可在不同机器上，各自使用自己的账号和代理）领取任务
+
+    # 协调端：把 config/keywords.json 中的关键词放入队列，并对其他节点提供队列服务（需设置 XHS_QUEUE_TOKEN）
+    python worker.py coordinator --host 0.0.0.0 --port 5010
+
+    # worker：本机可直接使用队列文件，其他机器指向协调端地址
+    python worker.py worker --queue http://10.0.0.2:5010 --worker-id node2-a --cookies-env COOKIES_2 --proxy http://127.0.0.1:7890
+
+    # 查看进度 / 按关键词导出清单中的笔记到 Excel
+    python worker.py status --queue http://10.0.0.2:5010
+    python worker.py export
+
+关键词任务翻页搜索，把结果按 note_id 去重后作为笔记任务放回队列；笔记任务获取详情、保存媒体并写入共享清单
+任务领取后带租约，worker 中途退出时租约到期后由其他 worker 接手
+"""
+import argparse
+import os
+import random
+import socket
+import threading
+import time
+
+from dotenv import load_dotenv
+from loguru import logger
+
+from apis.xhs_pc_apis import XHS_Apis
+from main import Data_Spider
+from xhs_utils.common_util import init, load_keywords_config
+from xhs_utils.data_util import download_note, norm_str, save_to_xlsx
+from xhs_utils.metrics import counter, start_metrics_server
+from xhs_utils.path_util import extract_note_id_from_url
+from xhs_utils.rate_limiter import RateLimiter
+from xhs_utils.records import NoteRecord
+from xhs_utils.task_queue import open_task_queue, serve_task_queue
+from xhs_utils.task_store import TaskStore
+
+SEARCH = 'search'
+NOTE = 'note'
+# 笔记任务优先，已发现的笔记先处理完，队列不会无限堆积
+PRIORITIES = {SEARCH: 0, NOTE: 1}
+
+TASKS = counter('xhs_worker_tasks', 'worker 处理的任务数', ('kind', 'status'))
+
+
+def seed_keywords(queue, config_path='config/keywords.json'):
+    """
+    把关键词配置放入队列，同一关键词 + 参数只放一次
+    :return: 新加入的任务数
+    """
+    config = load_keywords_config(config_path)
+    params = config['global_params']
+    search_params = Data_Spider.search_job_params(
+        params['require_num'], params['sort_type_choice'], params['note_type'],
+        params['note_time'], params['note_range'], params['pos_distance'],
+    )
+    tasks = [
+        (SEARCH, {'keyword': keyword, 'save_choice': params['save_choice'], **search_params},
+         TaskStore.job_key(SEARCH, keyword, search_params), PRIORITIES[SEARCH])
+        for keyword in config['keywords']
+    ]
+    return queue.put_many(tasks)
+
+
+class _LeaseKeeper:
+    """
+    任务执行期间在后台定期续租
+    """
+
+    def __init__(self, queue, task_id, worker_id, lease_seconds):
+        self.queue = queue
+        self.task_id = task_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.renew(self.task_id, self.worker_id, self.lease_seconds):
+                    logger.warning(f'任务 {self.task_id} 的租约已失效，可能已被其他 worker 接手')
+                    return
+            except Exception as e:
+                logger.warning(f'任务 {self.task_id} 续租失败: {e}')
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+
+
+class CrawlWorker:
+    """
+    从队列领取任务并执行
+    :param queue: TaskQueue 或 RemoteTaskQueue
+    :param worker_id: worker 标识，写入清单
+    :param cookies_str: 该 worker 使用的账号 cookies
+    :param base_path: init() 返回的保存路径
+    :param proxies: 该 worker 使用的代理
+    :param rate: 该 worker 的请求速率（请求/秒）
+    :param lease_seconds: 任务租约时长
+    :param task_delay: 任务之间的随机间隔 (min, max) 秒
+    """
+
+    def __init__(self, queue, worker_id, cookies_str, base_path, proxies=None, rate=1.0, lease_seconds=600.0, task_delay=(2.0, 4.0), xhs_apis=None):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.cookies_str = cookies_str
+        self.base_path = base_path
+        self.proxies = proxies
+        self.lease_seconds = lease_seconds
+        self.task_delay = task_delay
+        self.xhs_apis = xhs_apis if xhs_apis is not None else XHS_Apis(rate_limiter=RateLimiter(rate=rate, burst=1))
+        self.data_spider = Data_Spider(xhs_apis=self.xhs_apis)
+        self.stats = {SEARCH: 0, NOTE: 0, 'failed': 0, 'duplicates': 0}
+
+    def run(self, exit_when_idle=True, poll_interval=5.0, max_tasks=None):
+        """
+        :param exit_when_idle: 队列中没有排队或执行中的任务时退出
+        :param max_tasks: 最多处理的任务数
+        :return: stats
+        """
+        handled = 0
+        while max_tasks is None or handled < max_tasks:
+            task = self.queue.claim(self.worker_id, self.lease_seconds)
+            if task is None:
+                if exit_when_idle and self.queue.stats()['active'] == 0:
+                    break
+                time.sleep(poll_interval)
+                continue
+            handled += 1
+            self.handle(task)
+            delay = random.uniform(*self.task_delay)
+            if delay > 0:
+                time.sleep(delay)
+        logger.info(f'worker {self.worker_id} 结束: {self.stats}')
+        return self.stats
+
+    def handle(self, task):
+        kind = task['kind']
+        with _LeaseKeeper(self.queue, task['id'], self.worker_id, self.lease_seconds):
+            try:
+                result = self._run_search(task['payload']) if kind == SEARCH else self._run_note(task['payload'])
+            except Exception as e:
+                result = {'success': False, 'msg': f'{type(e).__name__}: {e}'}
+        if result['success']:
+            self.queue.complete(task['id'], self.worker_id, result)
+            self.stats[kind] += 1
+            TASKS.inc(kind=kind, status='done')
+        else:
+            self.queue.fail(task['id'], self.worker_id, result['msg'])
+            self.stats['failed'] += 1
+            TASKS.inc(kind=kind, status='failed')
+            logger.warning(f'任务 {task["id"]}（{kind}，第 {task["attempts"]} 次）失败: {result["msg"]}')
+            if '300013' in result['msg'] or '访问频繁' in result['msg']:
+                # 当前账号被风控，暂停一段时间再领取新任务，任务留给其他账号
+                cooling = random.uniform(60.0, 120.0)
+                logger.error(f'worker {self.worker_id} 触发风控(300013)，暂停 {cooling:.0f} 秒')
+                time.sleep(cooling)
+
+    def _run_search(self, payload):
+        keyword = payload['keyword']
+        success, msg, notes = self.xhs_apis.search_some_note(
+            keyword, payload['require_num'], self.cookies_str, payload['sort_type_choice'], payload['note_type'],
+            payload['note_time'], payload['note_range'], payload['pos_distance'], payload.get('geo'), self.proxies,
+        )
+        if not success:
+            return {'success': False, 'msg': msg}
+        tasks = []
+        note_ids = []
+        for note in notes:
+            if note.get('model_type') != 'note':
+                continue
+            note_url = f"https://www.xiaohongshu.com/explore/{note['id']}?xsec_token={note['xsec_token']}"
+            payload_note = {'note_url': note_url, 'keyword': keyword, 'save_choice': payload.get('save_choice', 'all')}
+            tasks.append((NOTE, payload_note, f"{NOTE}:{note['id']}", PRIORITIES[NOTE]))
+            note_ids.append(note['id'])
+        if note_ids:
+            # 笔记任务按 note_id 去重，关键词对应关系需要单独记录，否则导出时会漏掉后搜到同一笔记的关键词
+            self.queue.add_keyword_notes(keyword, note_ids)
+        added = self.queue.put_many(tasks) if tasks else 0
+        self.stats['duplicates'] += len(tasks) - added
+        logger.info(f'[{self.worker_id}] 关键词 {keyword}: {len(tasks)} 个笔记，新加入 {added} 个')
+        return {'success': True, 'msg': msg, 'notes': len(tasks), 'queued': added}
+
+    def _run_note(self, payload):
+        note_url = payload['note_url']
+        note_id = extract_note_id_from_url(note_url)
+        if note_id and self.queue.has_note(note_id):
+            self.stats['duplicates'] += 1
+            return {'success': True, 'msg': '已在清单中'}
+        success, msg, note_info = self.data_spider.spider_note(note_url, self.cookies_str, self.proxies)
+        if not success or note_info is None:
+            return {'success': False, 'msg': msg}
+        save_choice = payload.get('save_choice', 'all')
+        note_dir = None
+        if save_choice in ('all', 'media', 'media-video', 'media-image'):
+            failed_media = []
+            note_dir = download_note(
+                note_info, self.base_path['media'], Data_Spider.should_download(note_info, save_choice),
+                self.proxies, http=self.xhs_apis.http, failed=failed_media,
+            )
+            if failed_media:
+                # 不写入清单，任务按失败处理并由队列重试
+                return {'success': False, 'msg': f'{len(failed_media)} 个媒体文件下载失败'}
+        added = self.queue.record_note(
+            note_info['note_id'], note_url, note_info.to_dict(), self.worker_id, keyword=payload.get('keyword'), note_dir=note_dir,
+        )
+        return {'success': True, 'msg': msg, 'note_id': note_info['note_id'], 'added': added}
+
+
+def export_manifest(queue, excel_path):
+    """
+    按关键词把清单中的笔记导出为 Excel，同一笔记被多个关键词搜到时在每个关键词中都导出
+    :return: {keyword: 笔记数}
+    """
+    entries = {entry['note_id']: entry for entry in queue.manifest()}
+    grouped = {}
+    linked = set()
+    for keyword, note_id in queue.keyword_notes():
+        if note_id in entries:
+            grouped.setdefault(keyword, []).append(NoteRecord.from_dict(entries[note_id]['record']))
+            linked.add(note_id)
+    for note_id, entry in entries.items():
+        if note_id not in linked:
+            grouped.setdefault(entry['keyword'] or 'unknown', []).append(NoteRecord.from_dict(entry['record']))
+    for keyword, records in grouped.items():
+        save_to_xlsx(os.path.abspath(os.path.join(excel_path, f'{norm_str(keyword)}.xlsx')), records)
+    return {keyword: len(records) for keyword, records in grouped.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书分布式爬取')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    coordinator = sub.add_parser('coordinator', help='放入关键词任务并提供队列服务')
+    coordinator.add_argument('--queue', default=None, help='队列文件（默认 datas/task_queue.db）')
+    coordinator.add_argument('--host', default='127.0.0.1', help='监听地址，其他机器的 worker 需要访问时指定 0.0.0.0')
+    coordinator.add_argument('--port', type=int, default=5010)
+    coordinator.add_argument('--config', default='config/keywords.json')
+    coordinator.add_argument('--no-seed', action='store_true', help='不放入关键词任务，只提供队列服务')
+    coordinator.add_argument('--max-attempts', type=int, default=3, help='单个任务最多尝试次数')
+
+    worker = sub.add_parser('worker', help='领取并执行任务')
+    worker.add_argument('--queue', default=None, help='队列文件或协调端地址 http://host:5010（默认 datas/task_queue.db）')
+    worker.add_argument('--worker-id', default=None, help='worker 标识（默认 主机名-进程号）')
+    worker.add_argument('--cookies-env', default='COOKIES', help='从该环境变量读取账号 cookies，每个 worker 使用不同账号')
+    worker.add_argument('--proxy', default=None, help='该 worker 使用的代理，如 http://127.0.0.1:7890')
+    worker.add_argument('--rate', type=float, default=1.0, help='该 worker 的请求速率（请求/秒）')
+    worker.add_argument('--lease', type=float, default=600.0, help='任务租约（秒），超时未完成的任务由其他 worker 接手')
+    worker.add_argument('--forever', action='store_true', help='队列空闲时继续等待新任务')
+    worker.add_argument('--metrics', nargs='?', type=int, const=5000, default=None, metavar='PORT', help='在指定端口提供 Prometheus 指标 /metrics')
+
+    status = sub.add_parser('status', help='查看队列进度和失败任务')
+    status.add_argument('--queue', default=None)
+
+    export = sub.add_parser('export', help='按关键词导出清单中的笔记到 Excel')
+    export.add_argument('--queue', default=None)
+    args = parser.parse_args()
+    # COOKIES_* 和队列访问令牌 XHS_QUEUE_TOKEN 都可以写在 .env 中
+    load_dotenv()
+
+    if args.command == 'coordinator':
+        queue = open_task_queue(args.queue, max_attempts=args.max_attempts)
+        if not args.no_seed:
+            logger.info(f'新加入关键词任务 {seed_keywords(queue, args.config)} 个')
+        server = serve_task_queue(queue, args.host, args.port)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            logger.info(f'队列统计: {queue.stats()}')
+            queue.close()
+    elif args.command == 'worker':
+        if args.metrics is not None:
+            start_metrics_server(args.metrics)
+        cookies_str = os.getenv(args.cookies_env)
+        if not cookies_str:
+            raise ValueError(f'环境变量 {args.cookies_env} 未设置')
+        _, base_path = init()
+        queue = open_task_queue(args.queue)
+        proxies = {'http': args.proxy, 'https': args.proxy} if args.proxy else None
+        worker_id = args.worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        crawl_worker = CrawlWorker(queue, worker_id, cookies_str, base_path, proxies=proxies, rate=args.rate, lease_seconds=args.lease)
+        try:
+            crawl_worker.run(exit_when_idle=not args.forever)
+        finally:
+            queue.close()
+    elif args.command == 'status':
+        queue = open_task_queue(args.queue)
+        logger.info(f'队列统计: {queue.stats()}')
+        for failure in queue.failures():
+            logger.info(f"  - 失败 {failure['kind']} {failure['payload'].get('keyword') or failure['payload'].get('note_url')}: {failure['error']}（{failure['attempts']} 次，{failure['worker']}）")
+        queue.close()
+    elif args.command == 'export':
+        _, base_path = init()
+        queue = open_task_queue(args.queue)
+        logger.info(f"导出到 {base_path['excel']}: {export_manifest(queue, base_path['excel'])}")
+        queue.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,31 @@
 import json
+import math
+import multiprocessing
 import os
+import re
 import subprocess
 import tempfile
+import threading
 import time
 import wave
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 import webrtcvad
 from loguru import logger
 
+from xhs_utils.media_scan import get_scan_index
+from xhs_utils.metrics import VAD_SECONDS
+from xhs_utils.vad_cache import file_fingerprint, get_vad_cache
+
 VALID_FRAME_MS = (10, 20, 30)
 VALID_SAMPLE_RATES = (8000, 16000, 32000, 48000)
+PCM_SAMPLE_RATE = 16000
+# 每次从音频流读取的帧数（30ms 帧时约 3 秒音频），缓冲区复用
+READ_BLOCK_FRAMES = 100
+# 能量预筛阈值（int16 采样的帧 RMS），低于该值的帧直接视为非语音，不再调用 webrtcvad；默认 0 关闭
+# 跳过的帧不会送入有状态的 webrtcvad，speech_frames 可能与逐帧检测不同，需显式开启（如 30，约 -61 dBFS）
+DEFAULT_ENERGY_FLOOR = 0
 
 
 def get_default_media_path():
@@ -39,27 +55,173 @@ def extract_audio(video_path, audio_path, ffmpeg_path="ffmpeg"):
         raise RuntimeError(f"ffmpeg 执行失败: {result.stderr.strip() or result.stdout.strip()}")
 
 
-def detect_speech_vad(audio_path, aggressiveness=2, frame_ms=30):
-    if frame_ms not in VALID_FRAME_MS:
-        raise ValueError(f"vad_frame_ms 仅支持 {VALID_FRAME_MS}")
+def open_pcm_stream(video_path, ffmpeg_path="ffmpeg", sample_rate=PCM_SAMPLE_RATE, start=None, duration=None):
+    """
+    启动 ffmpeg，把音轨解码为单声道 s16le PCM 写到 stdout，不落盘
+    :param start: 起始秒数（输入端 seek，只解码所需片段）
+    :param duration: 解码时长（秒）
+    :return: Popen；stderr 写入临时文件 proc.stderr_file（不用管道，错误输出很多时 ffmpeg 也不会因管道写满而阻塞）
+    """
+    cmd = [ffmpeg_path, "-hide_banner", "-loglevel", "error"]
+    if start:
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", video_path]
+    if duration:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += [
+        "-ac",
+        "1",
+        "-ar",
+        str(sample_rate),
+        "-vn",
+        "-f",
+        "s16le",
+        "-",
+    ]
+    stderr_file = tempfile.TemporaryFile()
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file, bufsize=0)
+    except Exception:
+        stderr_file.close()
+        raise
+    proc.stderr_file = stderr_file
+    return proc
+
+
+def probe_duration(video_path, ffmpeg_path="ffmpeg"):
+    """
+    获取媒体时长（秒），优先使用同目录的 ffprobe，失败时解析 ffmpeg -i 的输出
+    :return: 时长秒数，无法获取时返回 None
+    """
+    ffmpeg_dir, ffmpeg_name = os.path.split(ffmpeg_path)
+    ffprobe_path = os.path.join(ffmpeg_dir, ffmpeg_name.replace("ffmpeg", "ffprobe"))
+    try:
+        result = subprocess.run(
+            [ffprobe_path, "-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", video_path],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        if result.returncode == 0 and result.stdout.strip() not in ("", "N/A"):
+            return float(result.stdout.strip())
+    except (OSError, ValueError):
+        pass
+    try:
+        result = subprocess.run([ffmpeg_path, "-hide_banner", "-i", video_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    except OSError:
+        return None
+    match = re.search(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", result.stderr)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+class SpeechDecider:
+    """
+    提前判定：根据已检测的帧判断最终结果是否已经确定
+    已知总帧数（由时长估算）时可以同时提前判定"有人声"和"无人声"；
+    未知总帧数时只能在 any 模式下，语音时长达到阈值后提前判定"有人声"
+    :param expected_frames: 预计总帧数，None 表示未知
+    """
+    # 时长估算的误差余量（帧数按 1% + 5 帧放宽）
+    SLACK_RATIO = 0.01
+    SLACK_FRAMES = 5
+
+    def __init__(self, frame_ms, min_speech_seconds, min_speech_ratio, threshold_mode="any", expected_frames=None):
+        self.frame_seconds = frame_ms / 1000.0
+        self.min_speech_seconds = min_speech_seconds
+        self.min_speech_ratio = min_speech_ratio
+        self.threshold_mode = threshold_mode
+        if expected_frames:
+            self.frames_high = math.ceil(expected_frames * (1 + self.SLACK_RATIO)) + self.SLACK_FRAMES
+            self.frames_low = max(1, math.floor(expected_frames * (1 - self.SLACK_RATIO)) - self.SLACK_FRAMES)
+        else:
+            self.frames_high = self.frames_low = None
+        self.decision = None
+
+    def update(self, speech_frames, seen_frames):
+        """
+        :return: True/False 表示结果已确定，None 表示仍需继续检测
+        """
+        seconds_ok = speech_frames * self.frame_seconds >= self.min_speech_seconds
+        if self.frames_high is None:
+            if self.threshold_mode == "any" and seconds_ok:
+                self.decision = True
+            return self.decision
+        frames_high = max(self.frames_high, seen_frames)
+        frames_low = max(self.frames_low, seen_frames)
+        max_speech = speech_frames + (frames_high - seen_frames)
+        ratio_ok = speech_frames / frames_high >= self.min_speech_ratio
+        seconds_possible = max_speech * self.frame_seconds >= self.min_speech_seconds
+        ratio_possible = min(1.0, max_speech / frames_low) >= self.min_speech_ratio
+        if self.threshold_mode == "all":
+            if seconds_ok and ratio_ok:
+                self.decision = True
+            elif not seconds_possible or not ratio_possible:
+                self.decision = False
+        else:
+            if seconds_ok or ratio_ok:
+                self.decision = True
+            elif not seconds_possible and not ratio_possible:
+                self.decision = False
+        return self.decision
+
+
+def _read_block(readinto, buffer):
+    """
+    尽量填满 buffer（管道可能分多次返回），返回实际读取的字节数，0 表示结束
+    """
+    view = memoryview(buffer)
+    filled = 0
+    while filled < len(buffer):
+        n = readinto(view[filled:])
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+def _count_speech_frames(readinto, sample_rate, aggressiveness, frame_ms, decider=None, energy_floor=DEFAULT_ENERGY_FLOOR):
+    """
+    按块读取 PCM 并逐帧交给 webrtcvad，缓冲区在整个过程中复用
+    每块先用 NumPy 一次性计算所有帧的 RMS 能量，低于 energy_floor 的静音帧不再调用 webrtcvad
+    :param readinto: readinto(buffer) -> 读取字节数，与文件对象的 readinto 相同
+    :param decider: SpeechDecider，每读完一块检查一次，结果确定后立即停止
+    :param energy_floor: 能量预筛阈值，0 表示每帧都交给 webrtcvad
+    :return: (speech_frames, total_frames, stopped_early)
+    """
     vad = webrtcvad.Vad(int(aggressiveness))
-    with wave.open(audio_path, "rb") as wf:
-        sample_rate = wf.getframerate()
-        if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
-            raise ValueError("音频必须是单声道 16bit PCM")
-        if sample_rate not in VALID_SAMPLE_RATES:
-            raise ValueError(f"采样率仅支持 {VALID_SAMPLE_RATES}")
-        frame_count = int(sample_rate * frame_ms / 1000.0)
-        bytes_per_frame = frame_count * 2
-        total_frames = 0
-        speech_frames = 0
-        while True:
-            frame = wf.readframes(frame_count)
-            if len(frame) < bytes_per_frame:
-                break
-            total_frames += 1
-            if vad.is_speech(frame, sample_rate):
+    samples_per_frame = int(sample_rate * frame_ms / 1000.0)
+    bytes_per_frame = samples_per_frame * 2
+    buffer = bytearray(bytes_per_frame * READ_BLOCK_FRAMES)
+    view = memoryview(buffer)
+    samples = np.frombuffer(buffer, dtype="<i2").reshape(READ_BLOCK_FRAMES, samples_per_frame)
+    # 比较均方值，省去开方
+    floor_power = float(energy_floor) ** 2 * samples_per_frame
+    total_frames = 0
+    speech_frames = 0
+    while True:
+        filled = _read_block(readinto, buffer)
+        # 末尾不足一帧的数据丢弃
+        block_frames = filled // bytes_per_frame
+        if energy_floor > 0:
+            block = samples[:block_frames].astype(np.float32)
+            power = np.einsum("ij,ij->i", block, block)
+            candidates = np.flatnonzero(power >= floor_power).tolist()
+        else:
+            candidates = range(block_frames)
+        for index in candidates:
+            offset = index * bytes_per_frame
+            if vad.is_speech(view[offset:offset + bytes_per_frame], sample_rate):
                 speech_frames += 1
+        total_frames += block_frames
+        if filled < len(buffer):
+            break
+        if decider is not None and decider.update(speech_frames, total_frames) is not None:
+            return speech_frames, total_frames, True
+    return speech_frames, total_frames, False
+
+
+def _build_metrics(speech_frames, total_frames, frame_ms):
     if total_frames == 0:
         return {
             "speech_frames": 0,
@@ -77,6 +239,96 @@ def detect_speech_vad(audio_path, aggressiveness=2, frame_ms=30):
     }
 
 
+def detect_speech_vad(audio_path, aggressiveness=2, frame_ms=30, energy_floor=DEFAULT_ENERGY_FLOOR):
+    if frame_ms not in VALID_FRAME_MS:
+        raise ValueError(f"vad_frame_ms 仅支持 {VALID_FRAME_MS}")
+    with wave.open(audio_path, "rb") as wf:
+        sample_rate = wf.getframerate()
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError("音频必须是单声道 16bit PCM")
+        if sample_rate not in VALID_SAMPLE_RATES:
+            raise ValueError(f"采样率仅支持 {VALID_SAMPLE_RATES}")
+
+        def readinto(buf):
+            data = wf.readframes(len(buf) // 2)
+            buf[:len(data)] = data
+            return len(data)
+
+        speech_frames, total_frames, _ = _count_speech_frames(readinto, sample_rate, aggressiveness, frame_ms, energy_floor=energy_floor)
+    return _build_metrics(speech_frames, total_frames, frame_ms)
+
+
+def detect_speech_vad_stream(video_path, ffmpeg_path="ffmpeg", aggressiveness=2, frame_ms=30, decider=None, start=None, duration=None, energy_floor=DEFAULT_ENERGY_FLOOR):
+    """
+    ffmpeg 解码的 PCM 直接从管道送入 webrtcvad，不写临时 WAV，解码与检测同时进行
+    :param decider: SpeechDecider，结果确定后立即结束 ffmpeg，返回的指标带 partial=True
+    :param start: 只检测从 start 秒开始的片段
+    :param duration: 片段时长（秒）
+    """
+    if frame_ms not in VALID_FRAME_MS:
+        raise ValueError(f"vad_frame_ms 仅支持 {VALID_FRAME_MS}")
+    proc = open_pcm_stream(video_path, ffmpeg_path=ffmpeg_path, sample_rate=PCM_SAMPLE_RATE, start=start, duration=duration)
+    stopped = False
+    try:
+        speech_frames, total_frames, stopped = _count_speech_frames(
+            proc.stdout.readinto, PCM_SAMPLE_RATE, aggressiveness, frame_ms, decider=decider, energy_floor=energy_floor,
+        )
+    finally:
+        if stopped:
+            proc.kill()
+        proc.stdout.close()
+        returncode = proc.wait()
+        proc.stderr_file.seek(0)
+        stderr = proc.stderr_file.read().decode("utf-8", errors="replace")
+        proc.stderr_file.close()
+    if returncode != 0 and not stopped:
+        raise RuntimeError(f"ffmpeg 执行失败: {stderr.strip()}")
+    metrics = _build_metrics(speech_frames, total_frames, frame_ms)
+    metrics["partial"] = stopped
+    return metrics
+
+
+def sample_window_starts(duration, windows, window_seconds):
+    """
+    在时长内均匀分布 windows 个窗口，返回每个窗口的起始秒数（窗口中心落在各等分段中点）
+    """
+    segment = duration / windows
+    latest = max(0.0, duration - window_seconds)
+    return [min(latest, max(0.0, (i + 0.5) * segment - window_seconds / 2)) for i in range(windows)]
+
+
+def detect_speech_vad_sampled(video_path, duration, windows=6, window_seconds=5.0, ffmpeg_path="ffmpeg", aggressiveness=2, frame_ms=30, energy_floor=DEFAULT_ENERGY_FLOOR):
+    """
+    采样检测：只解码 windows 个短窗口，用采样到的语音占比估计整段视频，解码开销与时长无关
+    speech_frames/total_frames 为采样窗口内的实际帧数，speech_seconds 为按占比外推到全片的估计值
+    """
+    speech_frames = 0
+    total_frames = 0
+    for start in sample_window_starts(duration, windows, window_seconds):
+        window = detect_speech_vad_stream(
+            video_path,
+            ffmpeg_path=ffmpeg_path,
+            aggressiveness=aggressiveness,
+            frame_ms=frame_ms,
+            start=start,
+            duration=window_seconds,
+            energy_floor=energy_floor,
+        )
+        speech_frames += window["speech_frames"]
+        total_frames += window["total_frames"]
+    metrics = _build_metrics(speech_frames, total_frames, frame_ms)
+    metrics["speech_seconds"] = metrics["speech_ratio"] * duration
+    metrics["partial"] = False
+    metrics["sampling"] = {
+        "mode": "windows",
+        "windows": windows,
+        "window_seconds": window_seconds,
+        "duration": duration,
+        "sampled_seconds": total_frames * frame_ms / 1000.0,
+    }
+    return metrics
+
+
 def evaluate_speech(metrics, min_speech_seconds, min_speech_ratio, threshold_mode="any"):
     if threshold_mode == "all":
         return metrics["speech_seconds"] >= min_speech_seconds and metrics["speech_ratio"] >= min_speech_ratio
@@ -90,6 +342,11 @@ def load_info_json(info_path):
         content = f.read().strip()
     if not content:
         return {}
+    # download_note 写入的是缩进格式，后处理写入的是单行格式，两种都要支持
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        pass
     try:
         return json.loads(content.splitlines()[0])
     except json.JSONDecodeError:
@@ -98,8 +355,15 @@ def load_info_json(info_path):
 
 
 def write_info_json(info_path, payload):
-    with open(info_path, mode="w", encoding="utf-8") as f:
+    # 先写临时文件再原子替换，并发进程或中途退出都不会留下半个 info.json
+    tmp_path = f"{info_path}.{os.getpid()}.tmp"
+    with open(tmp_path, mode="w", encoding="utf-8") as f:
         f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, info_path)
+
+
+# 扫描索引中缓存的 info.json 字段，决定视频是否需要（重新）检测
+SCAN_STATE_KEYS = ("speech_checked", "speech_min_seconds", "speech_min_ratio", "speech_threshold_mode")
 
 
 def iter_video_targets(base_path, video_name="video.mp4"):
@@ -108,6 +372,27 @@ def iter_video_targets(base_path, video_name="video.mp4"):
             yield os.path.join(root, video_name), os.path.join(root, "info.json")
 
 
+def _read_scan_state(info_path):
+    info = load_info_json(info_path)
+    return {key: info[key] for key in SCAN_STATE_KEYS if key in info}
+
+
+def iter_video_states(base_path, video_name="video.mp4", scan_index_path=None):
+    """
+    遍历媒体目录下的视频及其 info.json 状态
+    :param scan_index_path: 增量扫描索引文件，未变化的目录直接使用索引中的状态
+    :return: (video_path, info_path, info) 迭代器
+    """
+    if scan_index_path is None:
+        for video_path, info_path in iter_video_targets(base_path, video_name):
+            yield video_path, info_path, load_info_json(info_path)
+        return
+    scan_index = get_scan_index(scan_index_path)
+    targets = scan_index.scan(base_path, video_name=video_name, read_info=_read_scan_state)
+    logger.info(f"增量扫描: {scan_index.last_stats}")
+    yield from targets
+
+
 def analyze_video(
     video_path,
     ffmpeg_path="ffmpeg",
@@ -117,32 +402,91 @@ def analyze_video(
     min_speech_ratio=0.02,
     threshold_mode="any",
     keep_audio=False,
+    early_exit=False,
+    sample_windows=0,
+    sample_seconds=5.0,
+    energy_floor=DEFAULT_ENERGY_FLOOR,
+    cache_path=None,
+    refresh_cache=False,
 ):
-    note_dir = os.path.dirname(video_path)
-    if keep_audio:
-        audio_path = os.path.join(note_dir, "_audio.wav")
-        temp_dir = None
-    else:
-        temp_dir = tempfile.TemporaryDirectory()
-        audio_path = os.path.join(temp_dir.name, "audio.wav")
-    try:
+    """
+    检测视频是否包含人声
+    :param early_exit: 结果确定后立即停止解码
+    :param sample_windows: >0 时启用采样模式，只检测均匀分布的若干窗口（视频短于窗口总长时仍完整检测）
+    :param sample_seconds: 采样窗口长度（秒）
+    :param energy_floor: 能量预筛阈值（帧 RMS），低于该值的帧不调用 webrtcvad，0 表示关闭
+    :param cache_path: VAD 缓存文件，命中时直接用缓存的语音帧数重新评估阈值，不运行 ffmpeg
+    :param refresh_cache: 忽略已有缓存重新检测并覆盖
+    """
+    # 采样/提前结束只得到部分帧，不读写缓存
+    use_cache = cache_path is not None and not keep_audio and not early_exit and sample_windows <= 0
+    if use_cache:
+        cache = get_vad_cache(cache_path)
+        fingerprint = file_fingerprint(video_path)
+        cached = None if refresh_cache else cache.get(fingerprint, vad_aggressiveness, vad_frame_ms, energy_floor)
+        if cached is not None:
+            speech_frames, total_frames = cached
+            metrics = _build_metrics(speech_frames, total_frames, vad_frame_ms)
+            metrics["partial"] = False
+            metrics["cached"] = True
+            metrics["speech_detected"] = evaluate_speech(
+                metrics,
+                min_speech_seconds=min_speech_seconds,
+                min_speech_ratio=min_speech_ratio,
+                threshold_mode=threshold_mode,
+            )
+            return metrics
+    duration = None
+    if not keep_audio and (early_exit or sample_windows > 0):
+        duration = probe_duration(video_path, ffmpeg_path=ffmpeg_path)
+    if sample_windows > 0 and duration and duration > sample_windows * sample_seconds:
+        metrics = detect_speech_vad_sampled(
+            video_path,
+            duration,
+            windows=sample_windows,
+            window_seconds=sample_seconds,
+            ffmpeg_path=ffmpeg_path,
+            aggressiveness=vad_aggressiveness,
+            frame_ms=vad_frame_ms,
+            energy_floor=energy_floor,
+        )
+    elif keep_audio:
+        # 需要保留音频时仍走 WAV 文件
+        audio_path = os.path.join(os.path.dirname(video_path), "_audio.wav")
         extract_audio(video_path, audio_path, ffmpeg_path=ffmpeg_path)
         metrics = detect_speech_vad(
             audio_path,
             aggressiveness=vad_aggressiveness,
             frame_ms=vad_frame_ms,
+            energy_floor=energy_floor,
         )
-        speech_detected = evaluate_speech(
-            metrics,
-            min_speech_seconds=min_speech_seconds,
-            min_speech_ratio=min_speech_ratio,
-            threshold_mode=threshold_mode,
+    else:
+        decider = None
+        if early_exit:
+            expected_frames = int(duration * 1000 / vad_frame_ms) if duration else None
+            decider = SpeechDecider(vad_frame_ms, min_speech_seconds, min_speech_ratio, threshold_mode, expected_frames)
+        metrics = detect_speech_vad_stream(
+            video_path,
+            ffmpeg_path=ffmpeg_path,
+            aggressiveness=vad_aggressiveness,
+            frame_ms=vad_frame_ms,
+            decider=decider,
+            energy_floor=energy_floor,
         )
-        metrics["speech_detected"] = speech_detected
-        return metrics
-    finally:
-        if temp_dir is not None:
-            temp_dir.cleanup()
+        if use_cache:
+            cache.put(fingerprint, vad_aggressiveness, vad_frame_ms, energy_floor, metrics["speech_frames"], metrics["total_frames"])
+        if metrics["partial"]:
+            # 提前结束时 speech_ratio/speech_seconds 只覆盖已解码部分，结论以判定结果为准
+            metrics["speech_detected"] = decider.decision
+            return metrics
+    speech_detected = evaluate_speech(
+        metrics,
+        min_speech_seconds=min_speech_seconds,
+        min_speech_ratio=min_speech_ratio,
+        threshold_mode=threshold_mode,
+    )
+    metrics["speech_detected"] = speech_detected
+    return metrics
 
 
 def process_video(
@@ -156,7 +500,14 @@ def process_video(
     min_speech_ratio=0.02,
     threshold_mode="any",
     keep_audio=False,
+    early_exit=False,
+    sample_windows=0,
+    sample_seconds=5.0,
+    energy_floor=DEFAULT_ENERGY_FLOOR,
+    cache_path=None,
+    refresh_cache=False,
 ):
+    start = time.perf_counter()
     try:
         metrics = analyze_video(
             video_path,
@@ -167,6 +518,12 @@ def process_video(
             min_speech_ratio=min_speech_ratio,
             threshold_mode=threshold_mode,
             keep_audio=keep_audio,
+            early_exit=early_exit,
+            sample_windows=sample_windows,
+            sample_seconds=sample_seconds,
+            energy_floor=energy_floor,
+            cache_path=cache_path,
+            refresh_cache=refresh_cache,
         )
     except Exception as exc:
         logger.error(f"处理失败: {video_path} -> {exc}")
@@ -187,9 +544,13 @@ def process_video(
             "speech_total_frames": metrics["total_frames"],
             "speech_vad_aggressiveness": vad_aggressiveness,
             "speech_vad_frame_ms": vad_frame_ms,
+            "speech_energy_floor": energy_floor,
             "speech_min_seconds": min_speech_seconds,
             "speech_min_ratio": min_speech_ratio,
             "speech_threshold_mode": threshold_mode,
+            "speech_partial": metrics.get("partial", False),
+            "speech_sampling": metrics.get("sampling"),
+            "speech_cached": metrics.get("cached", False),
             "speech_checked_at": time.strftime("%Y-%m-%d %H:%M:%S"),
         }
     )
@@ -207,9 +568,16 @@ def process_video(
         "speech_detected": metrics["speech_detected"],
         "speech_ratio": metrics["speech_ratio"],
         "speech_seconds": metrics["speech_seconds"],
+        "cached": metrics.get("cached", False),
+        "elapsed": time.perf_counter() - start,
     }
 
 
+def _process_video_job(job):
+    video_path, info_path, options = job
+    return process_video(video_path, info_path, **options)
+
+
 def process_media_dir(
     base_path,
     action="mark",
@@ -221,7 +589,21 @@ def process_media_dir(
     threshold_mode="any",
     force=False,
     keep_audio=False,
+    workers=1,
+    early_exit=False,
+    sample_windows=0,
+    sample_seconds=5.0,
+    energy_floor=DEFAULT_ENERGY_FLOOR,
+    cache_path=None,
+    refresh_cache=False,
+    scan_index_path=None,
 ):
+    """
+    批量检测媒体目录下的所有 video.mp4
+    :param cache_path: VAD 缓存文件；启用后阈值/判定方式与 info.json 记录不同的视频会用缓存重新判定
+    :param refresh_cache: 忽略已有缓存重新检测
+    :param scan_index_path: 增量扫描索引文件，重复运行时只访问新增或变化的目录
+    """
     base_path = os.path.abspath(base_path)
     if not os.path.isdir(base_path):
         raise ValueError(f"媒体目录不存在: {base_path}")
@@ -231,33 +613,134 @@ def process_media_dir(
         "speech": 0,
         "no_speech": 0,
         "skipped": 0,
+        "cached": 0,
         "errors": 0,
     }
-    for video_path, info_path in iter_video_targets(base_path):
+    options = {
+        "action": action,
+        "ffmpeg_path": ffmpeg_path,
+        "vad_aggressiveness": vad_aggressiveness,
+        "vad_frame_ms": vad_frame_ms,
+        "min_speech_seconds": min_speech_seconds,
+        "min_speech_ratio": min_speech_ratio,
+        "threshold_mode": threshold_mode,
+        "keep_audio": keep_audio,
+        "early_exit": early_exit,
+        "sample_windows": sample_windows,
+        "sample_seconds": sample_seconds,
+        "energy_floor": energy_floor,
+        "cache_path": cache_path,
+        "refresh_cache": refresh_cache,
+    }
+    thresholds = {
+        "speech_min_seconds": min_speech_seconds,
+        "speech_min_ratio": min_speech_ratio,
+        "speech_threshold_mode": threshold_mode,
+    }
+    jobs = []
+    for video_path, info_path, info in iter_video_states(base_path, scan_index_path=scan_index_path):
         summary["total"] += 1
-        info = load_info_json(info_path)
         if info.get("speech_checked") and not force:
-            summary["skipped"] += 1
-            continue
-        result = process_video(
-            video_path,
-            info_path,
-            action=action,
-            ffmpeg_path=ffmpeg_path,
-            vad_aggressiveness=vad_aggressiveness,
-            vad_frame_ms=vad_frame_ms,
-            min_speech_seconds=min_speech_seconds,
-            min_speech_ratio=min_speech_ratio,
-            threshold_mode=threshold_mode,
-            keep_audio=keep_audio,
-        )
-        if result["status"] == "error":
-            summary["errors"] += 1
-            continue
-        summary["processed"] += 1
-        if result["speech_detected"]:
-            summary["speech"] += 1
-        else:
-            summary["no_speech"] += 1
+            # 有缓存时阈值变化只需重新判定，代价很小；否则保持跳过
+            thresholds_changed = any(info.get(key) != value for key, value in thresholds.items())
+            if cache_path is None or not thresholds_changed:
+                summary["skipped"] += 1
+                continue
+        jobs.append((video_path, info_path, options))
+
+    # 每个视频目录只由一个任务处理，info.json 不会被并发写入；结果按扫描顺序汇总
+    if workers > 1 and len(jobs) > 1:
+        logger.info(f"使用 {workers} 个进程处理 {len(jobs)} 个视频")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_process_video_job, jobs, chunksize=1)
+            for result in results:
+                _add_result(summary, result)
+    else:
+        for job in jobs:
+            _add_result(summary, _process_video_job(job))
     logger.info(f"后处理完成: {summary}")
     return summary
+
+
+def _add_result(summary, result):
+    if result["status"] == "error":
+        summary["errors"] += 1
+        return
+    # 汇总总在主进程执行，进程池中的检测耗时也能计入指标
+    if "elapsed" in result:
+        VAD_SECONDS.observe(result["elapsed"], cached=str(bool(result.get("cached"))).lower())
+    summary["processed"] += 1
+    if result.get("cached"):
+        summary["cached"] += 1
+    if result["speech_detected"]:
+        summary["speech"] += 1
+    else:
+        summary["no_speech"] += 1
+
+
+class SpeechFilterStage:
+    """
+    爬取流水线中的人声检测阶段：每个笔记下载完成后立即在后台进程中检测 video.mp4，
+    delete 模式下无人声视频当场删除，不需要爬取结束后再整体扫描一遍媒体目录
+    :param action: mark 只标记 / delete 删除无人声视频
+    :param workers: 后台检测进程数
+    :param options: 传给 process_video 的其余参数（阈值、缓存等）
+    """
+
+    def __init__(self, action="mark", workers=1, **options):
+        self.action = action
+        self.options = options
+        # 进程在爬取中途第一次 submit 时才创建，此时已有指标/采样线程和 SQLite 连接；
+        # fork 可能让子进程卡在 fork 时被其他线程持有的锁上，因此与 --processes 一样使用 spawn
+        self._executor = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"))
+        self._lock = threading.Lock()
+        self._futures = []
+        self.summary = {
+            "total": 0,
+            "processed": 0,
+            "speech": 0,
+            "no_speech": 0,
+            "skipped": 0,
+            "cached": 0,
+            "errors": 0,
+        }
+
+    def submit(self, note_dir, video_name="video.mp4"):
+        """
+        提交一个笔记目录，没有视频文件时计为 skipped 并返回 None
+        """
+        video_path = os.path.join(note_dir, video_name)
+        with self._lock:
+            self.summary["total"] += 1
+            if not os.path.exists(video_path):
+                self.summary["skipped"] += 1
+                return None
+        future = self._executor.submit(
+            process_video, video_path, os.path.join(note_dir, "info.json"), action=self.action, **self.options
+        )
+        future.add_done_callback(self._on_done)
+        self._futures.append(future)
+        return future
+
+    def _on_done(self, future):
+        try:
+            result = future.result()
+        except Exception as exc:
+            logger.error(f"人声检测任务异常: {exc}")
+            result = {"status": "error", "error": str(exc)}
+        with self._lock:
+            _add_result(self.summary, result)
+
+    def close(self):
+        """
+        等待所有检测完成并返回汇总
+        """
+        self._executor.shutdown(wait=True)
+        logger.info(f"人声检测阶段完成: {self.summary}")
+        return dict(self.summary)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
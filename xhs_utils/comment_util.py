@@ -0,0 +1,81 @@
+import json
+import os
+from dataclasses import asdict, dataclass, field
+
+from xhs_utils.count_util import parse_counts
+
+PRIORITY_KEYS = ('like_count', 'sub_comment_count', 'none')
+
+
+@dataclass
+class CommentBudget:
+    """
+    单篇笔记的评论抓取预算，None 表示不限制
+    :param max_comments: 最多抓取的一级评论数
+    :param max_sub_comments: 每个评论楼最多保留的二级评论数
+    :param max_requests: 最多发出的评论接口请求数（一级+二级）
+    :param priority: 二级评论展开顺序 like_count 点赞最多优先 / sub_comment_count 回复最多优先 / none 原始顺序
+    """
+    max_comments: int | None = None
+    max_sub_comments: int | None = None
+    max_requests: int | None = None
+    priority: str = 'like_count'
+
+    def __post_init__(self):
+        if self.priority not in PRIORITY_KEYS:
+            raise ValueError(f'priority 仅支持 {PRIORITY_KEYS}')
+
+
+@dataclass
+class CommentCrawlState:
+    """
+    可续传的评论抓取状态，可序列化为 JSON；预算用尽后用更大的预算再次传入即可继续
+    :param note_id: 笔记id
+    :param out_cursor: 一级评论翻页游标
+    :param out_done: 一级评论是否已全部获取（或已达到 max_comments）
+    :param requests: 已发出的请求数（跨多次续传累计）
+    :param comments: 已获取的一级评论（原始结构，二级评论写入 sub_comments）
+    :param sub_cursors: 评论id -> 二级评论翻页游标
+    :param sub_done: 已展开完成（或已达到 max_sub_comments）的评论id
+    :param exhausted: 上一次抓取是否因 max_requests 提前停止
+    """
+    note_id: str
+    out_cursor: str = ''
+    out_done: bool = False
+    requests: int = 0
+    comments: list = field(default_factory=list)
+    sub_cursors: dict = field(default_factory=dict)
+    sub_done: list = field(default_factory=list)
+    exhausted: bool = False
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def save(self, path):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, mode='w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, mode='r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def order_threads(comments, priority):
+    """
+    按优先级排序一级评论（稳定排序，互动数相同保持原顺序）
+    :param comments: 一级评论列表
+    :param priority: like_count / sub_comment_count / none
+    :return: 排序后的新列表
+    """
+    if priority == 'none' or not comments:
+        return list(comments)
+    scores = parse_counts([comment.get(priority) for comment in comments])
+    order = sorted(range(len(comments)), key=lambda i: -scores[i])
+    return [comments[i] for i in order]
@@ -0,0 +1,78 @@
+import numpy as np
+
+# 小红书互动数的单位后缀，例如 "1.2万"、"3亿"、"10万+"
+COUNT_UNITS = {
+    '万': 10_000,
+    'w': 10_000,
+    'W': 10_000,
+    '亿': 100_000_000,
+    'k': 1_000,
+    'K': 1_000,
+}
+
+COUNT_FIELDS = ('liked_count', 'collected_count', 'comment_count', 'share_count')
+
+
+
+def _is_ascii(arr):
+    """
+    逐元素判断 str 数组是否只含 ASCII 字符：按 UCS-4 码点视图比较，不逐个调用 Python
+    """
+    codepoints = np.ascontiguousarray(arr).view(np.uint32).reshape(arr.shape + (-1,))
+    return (codepoints < 128).all(axis=-1)
+
+
+def parse_counts(values):
+    """
+    批量将互动数字符串转换为整数（向量化，适用于大批量导出）
+
+    支持格式: "123"、"1,234"、"1.2万"、"10万+"、"3亿"、""、None、整数
+    无法解析的值返回 0
+
+    :param values: 可迭代的互动数（字符串/数字/None）
+    :return: np.ndarray[int64]
+    """
+    # 复制一份：下面会原地修改，而 pandas 写时复制模式下 to_numpy() 可能返回只读数组
+    arr = np.array(values, dtype=object)
+    if arr.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    arr[np.equal(arr, None)] = ''
+    arr = np.char.strip(arr.astype(str))
+    arr = np.char.replace(np.char.replace(arr, '+', ''), ',', '')
+    multiplier = np.ones(arr.shape, dtype=np.float64)
+    for suffix, factor in COUNT_UNITS.items():
+        mask = np.char.endswith(arr, suffix)
+        if mask.any():
+            multiplier[mask] = factor
+            arr[mask] = np.char.rstrip(arr[mask], suffix)
+    # 只允许 "数字"、"数字."、".数字" 或 "数字.数字"：去掉一个小数点后须为非空的十进制数字；
+    # isdecimal 会放过 '١٢' 这类非 ASCII 数字（float 转换同样接受），因此再要求全部为 ASCII
+    valid = np.char.isdecimal(np.char.replace(arr, '.', '', count=1)) & _is_ascii(arr)
+    result = np.zeros(arr.shape, dtype=np.float64)
+    if valid.any():
+        result[valid] = arr[valid].astype(np.float64) * multiplier[valid]
+    return np.rint(result).astype(np.int64)
+
+
+def parse_count(value):
+    """
+    将单个互动数字符串转换为整数
+    :param value: 互动数（字符串/数字/None）
+    :return: int
+    """
+    return int(parse_counts([value])[0])
+
+
+def add_count_columns(df, fields=COUNT_FIELDS, suffix='_num'):
+    """
+    为 DataFrame 追加互动数的数值列，例如 liked_count -> liked_count_num
+    原始字符串列保持不变
+    :param df: pandas.DataFrame
+    :param fields: 需要转换的列名
+    :param suffix: 数值列后缀
+    :return: df
+    """
+    for field in fields:
+        if field in df.columns:
+            df[field + suffix] = parse_counts(df[field].to_numpy())
+    return df
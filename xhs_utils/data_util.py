@@ -7,7 +7,11 @@ from concurrent.futures import ThreadPoolExecutor
 import requests
 from loguru import logger
 from retry import retry
+from xhs_utils.count_util import COUNT_FIELDS, add_count_columns, parse_counts
+from xhs_utils.extractor import Field, compile_schema
+from xhs_utils.metrics import BYTES_DOWNLOADED, MEDIA_DOWNLOADS, NOTES_PARSED
 from xhs_utils.path_util import norm_str
+from xhs_utils.records import CommentRecord, NoteRecord, UserRecord, to_dict
 
 
 def timestamp_to_str(timestamp):
@@ -26,101 +30,117 @@ def timestamp_to_str(timestamp):
         return '未知'
 
 
+def _any_stream_url(data):
+    """
+    兜底：遍历 media.stream 下所有编码，取第一个可用的 master_url/url
+    """
+    for codec_list in data['note_card']['video']['media']['stream'].values():
+        if not isinstance(codec_list, list):
+            continue
+        for item in codec_list:
+            if isinstance(item, dict):
+                url = item.get('master_url') or item.get('url')
+                if url:
+                    return url
+    raise KeyError('stream')
+
+
+def _video_stream_sources():
+    # 按优先级尝试不同编码格式，每种编码先取 master_url 再取 url
+    sources = []
+    for codec in ('h264', 'h265', 'av1'):
+        sources.append(f'note_card.video.media.stream.{codec}.0.master_url')
+        sources.append(f'note_card.video.media.stream.{codec}.0.url')
+    return sources
+
+
+VIDEO_TYPES = ('视频', 'video', 'Video', 'VIDEO')
+
+NOTE_SCHEMA = {
+    'note_id': Field('note_card.note_id', required=True),
+    'note_url': Field('note_card.note_url', required=True),
+    'note_type': Field('note_card.type', required=True),
+    'user_id': Field('note_card.user.user_id', required=True),
+    'nickname': Field('note_card.user.nickname', default=''),
+    'avatar': Field('note_card.user.avatar', default=''),
+    'title': Field('note_card.title', default=''),
+    'desc': Field('note_card.desc', default=''),
+    'liked_count': Field('note_card.interact_info.liked_count', required=True),
+    'collected_count': Field('note_card.interact_info.collected_count', required=True),
+    'comment_count': Field('note_card.interact_info.comment_count', required=True),
+    'share_count': Field('note_card.interact_info.share_count', required=True),
+    'image_list': Field('note_card.image_list', each='info_list.1.url', default=list),
+    'tags': Field('note_card.tag_list', each='name', default=list),
+    'upload_time': Field('note_card.time', transform=timestamp_to_str, default='未知'),
+    'ip_location': Field('note_card.ip_location', default='未知'),
+}
+
+# 视频地址只在视频笔记中提取，单独编译避免图文笔记多余的查找
+VIDEO_SCHEMA = {
+    'video_addr': Field(
+        *_video_stream_sources(),
+        ('note_card.video.consumer.origin_video_key', lambda key: f'https://sns-video-bd.xhscdn.com/{key}'),
+        'note_card.video.url',
+        'note_card.video.consumer.url',
+        _any_stream_url,
+    ),
+}
+
+COMMENT_SCHEMA = {
+    'note_id': Field('note_id', required=True),
+    'note_url': Field('note_url', required=True),
+    'comment_id': Field('id', required=True),
+    'user_id': Field('user_info.user_id', required=True),
+    'nickname': Field('user_info.nickname', default=''),
+    'avatar': Field('user_info.image', default=''),
+    'content': Field('content', default=''),
+    'show_tags': Field('show_tags', default=list),
+    'like_count': Field('like_count', default='0'),
+    'upload_time': Field('create_time', transform=timestamp_to_str, default='未知'),
+    'ip_location': Field('ip_location', default='未知'),
+    'pictures': Field('pictures', each='info_list.1.url', default=list),
+}
+
+USER_SCHEMA = {
+    'user_id': Field('basic_info.user_id', required=True),
+    'nickname': Field('basic_info.nickname', default=''),
+    'avatar': Field('basic_info.image', default=''),
+    'desc': Field('basic_info.desc', default=''),
+    'follows': Field('interactions.0.count', default='0'),
+    'fans': Field('interactions.1.count', default='0'),
+    'interaction': Field('interactions.2.count', default='0'),
+    'tags': Field('tags', each='name', default=list),
+}
+
+extract_note = compile_schema(NOTE_SCHEMA)
+extract_video = compile_schema(VIDEO_SCHEMA)
+extract_comment = compile_schema(COMMENT_SCHEMA)
+extract_user = compile_schema(USER_SCHEMA)
+
+
 def handle_note_info(data):
-    note_id = data['note_card']['note_id']
-    note_url = data['note_card']['note_url']
-    note_type = data['note_card']['type']
-    user_id = data['note_card']['user']['user_id']
-    
+    values = extract_note(data)
+    note_id = values['note_id']
+    note_type = values['note_type']
+
     # 诊断日志：记录笔记类型
     logger.info(f'处理笔记 {note_id}, 类型: {note_type}')
-    
-    home_url = f'https://www.xiaohongshu.com/user/profile/{user_id}'
-    nickname = data['note_card']['user']['nickname']
-    avatar = data['note_card']['user']['avatar']
-    title = data['note_card']['title']
-    desc = data['note_card']['desc']
-    liked_count = data['note_card']['interact_info']['liked_count']
-    collected_count = data['note_card']['interact_info']['collected_count']
-    comment_count = data['note_card']['interact_info']['comment_count']
-    share_count = data['note_card']['interact_info']['share_count']
-    image_list = []
-    for image in data['note_card']['image_list']:
-        try:
-            image_list.append(image['info_list'][1]['url'])
-        except Exception:
-            pass
-    
+    NOTES_PARSED.inc(note_type=note_type)
+
     # 视频处理逻辑 - 支持多种可能的类型标识
     video_cover = None
     video_addr = None
-    
-    # 检查是否为视频类型（支持多种可能的值）
-    is_video = note_type in ['视频', 'video', 'Video', 'VIDEO']
-    
-    if is_video:
+    if note_type in VIDEO_TYPES:
+        image_list = values['image_list']
         video_cover = image_list[0] if image_list else None
-        logger.info(f'笔记 {note_id} 识别为视频类型，开始获取视频地址...')
-        
-        try:
-            # 方法1：从API数据中获取视频地址（多编码支持）
-            video_data = data['note_card'].get('video', {}).get('media', {})
-            logger.debug(f"视频数据结构: {json.dumps(video_data, ensure_ascii=False, indent=2)}")
-            
-            stream = video_data.get('stream', {})
-            
-            # 按优先级尝试不同编码格式
-            for codec in ['h264', 'h265', 'av1']:
-                if codec in stream and len(stream[codec]) > 0:
-                    video_addr = stream[codec][0].get('master_url') or stream[codec][0].get('url')
-                    if video_addr:
-                        logger.info(f"成功获取视频地址({codec}): {video_addr}")
-                        break
-            
-            # 方法1.5：使用 origin_video_key 备选
-            if not video_addr:
-                video_info = data.get('note_card', {}).get('video', {})
-                if 'consumer' in video_info:
-                    origin_key = video_info['consumer'].get('origin_video_key')
-                    if origin_key:
-                        video_addr = f"https://sns-video-bd.xhscdn.com/{origin_key}"
-                        logger.info(f"方法1.5使用origin_video_key获取视频地址: {video_addr}")
-            
-            # 方法1.6：尝试从 video_url 字段获取
-            if not video_addr:
-                video_url = data['note_card'].get('video', {}).get('url', '')
-                if video_url:
-                    video_addr = video_url
-                    logger.info(f"方法1.6从video_url字段获取视频地址: {video_addr}")
-            
-            # 方法1.7：尝试从 consumer.url 获取
-            if not video_addr:
-                consumer_url = data['note_card'].get('video', {}).get('consumer', {}).get('url', '')
-                if consumer_url:
-                    video_addr = consumer_url
-                    logger.info(f"方法1.7从consumer.url获取视频地址: {video_addr}")
-            
-            # 方法1.8：尝试从 media.stream 的其他格式获取
-            if not video_addr and 'stream' in video_data:
-                for codec_key, codec_list in video_data['stream'].items():
-                    if isinstance(codec_list, list) and len(codec_list) > 0:
-                        for item in codec_list:
-                            if isinstance(item, dict):
-                                url = item.get('master_url') or item.get('url')
-                                if url:
-                                    video_addr = url
-                                    logger.info(f"方法1.8从stream.{codec_key}获取视频地址: {video_addr}")
-                                    break
-                    if video_addr:
-                        break
-            
-            # 方法2：如果所有格式都失败，抛出异常进入方法2
-            if not video_addr:
-                raise KeyError("stream中未找到可用的视频URL")
-                
-        except (KeyError, TypeError, IndexError) as e:
-            # 方法2：使用备用方法获取视频地址
-            logger.warning(f"方法1获取视频地址失败 ({e})，尝试备用方法2")
+        logger.opt(lazy=True).debug(
+            '视频数据结构: {}',
+            lambda: json.dumps(data.get('note_card', {}).get('video', {}), ensure_ascii=False, indent=2),
+        )
+        video_addr = extract_video(data)['video_addr']
+        if not video_addr:
+            # 方法2：所有字段都取不到时，从网页 og:video 获取
+            logger.warning(f"笔记 {note_id} 未在数据中找到视频地址，尝试备用方法2")
             try:
                 from apis.xhs_pc_apis import XHS_Apis
                 success, msg, video_addr = XHS_Apis.get_note_no_water_video(note_id)
@@ -132,117 +152,48 @@ def handle_note_info(data):
             except Exception as e2:
                 logger.error(f"方法2执行异常: {e2}")
                 video_addr = None
-        
+
         # 最终检查：如果仍然没有视频地址，记录详细信息
         if not video_addr:
-            logger.error(f"无法获取视频地址，note_id: {note_id}。视频数据结构片段: {json.dumps(data.get('note_card', {}).get('video', {}), ensure_ascii=False, indent=2)[:500]}")
+            logger.opt(lazy=True).error(
+                '无法获取视频地址，note_id: {}。视频数据结构片段: {}',
+                lambda: note_id,
+                lambda: json.dumps(data.get('note_card', {}).get('video', {}), ensure_ascii=False, indent=2)[:500],
+            )
         else:
             logger.info(f"笔记 {note_id} 视频地址获取成功: {video_addr[:80]}...")
-    
-    tags_temp = data['note_card']['tag_list']
-    tags = []
-    for tag in tags_temp:
-        try:
-            tags.append(tag['name'])
-        except Exception:
-            pass
-    upload_time = timestamp_to_str(data['note_card']['time'])
-    if 'ip_location' in data['note_card']:
-        ip_location = data['note_card']['ip_location']
-    else:
-        ip_location = '未知'
-    return {
-        'note_id': note_id,
-        'note_url': note_url,
-        'note_type': note_type,
-        'user_id': user_id,
-        'home_url': home_url,
-        'nickname': nickname,
-        'avatar': avatar,
-        'title': title,
-        'desc': desc,
-        'liked_count': liked_count,
-        'collected_count': collected_count,
-        'comment_count': comment_count,
-        'share_count': share_count,
-        'video_cover': video_cover,
-        'video_addr': video_addr,
-        'image_list': image_list,
-        'tags': tags,
-        'upload_time': upload_time,
-        'ip_location': ip_location,
-    }
+
+    return NoteRecord(
+        note_id=note_id,
+        note_url=values['note_url'],
+        note_type=note_type,
+        user_id=values['user_id'],
+        home_url=f'https://www.xiaohongshu.com/user/profile/{values["user_id"]}',
+        nickname=values['nickname'],
+        avatar=values['avatar'],
+        title=values['title'],
+        desc=values['desc'],
+        liked_count=values['liked_count'],
+        collected_count=values['collected_count'],
+        comment_count=values['comment_count'],
+        share_count=values['share_count'],
+        video_cover=video_cover,
+        video_addr=video_addr,
+        image_list=values['image_list'],
+        tags=values['tags'],
+        upload_time=values['upload_time'],
+        ip_location=values['ip_location'],
+    )
+
 
 def handle_comment_info(data):
-    note_id = data['note_id']
-    note_url = data['note_url']
-    comment_id = data['id']
-    user_id = data['user_info']['user_id']
-    home_url = f'https://www.xiaohongshu.com/user/profile/{user_id}'
-    nickname = data['user_info']['nickname']
-    avatar = data['user_info']['image']
-    content = data['content']
-    show_tags = data['show_tags']
-    like_count = data['like_count']
-    upload_time = timestamp_to_str(data['create_time'])
-    try:
-        ip_location = data['ip_location']
-    except Exception:
-        ip_location = '未知'
-    pictures = []
-    try:
-        pictures_temp = data['pictures']
-        for picture in pictures_temp:
-            try:
-                pictures.append(picture['info_list'][1]['url'])
-            except Exception:
-                pass
-    except Exception:
-        pass
-    return {
-        'note_id': note_id,
-        'note_url': note_url,
-        'comment_id': comment_id,
-        'user_id': user_id,
-        'home_url': home_url,
-        'nickname': nickname,
-        'avatar': avatar,
-        'content': content,
-        'show_tags': show_tags,
-        'like_count': like_count,
-        'upload_time': upload_time,
-        'ip_location': ip_location,
-        'pictures': pictures,
-    }
+    values = extract_comment(data)
+    return CommentRecord(home_url=f'https://www.xiaohongshu.com/user/profile/{values["user_id"]}', **values)
 
 
 def handle_user_info(data):
-    user_id = data['basic_info']['user_id']
-    home_url = f'https://www.xiaohongshu.com/user/profile/{user_id}'
-    nickname = data['basic_info']['nickname']
-    avatar = data['basic_info']['image']
-    desc = data['basic_info']['desc']
-    follows = data['interactions'][0]['count']
-    fans = data['interactions'][1]['count']
-    interaction = data['interactions'][2]['count']
-    tags_temp = data['tags']
-    tags = []
-    for tag in tags_temp:
-        try:
-            tags.append(tag['name'])
-        except Exception:
-            pass
-    return {
-        'user_id': user_id,
-        'home_url': home_url,
-        'nickname': nickname,
-        'avatar': avatar,
-        'desc': desc,
-        'follows': follows,
-        'fans': fans,
-        'interaction': interaction,
-        'tags': tags,
-    }
+    values = extract_user(data)
+    return UserRecord(home_url=f'https://www.xiaohongshu.com/user/profile/{values["user_id"]}', **values)
 
 
 def get_html_text(url):
@@ -262,41 +213,50 @@ def get_data_excel(path, data_list):
     :param data_list: 数据列表
     """
     import pandas as pd
-    df = pd.DataFrame(data_list)
+    df = pd.DataFrame([to_dict(data) for data in data_list])
+    # 互动数批量转换为整数列，便于排序和筛选
+    add_count_columns(df)
     df.to_excel(path, index=False)
     logger.info(f'数据已保存到: {path}')
 
 
 @retry(tries=3, delay=1)
-def download_media(url, path, proxies=None):
+def download_media(url, path, proxies=None, http=None):
     """
     下载媒体文件（图片或视频）
     :param url: 媒体URL
     :param path: 保存路径
     :param proxies: 代理配置
+    :param http: HTTP 层（提供 get），默认 requests，可传入 HttpCassette 录制/回放
     """
+    kind = 'video' if path.endswith('.mp4') else 'image'
     try:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36',
         }
-        response = requests.get(url, headers=headers, proxies=proxies, timeout=30, verify=False)
+        response = (http or requests).get(url, headers=headers, proxies=proxies, timeout=30, verify=False)
         response.raise_for_status()
         with open(path, 'wb') as f:
             f.write(response.content)
+        BYTES_DOWNLOADED.inc(len(response.content), kind=kind)
+        MEDIA_DOWNLOADS.inc(kind=kind, status='ok')
         logger.info(f'下载成功: {path}')
         return True
     except Exception as e:
+        MEDIA_DOWNLOADS.inc(kind=kind, status='error')
         logger.error(f'下载失败 {url}: {e}')
         raise
 
 
-def download_note(note_info, save_dir, download_media_files=True, proxies=None):
+def download_note(note_info, save_dir, download_media_files=True, proxies=None, http=None, failed=None):
     """
     下载笔记的媒体文件和元数据
-    :param note_info: 笔记信息字典
+    :param note_info: 笔记信息（NoteRecord 或 dict）
     :param save_dir: 保存目录
     :param download_media_files: 是否下载媒体文件
     :param proxies: 代理配置
+    :param http: 媒体下载使用的 HTTP 层，默认 requests
+    :param failed: 可选列表，下载失败的媒体 URL 追加到其中（单个文件失败不会中断其余下载）
     :return: 保存的目录路径
     """
     note_id = note_info['note_id']
@@ -309,10 +269,14 @@ def download_note(note_info, save_dir, download_media_files=True, proxies=None):
     note_dir = os.path.join(save_dir, f"{nickname}_{user_id}", f"{title}_{note_id}")
     os.makedirs(note_dir, exist_ok=True)
     
-    # 保存元数据
+    # 保存元数据（附带互动数的数值字段）
     info_path = os.path.join(note_dir, 'info.json')
+    counts = parse_counts([note_info.get(field) for field in COUNT_FIELDS])
+    info_data = to_dict(note_info).copy()
+    for field, value in zip(COUNT_FIELDS, counts):
+        info_data[f'{field}_num'] = int(value)
     with open(info_path, 'w', encoding='utf-8') as f:
-        json.dump(note_info, f, ensure_ascii=False, indent=2)
+        json.dump(info_data, f, ensure_ascii=False, indent=2)
     
     if not download_media_files:
         logger.info(f'跳过媒体下载: {note_dir}')
@@ -323,9 +287,11 @@ def download_note(note_info, save_dir, download_media_files=True, proxies=None):
     for i, img_url in enumerate(image_list):
         try:
             img_path = os.path.join(note_dir, f'image_{i+1}.jpg')
-            download_media(img_url, img_path, proxies)
+            download_media(img_url, img_path, proxies, http)
         except Exception as e:
             logger.error(f'下载图片失败: {e}')
+            if failed is not None:
+                failed.append(img_url)
     
     # 下载视频
     video_addr = note_info.get('video_addr')
@@ -339,10 +305,12 @@ def download_note(note_info, save_dir, download_media_files=True, proxies=None):
             try:
                 video_path = os.path.join(note_dir, 'video.mp4')
                 logger.info(f'开始下载视频: {video_addr[:80]}...')
-                download_media(video_addr, video_path, proxies)
+                download_media(video_addr, video_path, proxies, http)
                 logger.info(f'视频下载完成: {video_path}')
             except Exception as e:
                 logger.error(f'下载视频失败: {e}, video_addr: {video_addr[:80]}...')
+                if failed is not None:
+                    failed.append(video_addr)
         else:
             logger.warning(f'笔记 {note_id} 标记为视频类型，但未找到视频地址。请检查info.json中的video_addr字段。')
     
@@ -0,0 +1,134 @@
+"""
+声明式字段路径 -> 预编译提取器
+
+schema 中每个字段由一个或多个路径（按优先级依次尝试）描述，路径在模块加载时编译成闭包，
+解析时不再重复拆分字符串、也不需要逐层 try/except：
+
+    NOTE_SCHEMA = {
+        'note_id': Field('note_card.note_id', required=True),
+        'image_list': Field('note_card.image_list', each='info_list.1.url', default=list),
+        'video_addr': Field('note_card.video.media.stream.h264.0.master_url',
+                            ('note_card.video.consumer.origin_video_key', lambda k: f'https://.../{k}')),
+    }
+    extract_note = compile_schema(NOTE_SCHEMA)
+    values = extract_note(data)
+"""
+
+_MISSING = object()
+_LOOKUP_ERRORS = (KeyError, IndexError, TypeError)
+
+
+def _compile_path(path):
+    """
+    'a.b.0.c' -> getter(obj)，数字段按列表下标处理；可直接传入 callable 作为自定义取值函数
+    """
+    if callable(path):
+        return path
+    keys = tuple(int(key) if key.isdigit() else key for key in path.split('.'))
+    if len(keys) == 1:
+        (k0,) = keys
+
+        def getter(obj):
+            return obj[k0]
+    elif len(keys) == 2:
+        k0, k1 = keys
+
+        def getter(obj):
+            return obj[k0][k1]
+    elif len(keys) == 3:
+        k0, k1, k2 = keys
+
+        def getter(obj):
+            return obj[k0][k1][k2]
+    else:
+        def getter(obj):
+            for key in keys:
+                obj = obj[key]
+            return obj
+    return getter
+
+
+def _compile_source(source):
+    """
+    source 可以是 路径 / callable / (路径, transform)
+    """
+    if isinstance(source, tuple):
+        path, transform = source
+        getter = _compile_path(path)
+
+        def transformed(obj):
+            return transform(getter(obj))
+        return transformed
+    return _compile_path(source)
+
+
+class Field:
+    """
+    字段描述
+    :param sources: 一个或多个取值路径，按顺序尝试，取第一个非空值；只取到空字符串时返回 ''
+    :param default: 全部路径都失败时的默认值，传入 callable（如 list）则每次调用生成新值
+    :param required: 为 True 时全部路径都取不到（缺失或 None）会抛出 KeyError
+    :param each: 取到的值是列表时，对每个元素应用该子路径，失败的元素跳过
+    :param transform: 对最终取值做转换（默认值不做转换）
+    """
+    __slots__ = ('sources', 'default', 'required', 'each', 'transform')
+
+    def __init__(self, *sources, default=None, required=False, each=None, transform=None):
+        self.sources = sources
+        self.default = default
+        self.required = required
+        self.each = each
+        self.transform = transform
+
+
+def _compile_field(name, spec):
+    getters = tuple(_compile_source(source) for source in spec.sources)
+    item_getter = _compile_source(spec.each) if spec.each is not None else None
+    transform = spec.transform
+    required = spec.required
+    default = spec.default
+    default_factory = default if callable(default) else None
+
+    def finish(value):
+        if item_getter is not None:
+            items = []
+            for item in value:
+                try:
+                    items.append(item_getter(item))
+                except _LOOKUP_ERRORS:
+                    pass
+            value = items
+        return transform(value) if transform is not None else value
+
+    def extract(data):
+        empty = _MISSING
+        for getter in getters:
+            try:
+                value = getter(data)
+            except _LOOKUP_ERRORS:
+                continue
+            if value is None:
+                continue
+            if value == '':
+                # 空字符串先记下，继续尝试后面的路径；都没有非空值时仍返回 ''（字段存在，只是为空）
+                if empty is _MISSING:
+                    empty = value
+                continue
+            return finish(value)
+        if empty is not _MISSING:
+            return finish(empty)
+        if required:
+            raise KeyError(name)
+        return default_factory() if default_factory is not None else default
+    return extract
+
+
+def compile_schema(schema):
+    """
+    将 {字段名: Field} 编译为提取函数 extract(data) -> dict
+    """
+    extractors = tuple((name, _compile_field(name, spec)) for name, spec in schema.items())
+
+    def extract(data):
+        return {name: extractor(data) for name, extractor in extractors}
+    return extract
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests
+
+from xhs_utils.metrics import is_risk_response
+
+# 每次请求随机生成、不影响响应内容的字段，计算请求键时去掉
+VOLATILE_FIELDS = ('search_id',)
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+
+class CassetteMiss(KeyError):
+    """
+    回放模式下请求不在录制文件中
+    """
+
+
+class CassetteResponse:
+    """
+    回放的响应，提供 XHS_Apis / download_media 用到的 requests.Response 接口
+    """
+
+    def __init__(self, url, status_code, content, content_type=''):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = {'Content-Type': content_type} if content_type else {}
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f'{self.status_code} Error for url: {self.url}', response=self)
+
+
+def _strip_volatile(value):
+    if isinstance(value, dict):
+        return {key: _strip_volatile(item) for key, item in value.items() if key not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [_strip_volatile(item) for item in value]
+    return value
+
+
+def normalize_url(url):
+    parsed = urlparse(url)
+    query = sorted((key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True) if key not in VOLATILE_FIELDS)
+    return urlunparse(parsed._replace(query=urlencode(query), fragment=''))
+
+
+def normalize_body(data):
+    if data is None or data == '':
+        return ''
+    if isinstance(data, bytes):
+        data = data.decode('utf-8', errors='replace')
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except json.JSONDecodeError:
+            return data
+    return json.dumps(_strip_volatile(data), ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def is_recordable(response, content_type):
+    """
+    只录制成功的响应：HTTP 错误、success 为 false 或 300013 风控的接口响应不写入，
+    避免回放时每次都重现同一个临时失败，也不会在重新录制时覆盖已有的正常响应
+    """
+    if not response.ok:
+        return False
+    if 'json' not in content_type:
+        return True
+    if is_risk_response(response.content):
+        return False
+    try:
+        body = json.loads(response.content)
+    except ValueError:
+        return False
+    return not (isinstance(body, dict) and body.get('success') is False)
+
+
+def request_key(method, url, data=None):
+    """
+    请求键：方法 + 规范化 URL + 去掉易变字段的请求体；签名头、cookies 不参与
+    """
+    raw = f'{method.upper()}\n{normalize_url(url)}\n{normalize_body(data)}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class HttpCassette:
+    """
+    请求录制/回放，作为 XHS_Apis(http=...) 与 download_media(http=...) 的 HTTP 层
+    录制模式照常发请求并把成功的响应（zlib 压缩）写入 SQLite；回放模式只从文件读取，不访问网络
+    :param path: 录制文件路径
+    :param mode: record / replay
+    :param record_media: 录制模式下是否保存图片/视频响应体（关闭后回放时下载媒体会失败）
+    """
+
+    def __init__(self, path, mode=REPLAY, record_media=True):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f'mode 仅支持 {RECORD} / {REPLAY}')
+        self.path = os.path.abspath(path)
+        self.mode = mode
+        self.record_media = record_media
+        if mode == REPLAY and not os.path.exists(self.path):
+            raise FileNotFoundError(f'录制文件不存在: {self.path}')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    method TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    content_type TEXT,
+                    body BLOB NOT NULL,
+                    recorded_at REAL NOT NULL
+                )"""
+            )
+        self.stats = {'recorded': 0, 'not_recorded': 0, 'replayed': 0, 'misses': 0}
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def request(self, method, url, data=None, **kwargs):
+        key = request_key(method, url, data)
+        if self.mode == REPLAY:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT status, content_type, body FROM responses WHERE key = ?', (key,)
+                ).fetchone()
+                if row is None:
+                    self.stats['misses'] += 1
+                    raise CassetteMiss(f'录制文件中没有该请求: {method} {url}')
+                self.stats['replayed'] += 1
+            status, content_type, body = row
+            return CassetteResponse(url, status, zlib.decompress(body), content_type or '')
+
+        response = requests.request(method, url, data=data, **kwargs)
+        content_type = response.headers.get('Content-Type', '')
+        if not is_recordable(response, content_type):
+            with self._lock:
+                self.stats['not_recorded'] += 1
+        elif self.record_media or 'json' in content_type:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    """INSERT OR REPLACE INTO responses (key, method, url, status, content_type, body, recorded_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (key, method.upper(), url, response.status_code, content_type,
+                     zlib.compress(response.content, 6), time.time()),
+                )
+                self.stats['recorded'] += 1
+        return response
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,126 @@
+import json
+import os
+import sqlite3
+
+_open_indexes = {}
+
+
+def get_default_scan_index_path():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "../datas/media_scan.db"))
+
+
+def _stat_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class MediaScanIndex:
+    """
+    媒体目录增量扫描索引：记录每个目录的 mtime、子目录列表以及视频目录的 info.json 状态
+    再次扫描时目录 mtime 与 info.json mtime 都未变化的目录不再 scandir、不再读取 info.json，
+    只需一次 stat；新增/删除文件（包括 os.replace 写入 info.json）都会更新目录 mtime
+    :param db_path: 索引文件路径，默认 datas/media_scan.db
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = os.path.abspath(db_path or get_default_scan_index_path())
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.last_stats = {}
+        self._conn = sqlite3.connect(self.db_path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS media_dirs (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    subdirs TEXT NOT NULL,
+                    has_video INTEGER NOT NULL,
+                    info_mtime_ns INTEGER,
+                    info_state TEXT
+                )"""
+            )
+
+    def _load_known(self, base_path):
+        prefix = base_path.rstrip(os.sep) + os.sep
+        rows = self._conn.execute(
+            """SELECT path, mtime_ns, subdirs, has_video, info_mtime_ns, info_state FROM media_dirs
+               WHERE path = ? OR substr(path, 1, ?) = ?""",
+            (base_path, len(prefix), prefix),
+        )
+        return {row[0]: row[1:] for row in rows}
+
+    def scan(self, base_path, video_name="video.mp4", read_info=None):
+        """
+        扫描媒体目录下所有包含视频的目录
+        :param base_path: 媒体根目录
+        :param video_name: 视频文件名
+        :param read_info: info.json 路径 -> 需要缓存的状态（可 JSON 序列化），为 None 时不读取
+        :return: [(video_path, info_path, info_state), ...]，按路径排序
+        """
+        base_path = os.path.abspath(base_path)
+        known = self._load_known(base_path)
+        seen = set()
+        updates = []
+        targets = []
+        stack = [base_path]
+        while stack:
+            path = stack.pop()
+            mtime = _stat_mtime(path)
+            if mtime is None:
+                continue
+            seen.add(path)
+            info_path = os.path.join(path, "info.json")
+            row = known.get(path)
+            if row is not None and row[0] == mtime and (not row[2] or row[3] == _stat_mtime(info_path)):
+                subdirs = json.loads(row[1])
+                has_video = bool(row[2])
+                info_state = json.loads(row[4]) if row[4] else None
+            else:
+                subdirs = []
+                has_video = False
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif entry.name == video_name:
+                            has_video = True
+                subdirs.sort()
+                info_mtime = None
+                info_state = None
+                if has_video:
+                    info_mtime = _stat_mtime(info_path)
+                    if read_info is not None and info_mtime is not None:
+                        info_state = read_info(info_path)
+                updates.append((
+                    path, mtime, json.dumps(subdirs, ensure_ascii=False), int(has_video), info_mtime,
+                    json.dumps(info_state, ensure_ascii=False) if info_state is not None else None,
+                ))
+            if has_video:
+                targets.append((os.path.join(path, video_name), info_path, info_state or {}))
+            stack.extend(os.path.join(path, name) for name in reversed(subdirs))
+
+        stale = [(path,) for path in known if path not in seen]
+        with self._conn:
+            if updates:
+                self._conn.executemany(
+                    """INSERT OR REPLACE INTO media_dirs
+                       (path, mtime_ns, subdirs, has_video, info_mtime_ns, info_state)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    updates,
+                )
+            if stale:
+                self._conn.executemany("DELETE FROM media_dirs WHERE path = ?", stale)
+        self.last_stats = {"dirs": len(seen), "rescanned": len(updates), "removed": len(stale), "videos": len(targets)}
+        return targets
+
+    def close(self):
+        self._conn.close()
+
+
+def get_scan_index(db_path):
+    db_path = os.path.abspath(db_path)
+    if db_path not in _open_indexes:
+        _open_indexes[db_path] = MediaScanIndex(db_path)
+    return _open_indexes[db_path]
@@ -0,0 +1,243 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from loguru import logger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """
+    只增计数器
+    :param name: 指标名
+    :param documentation: 说明
+    :param labelnames: 标签名
+    """
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+
+class Histogram:
+    """
+    直方图（累计分桶 + sum + count）
+    :param buckets: 分桶上界（秒或字节），自动追加 +Inf
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {repr(float(total))}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        Prometheus 文本格式
+        """
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+SIGN_SECONDS = histogram('xhs_sign_seconds', '请求签名（x-s/x-s-common）耗时', buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+REQUEST_SECONDS = histogram('xhs_request_seconds', '接口请求耗时', ('endpoint', 'status'))
+REQUESTS = counter('xhs_requests', '接口请求数', ('endpoint', 'status'))
+RISK_RESPONSES = counter('xhs_risk_responses', '风控 300013 响应数', ('endpoint',))
+RETRIES = counter('xhs_retries', '风控重试次数', ('func',))
+NOTES_PARSED = counter('xhs_notes_parsed', '解析的笔记数', ('note_type',))
+BYTES_DOWNLOADED = counter('xhs_bytes_downloaded', '下载的媒体字节数', ('kind',))
+MEDIA_DOWNLOADS = counter('xhs_media_downloads', '媒体下载数', ('kind', 'status'))
+VAD_SECONDS = histogram('xhs_vad_seconds', '单个视频人声检测耗时', ('cached',), buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+
+
+def endpoint_label(url):
+    """
+    接口路径作为标签；媒体等非 /api/ 路径统一为 media，避免标签基数无限增长
+    """
+    path = urlparse(url).path
+    return path if path.startswith('/api/') else 'media'
+
+
+# 风控响应体很短，只在短响应里查找错误码
+RISK_PROBE_BYTES = 2048
+
+
+def is_risk_response(content):
+    """
+    接口响应体是否为 300013 风控响应
+    :param content: 响应体 bytes
+    """
+    return len(content) <= RISK_PROBE_BYTES and b'300013' in content
+
+
+class InstrumentedTransport:
+    """
+    给 HTTP 层（requests 或 HttpCassette）包一层耗时/状态统计，接口与 requests 的 get/post 相同
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def get(self, url, **kwargs):
+        return self._call(self.transport.get, url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._call(self.transport.post, url, **kwargs)
+
+    def _call(self, method, url, **kwargs):
+        endpoint = endpoint_label(url)
+        start = time.perf_counter()
+        try:
+            response = method(url, **kwargs)
+        except Exception:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, status='exception')
+            REQUESTS.inc(endpoint=endpoint, status='exception')
+            raise
+        status = str(response.status_code)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, status=status)
+        REQUESTS.inc(endpoint=endpoint, status=status)
+        if endpoint != 'media':
+            if is_risk_response(response.content):
+                RISK_RESPONSES.inc(endpoint=endpoint)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.transport, name)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if urlparse(self.path).path not in ('/metrics', '/'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port=5000, host='0.0.0.0'):
+    """
+    在后台线程启动 /metrics（Prometheus 文本格式）
+    :return: ThreadingHTTPServer，调用 shutdown() 停止
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f'指标服务已启动: http://{host}:{port}/metrics')
+    return server
@@ -0,0 +1,99 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+def get_default_note_cache_path():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "../datas/note_cache.db"))
+
+
+class NoteCache:
+    """
+    笔记详情（/api/sns/web/v1/feed 原始响应）磁盘缓存，带 TTL 和按条数的 LRU 淘汰
+    键为 note_id + xsec_source；xsec_token 随列表页变化但详情内容相同，不参与键
+    :param db_path: 缓存文件路径，默认 datas/note_cache.db
+    :param ttl: 有效期（秒），None 表示不过期
+    :param max_entries: 最多保存的笔记数，超出后淘汰最久未访问的
+    """
+
+    def __init__(self, db_path=None, ttl=24 * 3600, max_entries=50000):
+        self.db_path = os.path.abspath(db_path or get_default_note_cache_path())
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stored': 0, 'evicted': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS note_responses (
+                    note_id TEXT NOT NULL,
+                    xsec_source TEXT NOT NULL,
+                    response BLOB NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (note_id, xsec_source)
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_note_responses_accessed ON note_responses(accessed_at)")
+
+    def get(self, note_id, xsec_source=''):
+        """
+        :return: 缓存的响应 dict，未命中或已过期返回 None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, fetched_at FROM note_responses WHERE note_id = ? AND xsec_source = ?",
+                (note_id, xsec_source),
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            if self.ttl is not None and now - row[1] > self.ttl:
+                with self._conn:
+                    self._conn.execute(
+                        "DELETE FROM note_responses WHERE note_id = ? AND xsec_source = ?", (note_id, xsec_source)
+                    )
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE note_responses SET accessed_at = ? WHERE note_id = ? AND xsec_source = ?",
+                    (now, note_id, xsec_source),
+                )
+            self.stats['hits'] += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, note_id, response, xsec_source=''):
+        now = time.time()
+        blob = zlib.compress(json.dumps(response, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO note_responses (note_id, xsec_source, response, fetched_at, accessed_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (note_id, xsec_source, blob, now, now),
+            )
+            self.stats['stored'] += 1
+            if self.max_entries is not None:
+                count = self._conn.execute("SELECT COUNT(*) FROM note_responses").fetchone()[0]
+                if count > self.max_entries:
+                    evicted = self._conn.execute(
+                        """DELETE FROM note_responses WHERE rowid IN (
+                               SELECT rowid FROM note_responses ORDER BY accessed_at LIMIT ?)""",
+                        (count - self.max_entries,),
+                    ).rowcount
+                    self.stats['evicted'] += evicted
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM note_responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,222 @@
+import atexit
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+from loguru import logger
+
+
+def get_default_profile_dir():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "../datas/profile"))
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+
+
+class Profiler:
+    """
+    分阶段计时 + 可选 cProfile / 栈采样，结束时输出汇总表与火焰图文件
+    :param output_dir: 结果目录（summary.json、stacks.folded、cprofile.prof）
+    :param use_cprofile: 是否同时启用 cProfile（只统计启动它的线程）
+    :param sample_interval: 栈采样间隔（秒），0 或 None 关闭；采样结果为 collapsed stack 格式，可直接用 flamegraph.pl / speedscope 打开
+    """
+
+    def __init__(self, output_dir=None, use_cprofile=False, sample_interval=0.005):
+        self.output_dir = os.path.abspath(output_dir or get_default_profile_dir())
+        self.use_cprofile = use_cprofile
+        self.sample_interval = sample_interval
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._cprofile = None
+        self._sampler = None
+        self._stop_event = threading.Event()
+        self._stacks = {}
+        self._started_at = None
+        self._stopped = False
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def record(self, name, elapsed):
+        with self._lock:
+            stat = self.stages.get(name)
+            if stat is None:
+                self.stages[name] = [1, elapsed, elapsed]
+            else:
+                stat[0] += 1
+                stat[1] += elapsed
+                if elapsed > stat[2]:
+                    stat[2] = elapsed
+
+    def wrap(self, func, name=None):
+        name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        wrapper.__profiled__ = func
+        return wrapper
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        if self.use_cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        if self.sample_interval:
+            self._sampler = threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True)
+            self._sampler.start()
+        return self
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.sample_interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                key = ';'.join(reversed(stack))
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+
+    def summary(self):
+        wall = time.perf_counter() - self._started_at if self._started_at else 0.0
+        with self._lock:
+            rows = sorted(self.stages.items(), key=lambda item: -item[1][1])
+        return {
+            'wall_seconds': round(wall, 3),
+            'stages': [
+                {
+                    'stage': name,
+                    'calls': calls,
+                    'total_seconds': round(total, 4),
+                    'avg_ms': round(total / calls * 1000, 3),
+                    'max_ms': round(longest * 1000, 3),
+                    'wall_share': round(total / wall, 4) if wall else None,
+                }
+                for name, (calls, total, longest) in rows
+            ],
+        }
+
+    def format_table(self, summary):
+        lines = [f"{'stage':<48}{'calls':>8}{'total(s)':>12}{'avg(ms)':>12}{'max(ms)':>12}{'wall%':>8}"]
+        for row in summary['stages']:
+            share = f"{row['wall_share'] * 100:.1f}" if row['wall_share'] is not None else '-'
+            lines.append(f"{row['stage'][:47]:<48}{row['calls']:>8}{row['total_seconds']:>12.3f}{row['avg_ms']:>12.3f}{row['max_ms']:>12.3f}{share:>8}")
+        lines.append(f"wall: {summary['wall_seconds']:.3f}s（并发阶段的耗时可能重叠，占比之和可超过 100%）")
+        return '\n'.join(lines)
+
+    def stop(self):
+        """
+        停止采样并写出结果，重复调用只生效一次
+        :return: 汇总 dict
+        """
+        if self._stopped:
+            return None
+        self._stopped = True
+        self._stop_event.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1.0)
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        summary = self.summary()
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, 'summary.json'), mode='w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        if self._stacks:
+            with open(os.path.join(self.output_dir, 'stacks.folded'), mode='w', encoding='utf-8') as f:
+                for stack, count in sorted(self._stacks.items()):
+                    f.write(f'{stack} {count}\n')
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(os.path.join(self.output_dir, 'cprofile.prof'))
+        logger.info(f'性能分析汇总（结果目录 {self.output_dir}）:\n{self.format_table(summary)}')
+        return summary
+
+
+# (模块名, 属性名, 阶段名)；同一函数被 from-import 到其他模块时会一并替换
+HOT_PATHS = (
+    ('xhs_utils.xhs_util', 'generate_xs_xs_common', 'sign.generate_xs_xs_common'),
+    ('xhs_utils.xhs_util', 'generate_xray_traceid', 'sign.generate_xray_traceid'),
+    ('xhs_utils.data_util', 'handle_note_info', 'parse.handle_note_info'),
+    ('xhs_utils.data_util', 'download_media', 'io.download_media'),
+    ('xhs_utils.data_util', 'save_to_xlsx', 'io.save_to_xlsx'),
+    ('xhs_utils.audio_filter', 'detect_speech_vad', 'vad.detect_speech_vad'),
+    ('xhs_utils.audio_filter', 'detect_speech_vad_stream', 'vad.detect_speech_vad_stream'),
+    ('xhs_utils.audio_filter', 'detect_speech_vad_sampled', 'vad.detect_speech_vad_sampled'),
+)
+
+
+def _replace_everywhere(original, replacement):
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, '__dict__', None)
+        if not namespace:
+            continue
+        for attr, value in list(namespace.items()):
+            if value is original:
+                setattr(module, attr, replacement)
+
+
+def _wrap_http(profiler):
+    from xhs_utils.metrics import InstrumentedTransport, endpoint_label
+    original = InstrumentedTransport._call
+    if hasattr(original, '__profiled__'):
+        return
+
+    @functools.wraps(original)
+    def _call(self, method, url, **kwargs):
+        with profiler.stage(f'http {endpoint_label(url)}'):
+            return original(self, method, url, **kwargs)
+    _call.__profiled__ = original
+    InstrumentedTransport._call = _call
+
+
+def install_hooks(profiler, hot_paths=HOT_PATHS):
+    """
+    给热点函数包上计时；模块未导入时跳过
+    """
+    for module_name, attr, stage in hot_paths:
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        original = getattr(module, attr, None)
+        if original is None or hasattr(original, '__profiled__'):
+            continue
+        _replace_everywhere(original, profiler.wrap(original, stage))
+    if 'xhs_utils.metrics' in sys.modules:
+        _wrap_http(profiler)
+
+
+def enable_profiling(output_dir=None, use_cprofile=False, sample_interval=0.005):
+    """
+    开启性能分析：包装热点函数、启动采样，进程退出时自动输出汇总
+    需在相关模块导入之后、进程池创建之前调用；进程池子进程中的耗时不计入
+    :return: Profiler
+    """
+    profiler = Profiler(output_dir, use_cprofile=use_cprofile, sample_interval=sample_interval)
+    install_hooks(profiler)
+    atexit.register(profiler.stop)
+    return profiler.start()
@@ -0,0 +1,37 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    线程安全的令牌桶限速器，多个线程/接口共享同一个实例即可共享请求配额
+    :param rate: 每秒补充的令牌数（平均请求速率）
+    :param burst: 桶容量（允许的瞬时并发请求数）
+    """
+
+    def __init__(self, rate=2.0, burst=2):
+        if rate <= 0:
+            raise ValueError('rate 必须大于 0')
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        获取一个令牌，不足时阻塞等待
+        :return: 实际等待的秒数
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
@@ -0,0 +1,97 @@
+from dataclasses import dataclass, field, fields
+
+
+class _RecordMixin:
+    """
+    让 __slots__ 记录类兼容原有的 dict 用法（note_info['title']、note_info.get(...)、dict(note_info)），
+    只在导出（json/excel）时才转换成 dict
+    """
+    __slots__ = ()
+
+    @classmethod
+    def field_names(cls):
+        return tuple(f.name for f in fields(cls))
+
+    def keys(self):
+        return self.field_names()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in self.field_names()
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.field_names()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data.get(name) for name in cls.field_names()})
+
+
+@dataclass(slots=True)
+class NoteRecord(_RecordMixin):
+    note_id: str
+    note_url: str
+    note_type: str
+    user_id: str
+    home_url: str
+    nickname: str
+    avatar: str
+    title: str
+    desc: str
+    liked_count: str
+    collected_count: str
+    comment_count: str
+    share_count: str
+    video_cover: str | None
+    video_addr: str | None
+    image_list: list = field(default_factory=list)
+    tags: list = field(default_factory=list)
+    upload_time: str = '未知'
+    ip_location: str = '未知'
+
+
+@dataclass(slots=True)
+class CommentRecord(_RecordMixin):
+    note_id: str
+    note_url: str
+    comment_id: str
+    user_id: str
+    home_url: str
+    nickname: str
+    avatar: str
+    content: str
+    show_tags: list
+    like_count: str
+    upload_time: str = '未知'
+    ip_location: str = '未知'
+    pictures: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class UserRecord(_RecordMixin):
+    user_id: str
+    home_url: str
+    nickname: str
+    avatar: str
+    desc: str
+    follows: str
+    fans: str
+    interaction: str
+    tags: list = field(default_factory=list)
+
+
+def to_dict(record):
+    """
+    导出边界：记录类转 dict，普通 dict 原样返回
+    """
+    if isinstance(record, _RecordMixin):
+        return record.to_dict()
+    return record
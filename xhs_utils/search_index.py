@@ -0,0 +1,261 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from loguru import logger
+
+# trigram 分词器按字符三元组建索引，对中文无需额外分词库；短于3个字的词回退到子串扫描
+TRIGRAM_MIN_LEN = 3
+
+
+def get_default_index_path():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), '../datas/search_index.db'))
+
+
+def get_default_comment_path():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), '../datas/comment_datas'))
+
+
+def _join_tags(tags):
+    if not tags:
+        return ''
+    if isinstance(tags, str):
+        return tags
+    return ' '.join(str(tag) for tag in tags)
+
+
+class NoteSearchIndex:
+    """
+    基于 SQLite FTS5 的本地全文索引，覆盖笔记的 title/desc/tags 和评论 content
+    :param db_path: 索引文件路径，默认 datas/search_index.db
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = os.path.abspath(db_path or get_default_index_path())
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        # --processes 时多个进程同时写入，等待锁而不是立即报错
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self.tokenizer = self._create_schema()
+
+    def _create_schema(self):
+        tokenizer = 'trigram'
+        try:
+            self._conn.execute('CREATE VIRTUAL TABLE IF NOT EXISTS _tokenizer_probe USING fts5(x, tokenize="trigram")')
+            self._conn.execute('DROP TABLE _tokenizer_probe')
+        except sqlite3.OperationalError:
+            logger.warning('当前 SQLite 不支持 trigram 分词器（需要 3.34+），中文检索效果会变差')
+            tokenizer = 'unicode61'
+        with self._conn:
+            self._conn.executescript(f'''
+                CREATE TABLE IF NOT EXISTS notes (
+                    note_id TEXT PRIMARY KEY,
+                    note_url TEXT,
+                    nickname TEXT,
+                    user_id TEXT,
+                    keyword TEXT,
+                    note_dir TEXT,
+                    updated_at REAL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(title, desc, tags, tokenize="{tokenizer}");
+                CREATE TABLE IF NOT EXISTS comments (
+                    comment_id TEXT PRIMARY KEY,
+                    note_id TEXT,
+                    nickname TEXT,
+                    updated_at REAL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(content, tokenize="{tokenizer}");
+            ''')
+        return tokenizer
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add_note(self, note_info, keyword=None, note_dir=None):
+        """
+        新增或更新一条笔记（按 note_id 去重）
+        :param note_info: handle_note_info 返回的笔记信息
+        :param keyword: 搜索关键词
+        :param note_dir: 笔记保存目录
+        """
+        self.add_notes([note_info], keyword=keyword, note_dirs=[note_dir])
+
+    def add_notes(self, note_infos, keyword=None, note_dirs=None):
+        """
+        批量新增或更新笔记，单个事务提交
+        :param note_infos: 笔记信息列表
+        :param keyword: 搜索关键词
+        :param note_dirs: 与 note_infos 一一对应的保存目录（可选）
+        """
+        now = time.time()
+        note_dirs = note_dirs or [None] * len(note_infos)
+        with self._lock, self._conn:
+            for note_info, note_dir in zip(note_infos, note_dirs):
+                rowid = self._conn.execute(
+                    '''INSERT INTO notes (note_id, note_url, nickname, user_id, keyword, note_dir, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT(note_id) DO UPDATE SET
+                           note_url=excluded.note_url, nickname=excluded.nickname, user_id=excluded.user_id,
+                           keyword=COALESCE(excluded.keyword, notes.keyword),
+                           note_dir=COALESCE(excluded.note_dir, notes.note_dir),
+                           updated_at=excluded.updated_at
+                       RETURNING rowid''',
+                    (note_info['note_id'], note_info.get('note_url'), note_info.get('nickname'),
+                     note_info.get('user_id'), keyword, note_dir, now),
+                ).fetchone()[0]
+                self._conn.execute('DELETE FROM notes_fts WHERE rowid = ?', (rowid,))
+                self._conn.execute(
+                    'INSERT INTO notes_fts (rowid, title, desc, tags) VALUES (?, ?, ?, ?)',
+                    (rowid, note_info.get('title') or '', note_info.get('desc') or '', _join_tags(note_info.get('tags'))),
+                )
+
+    def add_comments(self, comment_infos):
+        """
+        批量新增或更新评论（按 comment_id 去重）
+        :param comment_infos: handle_comment_info 返回的评论信息列表
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            for comment_info in comment_infos:
+                rowid = self._conn.execute(
+                    '''INSERT INTO comments (comment_id, note_id, nickname, updated_at) VALUES (?, ?, ?, ?)
+                       ON CONFLICT(comment_id) DO UPDATE SET
+                           note_id=excluded.note_id, nickname=excluded.nickname, updated_at=excluded.updated_at
+                       RETURNING rowid''',
+                    (comment_info['comment_id'], comment_info.get('note_id'), comment_info.get('nickname'), now),
+                ).fetchone()[0]
+                self._conn.execute('DELETE FROM comments_fts WHERE rowid = ?', (rowid,))
+                self._conn.execute(
+                    'INSERT INTO comments_fts (rowid, content) VALUES (?, ?)',
+                    (rowid, comment_info.get('content') or ''),
+                )
+
+    def _build_where(self, fts_table, columns, query):
+        """
+        把查询拆成若干词：长度足够的词走 FTS MATCH，短词回退到 instr 子串扫描
+        （部分 SQLite 版本的 trigram 表对短 LIKE 模式返回空结果，因此不用 LIKE）
+        """
+        terms = [term for term in query.split() if term]
+        if not terms:
+            raise ValueError('查询不能为空')
+        match_terms = []
+        scan_clauses = []
+        params = []
+        for term in terms:
+            if self.tokenizer != 'trigram' or len(term) >= TRIGRAM_MIN_LEN:
+                match_terms.append('"' + term.replace('"', '""') + '"')
+            else:
+                scan_clauses.append('(' + ' OR '.join(f'instr({fts_table}.{col}, ?) > 0' for col in columns) + ')')
+                params.extend([term] * len(columns))
+        clauses = []
+        if match_terms:
+            clauses.append(f'{fts_table} MATCH ?')
+            params.insert(0, ' AND '.join(match_terms))
+        clauses.extend(scan_clauses)
+        return ' AND '.join(clauses), params, bool(match_terms)
+
+    def search_notes(self, query, limit=20):
+        """
+        检索笔记
+        :param query: 查询词，空格分隔表示同时包含
+        :param limit: 返回条数
+        :return: 结果列表，按相关度排序
+        """
+        where, params, ranked = self._build_where('notes_fts', ('title', 'desc', 'tags'), query)
+        order = 'ORDER BY rank' if ranked else 'ORDER BY notes.updated_at DESC'
+        sql = f'''
+            SELECT notes.note_id, notes.note_url, notes.nickname, notes.keyword, notes.note_dir,
+                   notes_fts.title, snippet(notes_fts, 1, '[', ']', '…', 16), notes_fts.tags
+            FROM notes_fts JOIN notes ON notes.rowid = notes_fts.rowid
+            WHERE {where} {order} LIMIT ?
+        '''
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        keys = ('note_id', 'note_url', 'nickname', 'keyword', 'note_dir', 'title', 'snippet', 'tags')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def search_comments(self, query, limit=20):
+        """
+        检索评论
+        :param query: 查询词，空格分隔表示同时包含
+        :param limit: 返回条数
+        :return: 结果列表，按相关度排序
+        """
+        where, params, ranked = self._build_where('comments_fts', ('content',), query)
+        order = 'ORDER BY rank' if ranked else 'ORDER BY comments.updated_at DESC'
+        sql = f'''
+            SELECT comments.comment_id, comments.note_id, comments.nickname, comments_fts.content
+            FROM comments_fts JOIN comments ON comments.rowid = comments_fts.rowid
+            WHERE {where} {order} LIMIT ?
+        '''
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        keys = ('comment_id', 'note_id', 'nickname', 'content')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def build_from_media_dir(self, base_path, batch_size=500):
+        """
+        从媒体目录中已有的 info.json 回填索引
+        :param base_path: 媒体目录，默认 datas/media_datas
+        :param batch_size: 每个事务提交的笔记数
+        :return: 索引的笔记数
+        """
+        batch, dirs = [], []
+        total = 0
+        for root, _dirs, files in os.walk(base_path):
+            if 'info.json' not in files:
+                continue
+            try:
+                with open(os.path.join(root, 'info.json'), mode='r', encoding='utf-8') as f:
+                    note_info = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                logger.warning(f'info.json 读取失败: {root} -> {e}')
+                continue
+            if 'note_id' not in note_info:
+                continue
+            batch.append(note_info)
+            dirs.append(root)
+            if len(batch) >= batch_size:
+                self.add_notes(batch, note_dirs=dirs)
+                total += len(batch)
+                batch, dirs = [], []
+        if batch:
+            self.add_notes(batch, note_dirs=dirs)
+            total += len(batch)
+        logger.info(f'索引回填完成: {total} 条笔记')
+        return total
+
+    def build_comments_from_dir(self, comment_path):
+        """
+        从评论目录中已有的 <note_id>.json（服务模式评论任务的输出）回填评论索引
+        :param comment_path: 评论目录，默认 datas/comment_datas
+        :return: 索引的评论数
+        """
+        total = 0
+        if not os.path.isdir(comment_path):
+            return total
+        for name in sorted(os.listdir(comment_path)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(comment_path, name), mode='r', encoding='utf-8') as f:
+                    comment_infos = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                logger.warning(f'评论文件读取失败: {name} -> {e}')
+                continue
+            comment_infos = [item for item in comment_infos if isinstance(item, dict) and item.get('comment_id')]
+            self.add_comments(comment_infos)
+            total += len(comment_infos)
+        logger.info(f'评论索引回填完成: {total} 条评论')
+        return total
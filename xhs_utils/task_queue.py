@@ -0,0 +1,413 @@
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import requests
+from loguru import logger
+
+QUEUED = 'queued'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+# 协调端与 worker 共享的访问令牌，通过请求头传递
+QUEUE_TOKEN_ENV = 'XHS_QUEUE_TOKEN'
+QUEUE_TOKEN_HEADER = 'X-Queue-Token'
+
+
+def get_default_task_queue_path():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "../datas/task_queue.db"))
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class TaskQueue:
+    """
+    多进程/多节点共享的任务队列（SQLite），任务按 dedupe_key 去重，领取后带租约：
+    租约过期未完成的任务会被其他 worker 重新领取，超过 max_attempts 次标记为失败
+    同时维护共享的笔记清单（manifest），记录每个笔记由哪个 worker 保存到哪里；
+    笔记任务按 note_id 去重，关键词与笔记的对应关系单独记录在 keyword_notes 中，多个关键词搜到同一笔记时都能导出
+    同一台机器上的多个进程可直接共用数据库文件；跨机器时由协调端 serve_task_queue 暴露为 HTTP，worker 使用 RemoteTaskQueue
+    :param db_path: 文件路径，默认 datas/task_queue.db
+    :param max_attempts: 单个任务最多领取次数
+    """
+
+    def __init__(self, db_path=None, max_attempts=3):
+        self.db_path = os.path.abspath(db_path or get_default_task_queue_path())
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    dedupe_key TEXT NOT NULL UNIQUE,
+                    payload TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    lease_until REAL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(status, priority, id)")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS manifest (
+                    note_id TEXT PRIMARY KEY,
+                    note_url TEXT NOT NULL,
+                    keyword TEXT,
+                    worker TEXT NOT NULL,
+                    note_dir TEXT,
+                    record TEXT NOT NULL,
+                    saved_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_manifest_keyword ON manifest(keyword)")
+            has_keyword_notes = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'keyword_notes'"
+            ).fetchone() is not None
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS keyword_notes (
+                    keyword TEXT NOT NULL,
+                    note_id TEXT NOT NULL,
+                    added_at REAL NOT NULL,
+                    PRIMARY KEY (keyword, note_id)
+                )"""
+            )
+            if not has_keyword_notes:
+                # 旧版本的队列只在 manifest.keyword 中记录了第一个关键词
+                self._conn.execute(
+                    """INSERT OR IGNORE INTO keyword_notes (keyword, note_id, added_at)
+                       SELECT keyword, note_id, saved_at FROM manifest WHERE keyword IS NOT NULL"""
+                )
+
+    def put(self, kind, payload, dedupe_key, priority=0):
+        """
+        :return: 是否新加入（dedupe_key 已存在时忽略）
+        """
+        return self.put_many([(kind, payload, dedupe_key, priority)]) == 1
+
+    def put_many(self, tasks):
+        """
+        :param tasks: [(kind, payload, dedupe_key, priority)]
+        :return: 新加入的任务数
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                """INSERT OR IGNORE INTO tasks (kind, dedupe_key, payload, priority, status, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [(kind, dedupe_key, _dumps(payload), priority, QUEUED, now, now) for kind, payload, dedupe_key, priority in tasks],
+            )
+            return self._conn.total_changes - before
+
+    def claim(self, worker, lease_seconds=600.0, kinds=None):
+        """
+        领取一个任务（优先级高的先领），排队中或租约已过期的任务都可领取
+        :param kinds: 只领取指定类型，默认全部
+        :return: dict(id, kind, payload, attempts)，没有可领取的任务返回 None
+        """
+        now = time.time()
+        kinds = tuple(kinds or ())
+        kind_filter = f"AND kind IN ({','.join('?' * len(kinds))})" if kinds else ''
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, error = 'lease expired', updated_at = ? WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, now, LEASED, now, self.max_attempts),
+            )
+            # 单条 UPDATE ... RETURNING，多个进程同时领取也不会拿到同一个任务
+            row = self._conn.execute(
+                f"""UPDATE tasks SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated_at = ?
+                    WHERE id = (
+                        SELECT id FROM tasks
+                        WHERE (status = ? OR (status = ? AND lease_until < ?)) AND attempts < ? {kind_filter}
+                        ORDER BY priority DESC, id LIMIT 1
+                    )
+                    RETURNING id, kind, payload, attempts""",
+                (LEASED, worker, now + lease_seconds, now, QUEUED, LEASED, now, self.max_attempts) + kinds,
+            ).fetchone()
+        if row is None:
+            return None
+        return {'id': row[0], 'kind': row[1], 'payload': json.loads(row[2]), 'attempts': row[3]}
+
+    def renew(self, task_id, worker, lease_seconds=600.0):
+        """
+        续租；任务已被其他 worker 接手时返回 False
+        """
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE tasks SET lease_until = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                (time.time() + lease_seconds, time.time(), task_id, worker, LEASED),
+            ).rowcount == 1
+
+    def complete(self, task_id, worker, result=None):
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = NULL, lease_until = NULL, updated_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                (DONE, _dumps(result) if result is not None else None, time.time(), task_id, worker, LEASED),
+            ).rowcount == 1
+
+    def fail(self, task_id, worker, error, retry=True):
+        """
+        :param retry: 是否放回队列重试（领取次数达到 max_attempts 后不再重试）
+        """
+        with self._lock, self._conn:
+            return self._conn.execute(
+                """UPDATE tasks SET status = CASE WHEN ? AND attempts < ? THEN ? ELSE ? END,
+                       error = ?, lease_until = NULL, updated_at = ?
+                   WHERE id = ? AND worker = ? AND status = ?""",
+                (int(retry), self.max_attempts, QUEUED, FAILED, error, time.time(), task_id, worker, LEASED),
+            ).rowcount == 1
+
+    def add_keyword_notes(self, keyword, note_ids):
+        """
+        记录关键词搜到的笔记（包括已被其他关键词放入队列的笔记）
+        :return: 新记录的对应关系数
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO keyword_notes (keyword, note_id, added_at) VALUES (?, ?, ?)",
+                [(keyword, note_id, now) for note_id in note_ids],
+            )
+            return self._conn.total_changes - before
+
+    def keyword_notes(self):
+        """
+        :return: [(keyword, note_id)]，按关键词和加入顺序排列
+        """
+        with self._lock:
+            return self._conn.execute("SELECT keyword, note_id FROM keyword_notes ORDER BY keyword, added_at").fetchall()
+
+    def record_note(self, note_id, note_url, record, worker, keyword=None, note_dir=None):
+        """
+        写入共享清单，同一 note_id 只保留第一次
+        :return: 是否新写入
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            if keyword is not None:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO keyword_notes (keyword, note_id, added_at) VALUES (?, ?, ?)", (keyword, note_id, now)
+                )
+            return self._conn.execute(
+                """INSERT OR IGNORE INTO manifest (note_id, note_url, keyword, worker, note_dir, record, saved_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (note_id, note_url, keyword, worker, note_dir, _dumps(record), now),
+            ).rowcount == 1
+
+    def has_note(self, note_id):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM manifest WHERE note_id = ?", (note_id,)).fetchone() is not None
+
+    def manifest(self, keyword=None):
+        """
+        :param keyword: 只返回该关键词搜到的笔记（按 keyword_notes），默认全部
+        :return: [dict(note_id, note_url, keyword, worker, note_dir, record)]，keyword 为第一次保存时的关键词
+        """
+        sql = "SELECT m.note_id, m.note_url, m.keyword, m.worker, m.note_dir, m.record FROM manifest m"
+        args = ()
+        if keyword is not None:
+            sql += " JOIN keyword_notes k ON k.note_id = m.note_id WHERE k.keyword = ?"
+            args = (keyword,)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY m.saved_at", args).fetchall()
+        return [
+            {'note_id': note_id, 'note_url': note_url, 'keyword': kw, 'worker': worker, 'note_dir': note_dir, 'record': json.loads(record)}
+            for note_id, note_url, kw, worker, note_dir, record in rows
+        ]
+
+    def failures(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, payload, attempts, worker, error FROM tasks WHERE status = ? ORDER BY id", (FAILED,)
+            ).fetchall()
+        return [
+            {'id': task_id, 'kind': kind, 'payload': json.loads(payload), 'attempts': attempts, 'worker': worker, 'error': error}
+            for task_id, kind, payload, attempts, worker, error in rows
+        ]
+
+    def stats(self):
+        """
+        :return: {'tasks': {kind: {status: n}}, 'active': 排队中+执行中的任务数, 'manifest': 笔记数, 'workers': {worker: 完成数}}
+        """
+        with self._lock:
+            tasks = {}
+            for kind, status, count in self._conn.execute("SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status"):
+                tasks.setdefault(kind, {})[status] = count
+            manifest = self._conn.execute("SELECT COUNT(*) FROM manifest").fetchone()[0]
+            workers = dict(self._conn.execute("SELECT worker, COUNT(*) FROM manifest GROUP BY worker").fetchall())
+        active = sum(counts.get(QUEUED, 0) + counts.get(LEASED, 0) for counts in tasks.values())
+        return {'tasks': tasks, 'active': active, 'manifest': manifest, 'workers': workers}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# 允许通过 HTTP 调用的方法
+REMOTE_METHODS = (
+    'put', 'put_many', 'claim', 'renew', 'complete', 'fail', 'add_keyword_notes', 'keyword_notes',
+    'record_note', 'has_note', 'manifest', 'failures', 'stats',
+)
+
+
+class RemoteTaskQueue:
+    """
+    通过 HTTP 访问协调端的 TaskQueue，接口与 TaskQueue 相同
+    :param base_url: 协调端地址，如 http://10.0.0.2:5010
+    :param token: 访问令牌，默认读取环境变量 XHS_QUEUE_TOKEN
+    """
+
+    def __init__(self, base_url, timeout=30, token=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._session = requests.Session()
+        token = token or os.getenv(QUEUE_TOKEN_ENV)
+        if token:
+            self._session.headers[QUEUE_TOKEN_HEADER] = token
+
+    def _call(self, method, **kwargs):
+        response = self._session.post(f'{self.base_url}/rpc/{method}', json=kwargs, timeout=self.timeout)
+        body = response.json()
+        if response.status_code != 200:
+            raise RuntimeError(f'任务队列调用 {method} 失败: {body.get("error")}')
+        return body['result']
+
+    def put(self, kind, payload, dedupe_key, priority=0):
+        return self._call('put', kind=kind, payload=payload, dedupe_key=dedupe_key, priority=priority)
+
+    def put_many(self, tasks):
+        return self._call('put_many', tasks=[list(task) for task in tasks])
+
+    def claim(self, worker, lease_seconds=600.0, kinds=None):
+        return self._call('claim', worker=worker, lease_seconds=lease_seconds, kinds=list(kinds) if kinds else None)
+
+    def renew(self, task_id, worker, lease_seconds=600.0):
+        return self._call('renew', task_id=task_id, worker=worker, lease_seconds=lease_seconds)
+
+    def complete(self, task_id, worker, result=None):
+        return self._call('complete', task_id=task_id, worker=worker, result=result)
+
+    def fail(self, task_id, worker, error, retry=True):
+        return self._call('fail', task_id=task_id, worker=worker, error=error, retry=retry)
+
+    def add_keyword_notes(self, keyword, note_ids):
+        return self._call('add_keyword_notes', keyword=keyword, note_ids=list(note_ids))
+
+    def keyword_notes(self):
+        return [tuple(pair) for pair in self._call('keyword_notes')]
+
+    def record_note(self, note_id, note_url, record, worker, keyword=None, note_dir=None):
+        return self._call('record_note', note_id=note_id, note_url=note_url, record=record, worker=worker, keyword=keyword, note_dir=note_dir)
+
+    def has_note(self, note_id):
+        return self._call('has_note', note_id=note_id)
+
+    def manifest(self, keyword=None):
+        return self._call('manifest', keyword=keyword)
+
+    def failures(self):
+        return self._call('failures')
+
+    def stats(self):
+        return self._call('stats')
+
+    def close(self):
+        self._session.close()
+
+
+def open_task_queue(spec=None, max_attempts=3):
+    """
+    :param spec: http(s):// 开头时连接协调端，否则视为本地数据库路径（默认 datas/task_queue.db）
+    """
+    if spec and spec.startswith(('http://', 'https://')):
+        return RemoteTaskQueue(spec)
+    return TaskQueue(spec or None, max_attempts=max_attempts)
+
+
+class _QueueHandler(BaseHTTPRequestHandler):
+    queue: TaskQueue = None
+    token: str = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        supplied = self.headers.get(QUEUE_TOKEN_HEADER) or ''
+        if hmac.compare_digest(supplied.encode('utf-8'), self.token.encode('utf-8')):
+            return True
+        self._send_json(401, {'error': 'invalid token'})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if urlparse(self.path).path.rstrip('/') == '/stats':
+            self._send_json(200, self.queue.stats())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        path = urlparse(self.path).path.rstrip('/')
+        method = path[len('/rpc/'):] if path.startswith('/rpc/') else None
+        if method not in REMOTE_METHODS:
+            self._send_json(404, {'error': 'not found'})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            kwargs = json.loads(self.rfile.read(length) or b'{}')
+            result = getattr(self.queue, method)(**kwargs)
+        except (TypeError, ValueError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except sqlite3.Error as e:
+            logger.error(f'任务队列调用 {method} 失败: {e}')
+            self._send_json(500, {'error': f'{type(e).__name__}: {e}'})
+            return
+        self._send_json(200, {'result': result})
+
+
+def serve_task_queue(queue, host='127.0.0.1', port=5010, token=None):
+    """
+    将本地 TaskQueue 暴露给其他节点的 worker，所有请求都需要携带访问令牌
+    :param host: 监听地址，默认只监听本机；供其他机器访问时显式指定 0.0.0.0 等地址
+    :param token: 访问令牌，默认读取环境变量 XHS_QUEUE_TOKEN
+    :raises ValueError: 未设置访问令牌
+    :return: ThreadingHTTPServer，调用 serve_forever() 运行
+    """
+    token = token or os.getenv(QUEUE_TOKEN_ENV)
+    if not token:
+        raise ValueError(f'提供队列服务需要设置访问令牌（环境变量 {QUEUE_TOKEN_ENV}）')
+    handler = type('QueueHandler', (_QueueHandler,), {'queue': queue, 'token': token})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    logger.info(f'任务队列服务已启动: http://{host}:{server.server_address[1]}')
+    return server
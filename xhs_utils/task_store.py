@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# 任务状态
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+# 笔记状态：详情已获取（记录已落库）但媒体尚未保存
+FETCHED = 'fetched'
+
+
+def get_default_task_store_path():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "../datas/task_store.db"))
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class TaskStore:
+    """
+    爬取任务的断点记录：每个关键词/用户一条任务，记录已完成的页码或 cursor、已拿到的列表条目，
+    以及每个笔记的状态（pending -> fetched -> done / failed），进程中断后从最后完成的页和未完成的笔记继续
+    :param db_path: 文件路径，默认 datas/task_store.db
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = os.path.abspath(db_path or get_default_task_store_path())
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    job_key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    page INTEGER NOT NULL DEFAULT 0,
+                    cursor TEXT NOT NULL DEFAULT '',
+                    listing_done INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS job_items (
+                    job_key TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (job_key, item_id)
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS note_tasks (
+                    job_key TEXT NOT NULL,
+                    note_id TEXT NOT NULL,
+                    note_url TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    record TEXT,
+                    error TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (job_key, note_id)
+                )"""
+            )
+
+    @staticmethod
+    def job_key(kind, target, params=None):
+        """
+        任务键：类型 + 目标 + 参数摘要；参数（数量、排序等）变化时视为新任务
+        """
+        digest = hashlib.sha1(_dumps(params or {}).encode('utf-8')).hexdigest()[:10]
+        return f'{kind}:{target}:{digest}'
+
+    def open_job(self, kind, target, params=None):
+        """
+        获取任务，不存在则创建
+        :return: dict(job_key, status, page, cursor, listing_done, items)
+        """
+        key = self.job_key(kind, target, params)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT OR IGNORE INTO jobs (job_key, kind, target, params, status, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (key, kind, target, _dumps(params or {}), PENDING, now, now),
+            )
+            status, page, cursor, listing_done = self._conn.execute(
+                "SELECT status, page, cursor, listing_done FROM jobs WHERE job_key = ?", (key,)
+            ).fetchone()
+            items = [
+                json.loads(payload) for (payload,) in self._conn.execute(
+                    "SELECT payload FROM job_items WHERE job_key = ? ORDER BY position", (key,)
+                )
+            ]
+        return {
+            'job_key': key,
+            'status': status,
+            'page': page,
+            'cursor': cursor,
+            'listing_done': bool(listing_done),
+            'items': items,
+        }
+
+    def job_status(self, job_key):
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE job_key = ?", (job_key,)).fetchone()
+        return row[0] if row else None
+
+    def save_page(self, job_key, items, page=None, cursor=None, listing_done=False, id_field='id'):
+        """
+        在同一事务中追加一页列表结果并推进页码/cursor，进程在任意时刻中断都不会出现只写了一半的页
+        :param items: 本页条目（接口原始 dict），按 id_field 去重
+        :param page: 已完成的页码（搜索）
+        :param cursor: 下一页的 cursor（用户笔记）
+        :param listing_done: 列表是否已取完
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            position = self._conn.execute(
+                "SELECT COALESCE(MAX(position), -1) FROM job_items WHERE job_key = ?", (job_key,)
+            ).fetchone()[0]
+            for item in items:
+                position += 1
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO job_items (job_key, item_id, position, payload) VALUES (?, ?, ?, ?)",
+                    (job_key, str(item.get(id_field, position)), position, _dumps(item)),
+                )
+            self._conn.execute(
+                """UPDATE jobs SET page = COALESCE(?, page), cursor = COALESCE(?, cursor),
+                       listing_done = MAX(listing_done, ?), updated_at = ? WHERE job_key = ?""",
+                (page, cursor, int(listing_done), now, job_key),
+            )
+
+    def finish_listing(self, job_key):
+        self.save_page(job_key, [], listing_done=True)
+
+    def add_notes(self, job_key, notes):
+        """
+        登记待处理笔记，已登记的保持原状态
+        :param notes: [(note_id, note_url)]
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """INSERT OR IGNORE INTO note_tasks (job_key, note_id, note_url, status, updated_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                [(job_key, note_id, note_url, PENDING, now) for note_id, note_url in notes],
+            )
+
+    def note_states(self, job_key):
+        """
+        :return: {note_id: {'status', 'attempts', 'record'}}，record 为已获取的笔记记录 dict
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT note_id, status, attempts, record FROM note_tasks WHERE job_key = ?", (job_key,)
+            ).fetchall()
+        return {
+            note_id: {'status': status, 'attempts': attempts, 'record': json.loads(record) if record else None}
+            for note_id, status, attempts, record in rows
+        }
+
+    def mark_note(self, job_key, note_id, status, record=None, error=None):
+        """
+        :param record: 笔记记录 dict，状态为 fetched 时保存，续跑时不再请求详情
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """UPDATE note_tasks SET status = ?, record = COALESCE(?, record), error = ?, updated_at = ?,
+                       attempts = attempts + ? WHERE job_key = ? AND note_id = ?""",
+                (status, _dumps(record) if record is not None else None, error, now,
+                 int(status == FAILED), job_key, note_id),
+            )
+
+    def finish_job(self, job_key, status=DONE, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_key = ?",
+                (status, error, time.time(), job_key),
+            )
+
+    def summary(self):
+        """
+        :return: {'jobs': {status: n}, 'notes': {status: n}}
+        """
+        with self._lock:
+            jobs = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            notes = dict(self._conn.execute("SELECT status, COUNT(*) FROM note_tasks GROUP BY status").fetchall())
+        return {'jobs': jobs, 'notes': notes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
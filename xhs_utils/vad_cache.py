@@ -0,0 +1,99 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+# 指纹只读取文件首尾各 64KB，与文件大小一起作为内容标识，视频移动/改名后仍可命中
+FINGERPRINT_CHUNK = 64 * 1024
+
+_open_caches = {}
+
+
+def get_default_cache_path():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "../datas/vad_cache.db"))
+
+
+def file_fingerprint(path):
+    """
+    基于文件大小 + 首尾内容哈希的快速指纹
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha1()
+    with open(path, mode="rb") as f:
+        digest.update(f.read(FINGERPRINT_CHUNK))
+        if size > FINGERPRINT_CHUNK:
+            f.seek(max(FINGERPRINT_CHUNK, size - FINGERPRINT_CHUNK))
+            digest.update(f.read(FINGERPRINT_CHUNK))
+    return f"{size}:{digest.hexdigest()}"
+
+
+class VadCache:
+    """
+    按视频内容指纹缓存 VAD 语音帧数/总帧数，阈值（min_speech_seconds/min_speech_ratio/threshold_mode）
+    变化时直接用缓存重新判定，无需再次运行 ffmpeg；判定只依赖这两个计数，因此不保存逐帧结果
+    缓存键包含影响逐帧判定的参数：vad_aggressiveness、vad_frame_ms、energy_floor
+    :param db_path: 缓存文件路径，默认 datas/vad_cache.db
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = os.path.abspath(db_path or get_default_cache_path())
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        # 多个进程可能同时写入，等待锁而不是立即报错
+        self._conn = sqlite3.connect(self.db_path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS vad_counts (
+                    fingerprint TEXT NOT NULL,
+                    vad_aggressiveness INTEGER NOT NULL,
+                    vad_frame_ms INTEGER NOT NULL,
+                    energy_floor REAL NOT NULL,
+                    total_frames INTEGER NOT NULL,
+                    speech_frames INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (fingerprint, vad_aggressiveness, vad_frame_ms, energy_floor)
+                )"""
+            )
+            # 旧版本的 vad_frames 表额外保存了逐帧位图，迁移计数后删除
+            if self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'vad_frames'").fetchone():
+                self._conn.execute(
+                    """INSERT OR IGNORE INTO vad_counts
+                       SELECT fingerprint, vad_aggressiveness, vad_frame_ms, energy_floor, total_frames, speech_frames, created_at
+                       FROM vad_frames"""
+                )
+                self._conn.execute("DROP TABLE vad_frames")
+
+    def get(self, fingerprint, vad_aggressiveness, vad_frame_ms, energy_floor):
+        """
+        :return: (speech_frames, total_frames) 或 None
+        """
+        row = self._conn.execute(
+            """SELECT speech_frames, total_frames FROM vad_counts
+               WHERE fingerprint = ? AND vad_aggressiveness = ? AND vad_frame_ms = ? AND energy_floor = ?""",
+            (fingerprint, int(vad_aggressiveness), int(vad_frame_ms), float(energy_floor)),
+        ).fetchone()
+        return row
+
+    def put(self, fingerprint, vad_aggressiveness, vad_frame_ms, energy_floor, speech_frames, total_frames):
+        with self._conn:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO vad_counts
+                   (fingerprint, vad_aggressiveness, vad_frame_ms, energy_floor, total_frames, speech_frames, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (fingerprint, int(vad_aggressiveness), int(vad_frame_ms), float(energy_floor),
+                 int(total_frames), int(speech_frames), time.time()),
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+def get_vad_cache(db_path):
+    """
+    每个进程复用同一个缓存连接（进程池中的子进程各自打开）
+    """
+    db_path = os.path.abspath(db_path)
+    key = (os.getpid(), db_path)
+    if key not in _open_caches:
+        _open_caches[key] = VadCache(db_path)
+    return _open_caches[key]
@@ -3,6 +3,7 @@ import math
 import random
 import execjs
 from xhs_utils.cookie_util import trans_cookies
+from xhs_utils.metrics import SIGN_SECONDS
 
 try:
     js = execjs.compile(open(r'../static/xhs_xs_xsc_56.js', 'r', encoding='utf-8').read())
@@ -21,7 +22,8 @@ def generate_x_b3_traceid(len=16):
     return x_b3_traceid
 
 def generate_xs_xs_common(a1, api, data='', method='POST'):
-    ret = js.call('get_request_headers_params', api, data, a1, method)
+    with SIGN_SECONDS.time():
+        ret = js.call('get_request_headers_params', api, data, a1, method)
     xs, xt, xs_common = ret['xs'], ret['xt'], ret['xs_common']
     return xs, xt, xs_common
 